@@ -1,22 +1,91 @@
-import uvicorn
-import pandas as pd
-from fastapi import FastAPI
-from utils.common import process_single_customer
+import threading
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException
+from utils.analysis.leaderboard import Leaderboard
+from utils.llms.llm_handling import get_scheduler, get_concurrency_limiter
+from utils.llms.request_scheduler import set_default_priority
+from utils.common import (process_single_customer, process_routed_customer, process_cascade_customer,
+                          reweight_best_combinations, get_router, cascade_tracker, warm_up, CascadeConfig,
+                          CASCADE_CONFIG, PROMPT_VARIATIONS_V1)
 
 """STILL IN PROGRESS.... DO NOT RUN YET"""
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # El servidor queda disponible de inmediato; pandas/ollama y los componentes se cargan en segundo plano
+    threading.Thread(target=warm_up, daemon=True).start()
+    # Las llamadas de la API son de operadores en vivo: tienen prioridad sobre batch/tuning (OLLAMA_SCHEDULER)
+    set_default_priority('interactive')
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
 
 @app.post("/flashcard-customer")
 def flashcard_generation_for_specific_customer(data: dict):
     customer_name = data['customer_name']
+    verbose_report = data.get('verbose_report', False)
+
+    # Cascada: modelo rápido primero, modelo fuerte solo si el score es bajo o falla el parseo
+    if data.get('cascade'):
+        config = CascadeConfig(
+            fast_model=data.get('fast_model', CASCADE_CONFIG.fast_model),
+            strong_model=data.get('strong_model', CASCADE_CONFIG.strong_model),
+            threshold=data.get('threshold', CASCADE_CONFIG.threshold)
+        )
+        return process_cascade_customer(customer_name, data.get('prompt_variation', PROMPT_VARIATIONS_V1[0]),
+                                        config=config, verbose_report=verbose_report)
+
+    # Sin modelo/variación explícitos se rutea según el segmento del deudor
+    if 'model_name' not in data or 'prompt_variation' not in data:
+        return process_routed_customer(customer_name, data.get('target_score'), verbose_report=verbose_report)
+
     prompt_variation = data['prompt_variation']
     model_name = data['model_name']
+    return process_single_customer(customer_name, prompt_variation, model_name=model_name,
+                                   verbose_report=verbose_report, compact_output=data.get('compact_output', False))
+
+@app.get("/router-report")
+def router_report():
+    return get_router().report()
 
-    return process_single_customer(customer_name, prompt_variation, model_name)
+@app.get("/leaderboard")
+def leaderboard(version: int = None, order_by: str = 'mean_score', limit: int = None):
+    try:
+        return Leaderboard().query(version, order_by=order_by, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+@app.post("/reweight")
+def reweight(data: dict):
+    """Mejor combinación por cliente con otros pesos por métrica, sobre todos los resultados guardados."""
+    report = reweight_best_combinations(data['weights'], data.get('version', 1))
+    best = report.pop('best_combinations')
+    limit = data.get('limit')
+    report['best_combinations'] = (best.head(limit) if limit else best).to_dict('records')
+    return report
+
+@app.get("/scheduler")
+def scheduler_report():
+    """Slots, esperas y métricas por clase de prioridad del planificador compartido (vacío si no está activo)."""
+    scheduler = get_scheduler()
+    return scheduler.report() if scheduler is not None else {}
+
+@app.get("/concurrency")
+def concurrency_report():
+    """Límite adaptativo de llamadas concurrentes al LLM de este proceso y sus últimas decisiones (vacío si no está activo)."""
+    limiter = get_concurrency_limiter()
+    return limiter.report() if limiter is not None else {}
+
+@app.get("/cascade-report")
+def cascade_report():
+    return cascade_tracker.report()
 
 @app.get("/flashcard-data-csv/{user_name}")
 def retrieve_flashcard_data_csv(user_name: str):
+    import pandas as pd
+
     best_combinations = pd.read_csv("results/best_combinations.csv")
     user_data = best_combinations[best_combinations['customer_name'] == user_name]
     flashcard = user_data['flashcard'].values[0]
@@ -24,4 +93,6 @@ def retrieve_flashcard_data_csv(user_name: str):
     return {"flashcard": flashcard, "academic_scores": academic_scores}
     
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run("api:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
@@ -0,0 +1,120 @@
+"""
+Límite de concurrencia adaptativo (utils/llms/concurrency_limiter.py) frente al ritmo fijo anterior
+(una celda a la vez + time.sleep(0.5)) y a una concurrencia fija alta, contra un Ollama simulado
+con `--parallel` slots (OLLAMA_NUM_PARALLEL): cada slot extra en uso hace más lenta la generación
+(`--slowdown`) y lo que no entra espera en cola. A mitad de la corrida los slots bajan a
+`--parallel-after` (otro proceso ocupa el servidor) para ver si el límite retrocede. Se reporta,
+en JSON, throughput, latencia media/p95 y las decisiones del límite.
+
+    python benchmarks/bench_adaptive_concurrency.py --calls 160 --parallel 4 --parallel-after 2
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from utils.llms.mock_ollama import MockOllamaServer
+from utils.llms import llm_handling
+
+
+class VirtualOllama:
+    """Tiempos de un servidor con `parallel` slots y cola FIFO: la latencia de cada request incluye su espera."""
+
+    def __init__(self, base: float, parallel: int, slowdown: float):
+        self.base = base
+        self.slowdown = slowdown
+        self.free_at = [0.0] * parallel
+        self._lock = threading.Lock()
+
+    def set_parallel(self, parallel: int):
+        with self._lock:
+            # Se conservan los slots que terminan más tarde (los que siguen ocupados)
+            self.free_at = sorted(self.free_at + [0.0] * parallel, reverse=True)[:parallel]
+
+    def latency(self) -> float:
+        with self._lock:
+            now = time.time()
+            slot = min(range(len(self.free_at)), key=self.free_at.__getitem__)
+            start = max(now, self.free_at[slot])
+            busy = sum(1 for i, free_at in enumerate(self.free_at) if i != slot and free_at > start) + 1
+            self.free_at[slot] = start + self.base * (1 + self.slowdown * (busy - 1))
+            return self.free_at[slot] - now
+
+
+def run(virtual: VirtualOllama, args, workers: int, sleep: float = 0.0, adaptive: bool = False) -> dict:
+    virtual.set_parallel(args.parallel)
+    limiter = llm_handling.configure_concurrency_limiter(workers) if adaptive else None
+    latencies, lock = [], threading.Lock()
+    remaining = [args.calls]
+
+    def worker():
+        while True:
+            with lock:
+                if not remaining[0]:
+                    return
+                remaining[0] -= 1
+                if remaining[0] == args.calls // 2:
+                    virtual.set_parallel(args.parallel_after)
+            stats = llm_handling.llm_call("celda", "mistral")['stats']
+            with lock:
+                latencies.append(stats['latency'])
+            time.sleep(sleep)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+    llm_handling.configure_concurrency_limiter(None)
+
+    result = {
+        'seconds': seconds,
+        'calls_per_second': args.calls / seconds,
+        'mean_latency': float(np.mean(latencies)),
+        'p95_latency': float(np.percentile(latencies, 95))
+    }
+    if limiter is not None:
+        report = limiter.report(recent=len(limiter.decisions))
+        result.update({
+            'final_limit': report['limit'],
+            'decisions': {key: value for key, value in report['decisions'].items() if value},
+            'limit_trajectory': [decision['limit_after'] for decision in report['recent_decisions']]
+        })
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--calls', type=int, default=160)
+    parser.add_argument('--latency', type=float, default=0.2, help="Segundos por request con un solo slot en uso")
+    parser.add_argument('--parallel', type=int, default=4)
+    parser.add_argument('--parallel-after', type=int, default=2)
+    parser.add_argument('--slowdown', type=float, default=0.15, help="Aumento de la latencia por cada slot extra en uso")
+    parser.add_argument('--max-concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    virtual = VirtualOllama(args.latency, args.parallel, args.slowdown)
+    server = MockOllamaServer(latency=virtual.latency, loaded_models=['mistral']).start()
+    # ollama se importa en la primera llamada: toma el host del mock
+    os.environ['OLLAMA_HOST'] = server.url
+    llm_handling.configure_host_pool(None)
+    llm_handling.configure_response_cache(None)
+    llm_handling.configure_scheduler(None)
+    try:
+        runs = {
+            'sequential_sleep_0.5': run(virtual, args, workers=1, sleep=0.5),
+            'sequential': run(virtual, args, workers=1),
+            f'fixed_{args.max_concurrency}': run(virtual, args, workers=args.max_concurrency),
+            'adaptive': run(virtual, args, workers=args.max_concurrency, adaptive=True)
+        }
+    finally:
+        server.stop()
+
+    print(json.dumps({'parallel': args.parallel, 'parallel_after': args.parallel_after, **runs}, indent=2))
@@ -0,0 +1,88 @@
+"""
+Memoria retenida por los registros de llamadas normalizados: dicts (clean_and_normalize_data)
+vs. columnas con valores en pool (build_call_store), sobre datos sintéticos a escala (los deudores
+de data/ replicados). Verifica además que registros, resúmenes y prompts sean idénticos.
+Los tiempos de construcción se miden con tracemalloc activo: sirven para comparar, no como absolutos.
+
+    python benchmarks/bench_call_records.py --copies 1000
+"""
+import os
+import gc
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.analysis.data_analysis import CallCenterDataProcessor
+from utils.llms.prompt_variation_v1 import PromptVariationGeneratorV1
+
+DATA_PATH = 'data/datos_agrupados_por_deudor.json'
+
+
+def synthetic_json(copies: int) -> str:
+    """Deudores de data/ replicados `copies` veces, con nombre y documento distintos por copia."""
+    base = json.load(open(DATA_PATH, 'r', encoding='utf-8'))
+    data = {}
+    for i in range(copies):
+        for name, calls in base.items():
+            data[f"{name} {i}"] = [{**call, 'Deudor': f"{call['Deudor']} {i}", 'Documento': call['Documento'] * 1000 + i}
+                                   for call in calls]
+    return json.dumps(data, ensure_ascii=False)
+
+
+def retained_memory(text: str, build):
+    """Memoria que queda tras construir la representación y liberar el JSON crudo (como al cargar de disco)."""
+    gc.collect()
+    tracemalloc.start()
+    raw = json.loads(text)
+    start = time.perf_counter()
+    representation = build(raw)
+    seconds = time.perf_counter() - start
+    del raw
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return representation, retained, seconds
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--copies', type=int, default=400)
+    parser.add_argument('--check-customers', type=int, default=2000)
+    args = parser.parse_args()
+
+    data_processor = CallCenterDataProcessor()
+    text = synthetic_json(args.copies)
+
+    cleaned, dict_bytes, dict_seconds = retained_memory(text, data_processor.clean_and_normalize_data)
+    records = sum(len(calls) for calls in cleaned.values())
+    store, store_bytes, store_seconds = retained_memory(text, data_processor.build_call_store)
+
+    # Equivalencia: registros, resúmenes y prompts
+    prompt_generator = PromptVariationGeneratorV1()
+    variation = prompt_generator.prompt_variations[0]['name']
+    assert list(store.customers) == list(cleaned)
+    for name in list(cleaned)[:args.check_customers]:
+        calls = store.calls(name)
+        assert [call.to_dict() for call in calls] == cleaned[name]
+        compact_info = data_processor.process_call_store(store, name)
+        dict_info = {'calls': cleaned[name], 'summary': data_processor.get_customer_summary(cleaned[name])}
+        assert compact_info['summary'] == dict_info['summary']
+        assert (prompt_generator.generate_prompt_for_customer(variation, compact_info['calls'], compact_info['summary']) ==
+                prompt_generator.generate_prompt_for_customer(variation, dict_info['calls'], dict_info['summary']))
+
+    print(json.dumps({
+        'customers': len(cleaned),
+        'records': records,
+        'dict_mb': dict_bytes / 2**20,
+        'store_mb': store_bytes / 2**20,
+        'dict_bytes_per_record': dict_bytes / records,
+        'store_bytes_per_record': store_bytes / records,
+        'memory_saved': 1 - store_bytes / dict_bytes,
+        'dict_build_seconds': dict_seconds,
+        'store_build_seconds': store_seconds,
+        'checked_customers': min(args.check_customers, len(cleaned))
+    }, indent=2))
@@ -0,0 +1,47 @@
+"""
+Compara la cascada (modelo rápido -> modelo fuerte) con usar siempre el modelo fuerte sobre
+una muestra de clientes: tasa de escalamiento, latencia p50/p95 y score medio de ambas estrategias.
+
+Requiere Ollama (o servidores simulados vía OLLAMA_HOSTS, ver utils/llms/mock_ollama.py).
+
+    python benchmarks/bench_cascade.py --customers 10 --threshold 50
+"""
+import os
+import sys
+import json
+import argparse
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.llms.cascade import CascadeConfig, CascadeTracker, latency_distribution
+from utils import common
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--customers', type=int, default=10)
+    parser.add_argument('--variation', default=common.PROMPT_VARIATIONS_V1[0])
+    parser.add_argument('--fast-model', default=common.CASCADE_CONFIG.fast_model)
+    parser.add_argument('--strong-model', default=common.CASCADE_CONFIG.strong_model)
+    parser.add_argument('--threshold', type=float, default=common.CASCADE_CONFIG.threshold)
+    args = parser.parse_args()
+
+    config = CascadeConfig(args.fast_model, args.strong_model, args.threshold)
+    common.cascade_tracker = tracker = CascadeTracker()
+    cascade_scores, strong_scores, strong_latencies = [], [], []
+
+    for customer_name in list(common.load_json_data())[:args.customers]:
+        with contextlib.redirect_stdout(open(os.devnull, 'w')):
+            cascade = common.process_cascade_customer(customer_name, args.variation, config=config)
+            strong = common.process_single_customer(customer_name, args.variation, 1, config.strong_model)
+        strong_latencies.append(strong['metadata']['llm_stats']['latency'])
+        cascade_scores.append(cascade['academic_scores'])
+        strong_scores.append(strong['academic_scores'])
+
+    report = tracker.report()
+    report['strong_only_latency'] = latency_distribution(strong_latencies)
+    report['mean_latency_saved'] = report['strong_only_latency']['mean'] - report['cascade_latency']['mean']
+    report['mean_cascade_score'] = sum(cascade_scores) / len(cascade_scores)
+    report['mean_strong_score'] = sum(strong_scores) / len(strong_scores)
+    print(json.dumps(report, indent=2))
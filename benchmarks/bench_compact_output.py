@@ -0,0 +1,72 @@
+"""
+Compara la salida estándar de la flashcard con el modo compacto (claves cortas, sin campos
+deterministas): tokens generados, tokens de prompt, latencia por llamada y score.
+
+Por defecto usa Ollama; con --mock levanta un servidor simulado que responde según el
+`format` pedido y cuya latencia incluye el tiempo de decodificar cada token.
+
+    python benchmarks/bench_compact_output.py --customers 5 --model mistral
+    python benchmarks/bench_compact_output.py --mock
+"""
+import os
+import sys
+import json
+import argparse
+import contextlib
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import common
+from utils.llms.llm_handling import configure_host_pool
+from utils.llms.compact_schema import COMPACT_KEYS, compact_flashcard
+from utils.llms.mock_ollama import MockOllamaServer, MOCK_FLASHCARD
+
+
+def mock_response(body):
+    properties = (body.get('format') or {}).get('properties', {})
+    return compact_flashcard(MOCK_FLASHCARD) if COMPACT_KEYS['nivel_presion'] in properties else MOCK_FLASHCARD
+
+
+def summarize(rows):
+    return {
+        'calls': len(rows),
+        'mean_eval_count': float(np.mean([row['eval_count'] for row in rows])),
+        'mean_prompt_eval_count': float(np.mean([row['prompt_eval_count'] for row in rows])),
+        'mean_latency': float(np.mean([row['latency'] for row in rows])),
+        'p95_latency': float(np.percentile([row['latency'] for row in rows], 95)),
+        'mean_score': float(np.mean([row['score'] for row in rows]))
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--customers', type=int, default=5)
+    parser.add_argument('--model', default='mistral')
+    parser.add_argument('--variation', default=common.PROMPT_VARIATIONS_V1[0])
+    parser.add_argument('--version', type=int, default=1)
+    parser.add_argument('--mock', action='store_true')
+    args = parser.parse_args()
+
+    if args.mock:
+        server = MockOllamaServer(latency=0.02, load_duration=0.0, tokens_per_second=200,
+                                  response=mock_response, simulate_decoding=True).start()
+        configure_host_pool([server.url])
+
+    rows = {False: [], True: []}
+    for customer_name in list(common.load_json_data())[:args.customers]:
+        # Intercalado: ambos modos ven la misma carga del servidor
+        for compact in (False, True):
+            with contextlib.redirect_stdout(open(os.devnull, 'w')):
+                result = common.process_single_customer(customer_name, args.variation, args.version, args.model,
+                                                        compact_output=compact)
+            stats = result['metadata']['llm_stats']
+            rows[compact].append({**stats, 'score': result['academic_scores']})
+
+    standard, compact = summarize(rows[False]), summarize(rows[True])
+    print(json.dumps({
+        'standard': standard,
+        'compact': compact,
+        'eval_tokens_saved': 1 - compact['mean_eval_count'] / standard['mean_eval_count'],
+        'latency_saved': 1 - compact['mean_latency'] / standard['mean_latency']
+    }, indent=2))
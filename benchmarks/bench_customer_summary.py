@@ -0,0 +1,58 @@
+"""
+Resumen de toda la cartera: versión escalar (process_user_json por deudor, como hacía
+customer_segments) vs. summarize_call_store (build_call_store + operaciones agrupadas de NumPy).
+Verifica que la tabla sea idéntica al resumen escalar de cada deudor.
+
+    python benchmarks/bench_customer_summary.py --copies 400
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_call_records import synthetic_json
+from utils.analysis.data_analysis import CallCenterDataProcessor
+
+SUMMARY_FIELDS = ['total_llamadas', 'sin_compromiso_count', 'receptivity_ratio', 'customer_type',
+                  'motivo_frecuente', 'patron_fechas']
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--copies', type=int, default=400)
+    args = parser.parse_args()
+
+    data_processor = CallCenterDataProcessor()
+    raw_data = json.loads(synthetic_json(args.copies))
+    data_processor.summarize_call_store(data_processor.build_call_store({}))  # imports de numpy/pandas fuera de la medición
+
+    start = time.perf_counter()
+    scalar = {}
+    for name, calls in raw_data.items():
+        customer_info = data_processor.process_user_json({name: calls})
+        if customer_info:
+            scalar[name] = customer_info['summary']
+    scalar_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    store = data_processor.build_call_store(raw_data, clean_names=False)
+    build_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    table = data_processor.summarize_call_store(store)
+    summary_seconds = time.perf_counter() - start
+
+    assert list(table.index) == list(scalar)
+    for name, row in zip(table.index, table[SUMMARY_FIELDS].itertuples(index=False)):
+        assert list(row) == [scalar[name][field] for field in SUMMARY_FIELDS], name
+
+    print(json.dumps({
+        'customers': len(table),
+        'scalar_seconds': scalar_seconds,
+        'bulk_build_seconds': build_seconds,
+        'bulk_summary_seconds': summary_seconds,
+        'speedup_total': scalar_seconds / (build_seconds + summary_seconds),
+        'speedup_summary_only': scalar_seconds / summary_seconds
+    }, indent=2))
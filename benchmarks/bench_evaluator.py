@@ -0,0 +1,129 @@
+"""
+Benchmark de throughput de AcademicallyFoundedEvaluator.evaluate_comprehensive.
+
+Usa las flashcards guardadas en results/ y los clientes de data/. Compara además el modo
+verboso (evaluate_comprehensive) con el compacto (evaluate_compact) en throughput y en
+memoria retenida por resultado. Con --baseline-ref
+carga el evaluador de otra revisión de git, verifica que los scores sean idénticos
+y compara el throughput de ambas versiones.
+
+    python benchmarks/bench_evaluator.py --baseline-ref <commit>
+"""
+import io
+import os
+import sys
+import ast
+import json
+import time
+import tarfile
+import argparse
+import tempfile
+import tracemalloc
+import subprocess
+import importlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from utils.analysis.data_analysis import CallCenterDataProcessor
+from utils.metrics.groundtruth import GroundTruthGenerator
+from utils.metrics.response_metrics import AcademicallyFoundedEvaluator
+
+RESULT_FILES = ['results/all_results_v1.csv', 'results/ex_all_results.csv']
+DATA_PATH = 'data/datos_agrupados_por_deudor.json'
+
+
+def load_cases(max_customers: int):
+    flashcards = []
+    for path in RESULT_FILES:
+        for value in pd.read_csv(path)['flashcard']:
+            try:
+                flashcards.append(ast.literal_eval(value))
+            except (ValueError, SyntaxError):
+                pass
+
+    data_processor = CallCenterDataProcessor()
+    ground_truth = GroundTruthGenerator()
+    raw_data = json.load(open(DATA_PATH, 'r', encoding='utf-8'))
+
+    cases = []
+    for i, name in enumerate(list(raw_data)[:max_customers]):
+        customer_info = data_processor.process_user_json({name: raw_data[name]})
+        if not customer_info:
+            continue
+        expected = ground_truth.generate_expected_output(customer_info)
+        cases.append((flashcards[i % len(flashcards)], expected, customer_info))
+    return cases
+
+
+def load_baseline_evaluator(ref: str):
+    """Importa el evaluador de otra revisión: extrae su árbol utils/ como un paquete aparte."""
+    package = f"baseline_{ref.replace('-', '_').replace('.', '_')}"
+    target = tempfile.mkdtemp()
+    archive = subprocess.check_output(['git', 'archive', ref, 'utils'])
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(target)
+    os.rename(os.path.join(target, 'utils'), os.path.join(target, package))
+
+    sys.path.insert(0, target)
+    try:
+        module = importlib.import_module(f"{package}.metrics.response_metrics")
+    finally:
+        sys.path.remove(target)
+    return module.AcademicallyFoundedEvaluator()
+
+
+def measure(evaluator, cases, repeat: int, rounds: int = 5, mode: str = 'verbose'):
+    """Mejor throughput (evaluaciones/s) de varias rondas, para reducir el ruido."""
+    evaluate = evaluator.evaluate_compact if mode == 'compact' else evaluator.evaluate_comprehensive
+    best = 0.0
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for generated, expected, context in cases:
+                evaluate(generated, expected, context)
+        best = max(best, len(cases) * repeat / (time.perf_counter() - start))
+    return best
+
+
+def retained_bytes_per_result(evaluator, cases, repeat: int, mode: str) -> float:
+    evaluate = evaluator.evaluate_compact if mode == 'compact' else evaluator.evaluate_comprehensive
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    results = [evaluate(*case) for _ in range(repeat) for case in cases]
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return retained / len(results)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--customers', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--rounds', type=int, default=15)
+    parser.add_argument('--baseline-ref', default=None)
+    args = parser.parse_args()
+
+    cases = load_cases(args.customers)
+    evaluator = AcademicallyFoundedEvaluator()
+    baseline = load_baseline_evaluator(args.baseline_ref) if args.baseline_ref else None
+
+    # Rondas intercaladas para que ambas versiones vean la misma carga de la máquina
+    current = compact = reference = 0.0
+    for _ in range(args.rounds):
+        current = max(current, measure(evaluator, cases, args.repeat, rounds=1))
+        compact = max(compact, measure(evaluator, cases, args.repeat, rounds=1, mode='compact'))
+        if baseline is not None:
+            reference = max(reference, measure(baseline, cases, args.repeat, rounds=1))
+
+    print(f"Casos: {len(cases)} x {args.repeat} (mejor de {args.rounds} rondas)")
+    print(f"Actual:   {current:,.0f} evaluaciones/s (verboso) | {compact:,.0f} evaluaciones/s (compacto)")
+    print(f"Memoria retenida por resultado: {retained_bytes_per_result(evaluator, cases, 5, 'verbose'):,.0f} B (verboso) | "
+          f"{retained_bytes_per_result(evaluator, cases, 5, 'compact'):,.0f} B (compacto)")
+
+    if baseline is not None:
+        mismatches = sum(
+            evaluator.evaluate_comprehensive(*case) != baseline.evaluate_comprehensive(*case) for case in cases
+        )
+        print(f"Baseline: {reference:,.0f} evaluaciones/s ({args.baseline_ref})")
+        print(f"Speedup:  {current / reference:.2f}x | resultados distintos: {mismatches}")
@@ -0,0 +1,86 @@
+"""
+Costo de la recuperación few-shot (FewShotIndex): construcción del índice, búsqueda de vecinos
+sin caché (una consulta y en lote), selección con caché y sobrecosto al generar un prompt V1.
+El índice se arma con clientes sintéticos (data/ replicado) y las flashcards de results/.
+
+    python benchmarks/bench_few_shot_retrieval.py --copies 50
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from bench_call_records import synthetic_json
+from utils.analysis.data_analysis import CallCenterDataProcessor
+from utils.analysis.results_index import parse_literal
+from utils.llms.few_shot_retrieval import FewShotIndex, describe_summary
+from utils.llms.prompt_variation_v1 import PromptVariationGeneratorV1
+
+RESULT_FILES = ['results/best_combinations_v1.csv', 'results/ex_best_combinations.csv']
+
+
+def per_call_us(fn, items, rounds: int = 5) -> float:
+    """Mediana de `rounds` pasadas sobre `items`, en microsegundos por llamada."""
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for item in items:
+            fn(item)
+        times.append((time.perf_counter() - start) / len(items) * 1e6)
+    return statistics.median(times)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--copies', type=int, default=50)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--k', type=int, default=2)
+    args = parser.parse_args()
+
+    data_processor = CallCenterDataProcessor()
+    raw_data = json.loads(synthetic_json(args.copies))
+    store = data_processor.build_call_store(raw_data, clean_names=False)
+    table = data_processor.summarize_call_store(store)
+    summaries = table.to_dict('records')
+    flashcards = [parse_literal(value) for path in RESULT_FILES for value in pd.read_csv(path)['flashcard']]
+
+    examples = [{'customer_name': name, 'score': 60.0, 'input': describe_summary(summary),
+                 'output': flashcards[i % len(flashcards)]}
+                for i, (name, summary) in enumerate(zip(table.index, summaries))]
+
+    start = time.perf_counter()
+    index = FewShotIndex(examples, summaries, k=args.k)
+    build_seconds = time.perf_counter() - start
+
+    queries = summaries[:args.queries]
+    single_miss_us = per_call_us(lambda summary: index._nn.kneighbors(index.features([summary])), queries, rounds=1)
+
+    start = time.perf_counter()
+    index.prefetch(queries)
+    batch_us = (time.perf_counter() - start) / len(queries) * 1e6
+
+    names = list(table.index[:args.queries])
+    cached_select_us = per_call_us(lambda i: index.select(queries[i], exclude=names[i]), range(len(queries)))
+
+    # Sobrecosto en la generación del prompt (con vecinos ya en caché)
+    plain, retrieving = PromptVariationGeneratorV1(), PromptVariationGeneratorV1(example_retriever=index)
+    infos = [(name, data_processor.process_call_store(store, name)) for name in names]
+    variation = plain.prompt_variations[0]['name']
+    plain_us = per_call_us(lambda item: plain.generate_prompt_for_customer(variation, item[1]['calls'], item[1]['summary'], item[0]), infos)
+    retrieving_us = per_call_us(lambda item: retrieving.generate_prompt_for_customer(variation, item[1]['calls'], item[1]['summary'], item[0]), infos)
+
+    print(json.dumps({
+        'indexed_examples': len(index),
+        'feature_dims': len(index.feature_vector(summaries[0])),
+        'build_seconds': build_seconds,
+        'neighbors_uncached_single_us': single_miss_us,
+        'neighbors_uncached_batch_us_per_query': batch_us,
+        'select_cached_us': cached_select_us,
+        'prompt_v1_us': plain_us,
+        'prompt_v1_with_retrieval_us': retrieving_us
+    }, indent=2))
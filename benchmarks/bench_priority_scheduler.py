@@ -0,0 +1,119 @@
+"""
+Planificador por prioridades (utils/llms/request_scheduler.py) frente a una cola FIFO única, con la
+misma capacidad, contra un Ollama simulado de latencia fija. Procesos aparte saturan la capacidad
+con llamadas de tuning y batch en lazo cerrado (como prompt_tuning.py) mientras llegan llamadas
+interactivas (Poisson, como api.py). Se reporta, en JSON, la espera en cola de las interactivas
+(p50/p95, violaciones del SLO), las llamadas batch/tuning completadas y las métricas del planificador.
+
+    python benchmarks/bench_priority_scheduler.py --capacity 2 --tuning-workers 3 --interactive-rate 2 --duration 20
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from utils.llms.mock_ollama import MockOllamaServer
+from utils.llms import llm_handling
+
+SLO = 1.0
+
+
+def scheduler_kwargs(mode: str) -> dict:
+    # FIFO: todas las llamadas en una sola clase sin cuota ni SLO (el orden de llegada decide)
+    if mode == 'fifo':
+        return {'shares': {'batch': 1.0}, 'slos': {'interactive': None}}
+    return {'slos': {'interactive': SLO}}
+
+
+def call_class(mode: str, priority: str) -> str:
+    return 'batch' if mode == 'fifo' else priority
+
+
+def closed_loop(db_path: str, capacity: int, mode: str, priority: str, deadline: float, counter):
+    """Proceso batch/tuning: llama al LLM sin pausa hasta `deadline`."""
+    llm_handling.configure_scheduler(db_path, capacity, **scheduler_kwargs(mode))
+    while time.time() < deadline:
+        llm_handling.llm_call("celda", "mistral", priority=call_class(mode, priority))
+        with counter.get_lock():
+            counter.value += 1
+
+
+def run(mode: str, args) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, 'scheduler.sqlite')
+        scheduler = llm_handling.configure_scheduler(db_path, args.capacity, **scheduler_kwargs(mode))
+        deadline = time.time() + args.duration
+        counters = {'batch': multiprocessing.Value('i', 0), 'tuning': multiprocessing.Value('i', 0)}
+        processes = [multiprocessing.Process(target=closed_loop, args=(db_path, args.capacity, mode, priority,
+                                                                       deadline, counters[priority]))
+                     for priority, workers in (('batch', args.batch_workers), ('tuning', args.tuning_workers))
+                     for _ in range(workers)]
+        for process in processes:
+            process.start()
+
+        # Llamadas interactivas con llegadas Poisson, cada una en su hilo (como los requests de la API)
+        rng = random.Random(args.seed)
+        queue_times, lock, threads = [], threading.Lock(), []
+
+        def interactive():
+            stats = llm_handling.llm_call("operador", "mistral", priority=call_class(mode, 'interactive'))['stats']
+            with lock:
+                queue_times.append(stats['queue_seconds'])
+
+        time.sleep(1.0)  # que batch/tuning ocupen la capacidad primero
+        while time.time() < deadline - args.latency:
+            thread = threading.Thread(target=interactive)
+            thread.start()
+            threads.append(thread)
+            time.sleep(rng.expovariate(args.interactive_rate))
+        for thread in threads + processes:
+            thread.join()
+
+        report = scheduler.report()
+        llm_handling.configure_scheduler(None)
+
+    queue_times = np.array(queue_times)
+    return {
+        'interactive_calls': len(queue_times),
+        'interactive_p50_queue_seconds': float(np.percentile(queue_times, 50)),
+        'interactive_p95_queue_seconds': float(np.percentile(queue_times, 95)),
+        'interactive_slo_violation_rate': float(np.mean(queue_times > SLO)),
+        'batch_calls': counters['batch'].value,
+        'tuning_calls': counters['tuning'].value,
+        'throttle_events': report['throttle_events'],
+        'throttled_seconds': report['throttled_seconds'],
+        'classes': {name: {key: stats[key] for key in ('granted', 'p95_queue_seconds', 'mean_service_seconds')}
+                    for name, stats in report['classes'].items() if stats['granted']}
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--capacity', type=int, default=2)
+    parser.add_argument('--latency', type=float, default=0.3, help="Segundos por llamada del Ollama simulado")
+    parser.add_argument('--tuning-workers', type=int, default=3)
+    parser.add_argument('--batch-workers', type=int, default=1)
+    parser.add_argument('--interactive-rate', type=float, default=2.0, help="Llamadas interactivas por segundo")
+    parser.add_argument('--duration', type=float, default=20.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    server = MockOllamaServer(latency=args.latency, loaded_models=['mistral']).start()
+    # ollama se importa en la primera llamada (también en los procesos hijos): toma el host del mock
+    os.environ['OLLAMA_HOST'] = server.url
+    llm_handling.configure_host_pool(None)
+    llm_handling.configure_response_cache(None)
+    try:
+        modes = {mode: run(mode, args) for mode in ('fifo', 'priority')}
+    finally:
+        server.stop()
+
+    print(json.dumps({'capacity': args.capacity, 'latency': args.latency, 'slo_seconds': SLO, **modes}, indent=2))
@@ -0,0 +1,65 @@
+"""
+Escalamiento del re-scoring offline (rescore_file) con 1..N procesos sobre un histórico sintético:
+las filas de results/all_results_v1.csv y ex_all_results.csv replicadas para `--copies` copias de
+los deudores (datos fuente replicados igual que en bench_call_records). Verifica que los scores no
+dependan de la cantidad de procesos. Con menos núcleos que procesos no hay aceleración que medir:
+el reporte incluye os.cpu_count().
+
+    python benchmarks/bench_rescoring.py --copies 200 --max-workers 4
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from bench_call_records import synthetic_json
+from utils.execution.rescoring import rescore_file, score_columns
+
+RESULT_FILES = ['results/all_results_v1.csv', 'results/ex_all_results.csv']
+
+
+def synthetic_results(copies: int) -> pd.DataFrame:
+    """Resultados históricos con el cliente renombrado como en synthetic_json (en orden model-major, como una corrida)."""
+    base = pd.concat([pd.read_csv(path)[['customer_name', 'flashcard', 'academic_scores', 'metadata']]
+                      for path in RESULT_FILES], ignore_index=True)
+    frames = []
+    for i in range(copies):
+        frame = base.copy()
+        frame['customer_name'] = frame['customer_name'] + f" {i}"
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--copies', type=int, default=200)
+    parser.add_argument('--max-workers', type=int, default=4)
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        json_path = os.path.join(directory, 'data.json')
+        csv_path = os.path.join(directory, 'all_results.csv')
+        with open(json_path, 'w', encoding='utf-8') as data:
+            data.write(synthetic_json(args.copies))
+        synthetic_results(args.copies).to_csv(csv_path, index=False)
+
+        runs, reference = [], None
+        for workers in range(1, args.max_workers + 1):
+            output_path = os.path.join(directory, f'rescored_{workers}.csv')
+            report = rescore_file(csv_path, json_path, output_path, workers=workers, chunk_size=args.chunk_size, tag='bench')
+            scores = pd.read_csv(output_path)[list(score_columns('bench'))]
+            if reference is None:
+                reference = scores
+            assert scores.equals(reference)
+            runs.append({'workers': workers, 'seconds': report['seconds'], 'rows_per_second': report['rows_per_second'],
+                         'speedup': runs[0]['seconds'] / report['seconds'] if runs else 1.0,
+                         'rescored': report['rescored'], 'changed': report['changed']})
+        for run in runs:
+            run['efficiency'] = run['speedup'] / run['workers']
+
+    print(json.dumps({'cpu_count': os.cpu_count(), 'rows': report['rows'], 'runs': runs}, indent=2))
@@ -0,0 +1,105 @@
+"""
+Re-ponderación de resultados históricos (ScoreMatrix): tiempo de aplicar un vector de pesos nuevo
+a N resultados sintéticos y recalcular la mejor combinación por cliente, frente al camino con
+pandas (recalcular el score por fila + groupby/idxmax). Verifica que ambos elijan filas con el mismo score.
+
+    python benchmarks/bench_reweighting.py --results 1000000 --combinations 20
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+from utils.analysis.score_matrix import ScoreMatrix
+from utils.metrics.response_metrics import AcademicallyFoundedEvaluator
+
+
+def median_seconds(fn, rounds: int) -> float:
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def synthetic_matrix(n_results: int, n_combinations: int, metric_names, seed: int) -> ScoreMatrix:
+    """Grid completo (cliente × combinación) en orden model-major, como lo guarda una corrida."""
+    rng = np.random.default_rng(seed)
+    n_customers = n_results // n_combinations
+    combos = [(f"model{i % 4}", f"variation{i // 4}") for i in range(n_combinations)]
+    combo_codes = np.repeat(np.arange(n_combinations, dtype=np.int32), n_customers)
+    customer_codes = np.tile(np.arange(n_customers, dtype=np.int32), n_combinations)
+    # Scores por métrica en [0, 1] redondeados como los de las métricas (empates incluidos)
+    scores = np.round(rng.beta(4, 3, size=(len(customer_codes), len(metric_names))), 3)
+    return ScoreMatrix(metric_names, scores, customer_codes, combo_codes,
+                       [f"Cliente {i}" for i in range(n_customers)], combos)
+
+
+def pandas_best(matrix: ScoreMatrix, weights) -> np.ndarray:
+    """Camino de referencia: DataFrame por fila y groupby/idxmax (como extract_best_combinations_per_customer)."""
+    df = pd.DataFrame(matrix.scores, columns=matrix.metric_names)
+    df['customer'] = matrix.customer_codes
+    df['overall'] = sum(df[name] * weight for name, weight in weights.items()) * 100
+    return df.groupby('customer', sort=True)['overall'].idxmax().to_numpy()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--results', type=int, default=1_000_000)
+    parser.add_argument('--combinations', type=int, default=20)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    evaluator = AcademicallyFoundedEvaluator()
+    matrix = synthetic_matrix(args.results, args.combinations, evaluator.metric_names, args.seed)
+    rng = np.random.default_rng(args.seed + 1)
+    experiments = [dict(zip(evaluator.metric_names, rng.dirichlet(np.ones(len(evaluator.metric_names)))))
+                   for _ in range(args.rounds)]
+
+    # Equivalencia con el camino de pandas (pesos por defecto y aleatorios). Las sumas se acumulan en
+    # otro orden: en empates exactos puede ganar otra fila, pero siempre con el mismo score (±1e-9)
+    tie_breaks = 0
+    for weights in [evaluator.weights] + experiments[:2]:
+        ours, reference = matrix.best(weights)[0], pandas_best(matrix, weights)
+        overall = matrix.reweight(weights)
+        assert np.allclose(overall[ours], overall[reference], rtol=0, atol=1e-9)
+        tie_breaks += int(np.count_nonzero(ours != reference))
+
+    experiment = iter(experiments * 2)
+    matvec = median_seconds(lambda: matrix.reweight(next(experiment)), args.rounds)
+    experiment = iter(experiments * 2)
+    best = median_seconds(lambda: matrix.best(next(experiment)), args.rounds)
+    experiment = iter(experiments * 2)
+    best_df = median_seconds(lambda: matrix.best_combinations(next(experiment)), args.rounds)
+    experiment = iter(experiments * 2)
+    pandas_seconds = median_seconds(lambda: pandas_best(matrix, next(experiment)), max(1, args.rounds // 2))
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'score_matrix.npz')
+        matrix.save(path)
+        size = os.path.getsize(path)
+        load = median_seconds(lambda: ScoreMatrix.load(path), max(1, args.rounds // 2))
+
+    print(json.dumps({
+        'results': len(matrix),
+        'customers': matrix.n_customers,
+        'metrics': len(matrix.metric_names),
+        'matvec_seconds': matvec,
+        'best_per_customer_seconds': best,
+        'best_combinations_dataframe_seconds': best_df,
+        'pandas_groupby_seconds': pandas_seconds,
+        'speedup_vs_pandas': pandas_seconds / best_df,
+        'npz_mb': size / 2**20,
+        'npz_load_seconds': load,
+        'tie_breaks_vs_pandas': tie_breaks,
+        'winner_changes_first_experiment': matrix.winner_changes(experiments[0], evaluator.weights)
+    }, indent=2))
@@ -0,0 +1,59 @@
+"""
+Tiempo de arranque en frío (import) del CLI, la API y utils.common, medido con `python -X importtime`
+en procesos nuevos. Con --baseline-ref compara contra otra revisión de git.
+
+    python benchmarks/bench_startup.py --baseline-ref <commit>
+"""
+import io
+import os
+import sys
+import tarfile
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TARGETS = ['utils.common', 'api', 'prompt_tuning']
+
+
+def import_time_ms(module: str, cwd: str) -> float:
+    """Tiempo acumulado del import de `module` según -X importtime (microsegundos -> ms)."""
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=cwd, capture_output=True, text=True, check=True).stderr
+    for line in reversed(stderr.splitlines()):
+        parts = [part.strip() for part in line.split('|')]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1]) / 1000
+    raise RuntimeError(f"No se encontró {module} en la salida de -X importtime")
+
+
+def checkout(ref: str) -> str:
+    target = tempfile.mkdtemp()
+    archive = subprocess.check_output(['git', 'archive', ref, 'utils', 'api.py', 'prompt_tuning.py'], cwd=ROOT)
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(target)
+    return target
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rounds', type=int, default=7)
+    parser.add_argument('--baseline-ref', default=None)
+    args = parser.parse_args()
+
+    trees = {'actual': ROOT}
+    if args.baseline_ref:
+        trees[args.baseline_ref] = checkout(args.baseline_ref)
+
+    # Rondas intercaladas entre revisiones; se reporta la mediana
+    times = {(name, module): [] for name in trees for module in TARGETS}
+    for _ in range(args.rounds):
+        for name, cwd in trees.items():
+            for module in TARGETS:
+                times[(name, module)].append(import_time_ms(module, cwd))
+
+    print(f"Mediana de {args.rounds} procesos (ms)")
+    print(f"{'modulo':<16}" + "".join(f"{name:>14}" for name in trees))
+    for module in TARGETS:
+        print(f"{module:<16}" + "".join(f"{statistics.median(times[(name, module)]):>14.1f}" for name in trees))
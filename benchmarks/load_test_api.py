@@ -0,0 +1,219 @@
+"""
+Prueba de carga de api.py contra un Ollama simulado (utils/llms/mock_ollama.py) que reproduce
+una distribución de latencias y tokens/s: la registrada en all_results_v*.csv (--profile results),
+en el feed de progreso (--profile feed) o lognormal (--profile lognormal, por defecto).
+
+Por defecto levanta la API en un proceso aparte (uvicorn) apuntando al mock vía OLLAMA_HOSTS; con
+--url se prueba una API ya levantada (que use el Ollama que tenga configurado). N clientes en lazo
+cerrado envían una mezcla de requests durante --duration segundos y se reporta, en JSON, throughput,
+latencias p50/p95/p99 y tasa de errores, en total y por tipo de request.
+
+    python benchmarks/load_test_api.py --concurrency 8 --duration 30 --mix customer=6,routed=2,cascade=1,csv=1
+    python benchmarks/load_test_api.py --profile results --time-scale 0.1 --output results/load_test.json
+"""
+import os
+import sys
+import json
+import time
+import socket
+import random
+import argparse
+import threading
+import subprocess
+import urllib.error
+import urllib.parse
+import urllib.request
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+from utils import common
+from utils.llms.mock_ollama import MockOllamaServer, LatencyProfile
+
+REQUEST_KINDS = ['customer', 'routed', 'cascade', 'compact', 'csv']
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    mix = {}
+    for part in spec.split(','):
+        kind, _, weight = part.partition('=')
+        if kind not in REQUEST_KINDS:
+            raise ValueError(f"Tipo de request desconocido: {kind} (opciones: {', '.join(REQUEST_KINDS)})")
+        mix[kind] = float(weight or 1)
+    return mix
+
+
+def build_request(kind: str, rng: random.Random, customers: List[str], csv_customers: List[str]) -> Tuple[str, str, Dict]:
+    """(método, path, body) de un request del tipo pedido."""
+    customer_name = rng.choice(customers)
+    if kind == 'csv':
+        return 'GET', f"/flashcard-data-csv/{urllib.parse.quote(rng.choice(csv_customers or customers))}", None
+    if kind == 'routed':
+        return 'POST', '/flashcard-customer', {'customer_name': customer_name}
+    if kind == 'cascade':
+        return 'POST', '/flashcard-customer', {'customer_name': customer_name, 'cascade': True}
+    return 'POST', '/flashcard-customer', {
+        'customer_name': customer_name,
+        'model_name': rng.choice(common.MODELS),
+        'prompt_variation': rng.choice(common.PROMPT_VARIATIONS_V1),
+        'compact_output': kind == 'compact'
+    }
+
+
+def send(base_url: str, method: str, path: str, body, timeout: float) -> int:
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    request = urllib.request.Request(base_url + path, data=data, method=method,
+                                     headers={'Content-Type': 'application/json'} if data else {})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def latency_summary(latencies: List[float]) -> Dict:
+    if not latencies:
+        return {'count': 0}
+    return {
+        'count': len(latencies),
+        'mean': float(np.mean(latencies)),
+        'p50': float(np.percentile(latencies, 50)),
+        'p95': float(np.percentile(latencies, 95)),
+        'p99': float(np.percentile(latencies, 99)),
+        'max': float(np.max(latencies))
+    }
+
+
+def summarize(records: List[Dict], seconds: float) -> Dict:
+    errors = [record for record in records if record['error']]
+    status_counts: Dict[str, int] = {}
+    for record in records:
+        status_counts[str(record['status'])] = status_counts.get(str(record['status']), 0) + 1
+    return {
+        'requests': len(records),
+        'errors': len(errors),
+        'error_rate': len(errors) / len(records) if records else 0.0,
+        'throughput_rps': len(records) / seconds if seconds else 0.0,
+        'status_counts': status_counts,
+        'latency': latency_summary([record['latency'] for record in records if not record['error']])
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_api(ollama_url: str, workers: int) -> Tuple[subprocess.Popen, str]:
+    """API en un proceso aparte (como en producción), con el mock como único host de Ollama."""
+    port = free_port()
+    env = {**os.environ, 'OLLAMA_HOSTS': ollama_url}
+    env.pop('OLLAMA_RESPONSE_CACHE', None)  # sin caché: cada request llega al "LLM"
+    process = subprocess.Popen([sys.executable, '-m', 'uvicorn', 'api:app', '--host', '127.0.0.1', '--port', str(port),
+                                '--workers', str(workers), '--log-level', 'warning'], cwd=ROOT, env=env)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            send(base_url, 'GET', '/openapi.json', None, timeout=2)
+            return process, base_url
+        except OSError:
+            if process.poll() is not None:
+                break
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("La API no levantó a tiempo")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', default=None, help="API ya levantada (si no, se levanta una contra el mock)")
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=30.0)
+    parser.add_argument('--warmup', type=float, default=2.0, help="Segundos iniciales que no se cuentan")
+    parser.add_argument('--mix', default='customer=6,routed=2,cascade=1,csv=1')
+    parser.add_argument('--profile', choices=['results', 'feed', 'lognormal'], default='lognormal')
+    parser.add_argument('--median-latency', type=float, default=8.0, help="Mediana del perfil lognormal (s)")
+    parser.add_argument('--time-scale', type=float, default=0.05, help="Compresión de los tiempos del mock")
+    parser.add_argument('--api-workers', type=int, default=1)
+    parser.add_argument('--timeout', type=float, default=120.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None, help="Ruta del reporte JSON (además de stdout)")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    customers = list(common.load_json_data())
+    csv_path = os.path.join(ROOT, 'results', 'best_combinations.csv')
+    csv_customers = []
+    if os.path.exists(csv_path):
+        import pandas as pd
+        csv_customers = pd.read_csv(csv_path)['customer_name'].tolist()
+
+    server, api_process = None, None
+    base_url = args.url
+    if base_url is None:
+        if args.profile == 'results':
+            profile = LatencyProfile.from_results(time_scale=args.time_scale, seed=args.seed)
+        elif args.profile == 'feed':
+            profile = LatencyProfile.from_progress_feed(time_scale=args.time_scale, seed=args.seed)
+        else:
+            profile = LatencyProfile.lognormal(median_latency=args.median_latency, seed=args.seed,
+                                               time_scale=args.time_scale)
+        server = MockOllamaServer(load_duration=0.0, profile=profile).start()
+        api_process, base_url = start_api(server.url, args.api_workers)
+
+    records: List[Dict] = []
+    records_lock = threading.Lock()
+    start = time.perf_counter()
+    measure_from = start + args.warmup
+    end = measure_from + args.duration
+
+    def client(index: int):
+        rng = random.Random(args.seed * 1000 + index)
+        kinds, weights = list(mix), list(mix.values())
+        while True:
+            sent = time.perf_counter()
+            if sent >= end:
+                break
+            kind = rng.choices(kinds, weights)[0]
+            method, path, body = build_request(kind, rng, customers, csv_customers)
+            try:
+                status = send(base_url, method, path, body, args.timeout)
+                error = status >= 400
+            except OSError as e:
+                status, error = type(e).__name__, True
+            finished = time.perf_counter()
+            # Se cuentan los requests que empiezan después del warmup y terminan dentro de la ventana
+            if sent >= measure_from and finished <= end:
+                with records_lock:
+                    records.append({'kind': kind, 'status': status, 'error': error, 'latency': finished - sent})
+
+    try:
+        threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(args.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        if api_process is not None:
+            api_process.terminate()
+            api_process.wait()
+        if server is not None:
+            server.stop()
+
+    report = {
+        'config': {key: value for key, value in vars(args).items() if key != 'output'},
+        **summarize(records, args.duration),
+        'by_kind': {kind: summarize([record for record in records if record['kind'] == kind], args.duration)
+                    for kind in mix},
+        'mock_requests': server.request_counts if server else None
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            output.write(text)
@@ -1,23 +1,34 @@
-import ast
-import pandas as pd
 import streamlit as st
+from utils.analysis.results_index import ResultsIndex, file_signature
 
 CSV_FILE_PATH = "your/path/to/best_combinations.csv" # -> Change this to your best_combinations.csv file path
+PAGE_SIZE = 50
 
-st.title("Asistente Callcenter 📞")
 
-df_clientes = pd.read_csv(CSV_FILE_PATH)
+@st.cache_resource(max_entries=2)
+def load_results_index(csv_path: str, mtime_ns: int, size: int) -> ResultsIndex:
+    # mtime y tamaño forman parte de la clave: si el CSV cambia, se reconstruye el índice
+    return ResultsIndex(csv_path)
 
-cliente_seleccionado = st.selectbox("Selecciona un cliente", df_clientes['customer_name'].unique())
 
-if cliente_seleccionado:
-    flashcard_cliente = df_clientes[df_clientes['customer_name'] == cliente_seleccionado]['flashcard'].values[0]
-    flash_card_data = ast.literal_eval(flashcard_cliente)
+st.title("Asistente Callcenter 📞")
 
-    metadata = df_clientes[df_clientes['customer_name'] == cliente_seleccionado]['metadata'].values[0]
-    metadata = ast.literal_eval(metadata)
+results_index = load_results_index(*file_signature(CSV_FILE_PATH))
 
-    academic_scores = df_clientes[df_clientes['customer_name'] == cliente_seleccionado]['academic_scores'].values[0]
+busqueda = st.text_input("Buscar cliente", placeholder="Nombre o parte del nombre")
+_, total_coincidencias, total_paginas = results_index.page(busqueda, 1, PAGE_SIZE)
+pagina = st.number_input(f"Página (de {total_paginas})", min_value=1, max_value=total_paginas, value=1, step=1) \
+    if total_paginas > 1 else 1
+clientes_pagina, _, _ = results_index.page(busqueda, int(pagina), PAGE_SIZE)
+
+st.caption(f"{total_coincidencias} clientes encontrados")
+cliente_seleccionado = st.selectbox("Selecciona un cliente", clientes_pagina)
+
+if cliente_seleccionado:
+    registro = results_index.get(cliente_seleccionado)
+    flash_card_data = registro['flashcard']
+    metadata = registro['metadata']
+    academic_scores = registro['academic_scores']
     
 
     st.markdown("""
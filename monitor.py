@@ -0,0 +1,56 @@
+import time
+import pandas as pd
+import streamlit as st
+from utils.monitoring.progress_feed import FeedTailer, PROGRESS_PATH
+
+REFRESH_SECONDS = 2
+
+
+def format_seconds(seconds) -> str:
+    if seconds is None:
+        return "-"
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes:02d}m {seconds:02d}s" if hours else f"{minutes}m {seconds:02d}s"
+
+
+st.title("Monitor de corridas de tuning 📈")
+feed_path = st.text_input("Feed de progreso", value=PROGRESS_PATH)
+
+# El tailer vive en la sesión: cada refresco solo lee las líneas nuevas del feed
+if 'tailer' not in st.session_state or st.session_state.tailer.path != feed_path:
+    st.session_state.tailer = FeedTailer(feed_path)
+
+
+@st.fragment(run_every=REFRESH_SECONDS)
+def show_progress():
+    tailer = st.session_state.tailer
+    tailer.poll()
+    state = tailer.state
+
+    if state.run_id is None:
+        st.info("Todavía no hay ninguna corrida en el feed")
+        return
+
+    st.subheader(f"Corrida {state.run_id}" + (" ✅ finalizada" if state.finished else ""))
+    st.progress(min(1.0, (state.completed + state.errors) / state.total) if state.total else 0.0)
+
+    columns = st.columns(4)
+    columns[0].metric("Celdas completas", f"{state.completed}/{state.total}")
+    columns[1].metric("Fallos de parseo", state.parse_failures)
+    columns[2].metric("Celdas con error", state.errors)
+    columns[3].metric("ETA", format_seconds(state.eta_seconds()))
+
+    if not state.finished and state.last_event_at:
+        st.caption(f"Último evento hace {format_seconds(time.time() - state.last_event_at)}")
+    if state.concurrency_limit is not None:
+        st.caption(f"Límite de concurrencia adaptativo: {state.concurrency_limit} llamadas en paralelo")
+
+    if state.latencies:
+        st.markdown("### Latencia y throughput por modelo")
+        st.dataframe(pd.DataFrame(state.model_summary()), hide_index=True)
+        st.markdown("### Latencia por modelo y variación")
+        st.dataframe(pd.DataFrame(state.variation_summary()), hide_index=True)
+
+
+show_progress()
@@ -1,5 +1,65 @@
-from utils.common import run_prompt_tuning_evaluation
+import json
+import argparse
+from utils.common import (run_prompt_tuning_evaluation, run_distributed_evaluation, run_queue_worker,
+                          run_incremental_regeneration, plan_prompt_tuning_evaluation, run_pipelined_evaluation,
+                          enable_few_shot_retrieval, rescore_historical_results, QUEUE_PATH, GENERATION_OPTIONS_SWEEP,
+                          DEFAULT_MIN_SCORE)
 
 if __name__ == "__main__":
-    sample_size = 3
-    run_prompt_tuning_evaluation(sample_size, version=1)
+    parser = argparse.ArgumentParser(description="Evaluación de variaciones de prompts")
+    parser.add_argument('--mode', choices=['local', 'pipeline', 'coordinator', 'worker', 'regenerate', 'plan', 'rescore'],
+                        default='local',
+                        help="local: un solo proceso; pipeline: etapas en paralelo con colas acotadas; "
+                             "coordinator: encola el grid y lanza workers; worker: consume la cola; "
+                             "regenerate: regenera solo las flashcards cuyo historial cambió; "
+                             "plan: estima tokens, tiempo y aciertos de caché sin llamar al LLM; "
+                             "rescore: re-evalúa los resultados guardados con el evaluador actual (sin LLM)")
+    parser.add_argument('--sample-size', type=int, default=3)
+    parser.add_argument('--version', type=int, default=1)
+    parser.add_argument('--workers', type=int, default=2,
+                        help="Workers locales del coordinador (0 = solo externos) o procesos del modo rescore")
+    parser.add_argument('--queue', default=QUEUE_PATH, help="Ruta de la cola SQLite compartida")
+    parser.add_argument('--run-id', default=None)
+    parser.add_argument('--concurrency', type=int, default=1, help="Celdas en paralelo supuestas por el modo plan")
+    parser.add_argument('--generate-workers', type=int, default=2, help="Llamadas al LLM en paralelo (modo pipeline)")
+    parser.add_argument('--max-concurrency', type=int, default=1,
+                        help="Tope del límite adaptativo de llamadas en paralelo (modo local; 1 = secuencial con "
+                             "pausa entre celdas, salvo OLLAMA_ADAPTIVE_CONCURRENCY)")
+    parser.add_argument('--few-shot-k', type=int, default=0,
+                        help="Ejemplos few-shot recuperados de clientes parecidos (0 = ejemplos fijos)")
+    parser.add_argument('--few-shot-min-score', type=float, default=DEFAULT_MIN_SCORE,
+                        help="Score mínimo (0-100) de una flashcard pasada para usarla como ejemplo few-shot")
+    parser.add_argument('--previous', default=None, help="CSV de best_combinations anterior (modo regenerate)")
+    parser.add_argument('--options-sweep', nargs='?', const='', default=None, metavar='JSON',
+                        help="Agrega opciones de generación de Ollama al grid: GENERATION_OPTIONS_SWEEP o un JSON "
+                             "{nombre: {num_ctx, num_predict, ...}}; reporta la frontera de Pareto score vs. latencia")
+    args = parser.parse_args()
+
+    generation_options = None
+    if args.options_sweep is not None:
+        generation_options = GENERATION_OPTIONS_SWEEP
+        if args.options_sweep:
+            with open(args.options_sweep, 'r', encoding='utf-8') as options_file:
+                generation_options = json.load(options_file)
+
+    if args.few_shot_k:
+        enable_few_shot_retrieval(k=args.few_shot_k, min_score=args.few_shot_min_score)
+
+    if args.mode == 'coordinator':
+        run_distributed_evaluation(args.sample_size, args.version, args.workers, args.queue, args.run_id,
+                                   generation_options=generation_options)
+    elif args.mode == 'worker':
+        run_queue_worker(args.queue, args.run_id, exit_when_idle=args.run_id is not None)
+    elif args.mode == 'pipeline':
+        run_pipelined_evaluation(args.sample_size, args.version, args.generate_workers,
+                                 generation_options=generation_options)
+    elif args.mode == 'plan':
+        plan_prompt_tuning_evaluation(args.sample_size, args.version, args.concurrency,
+                                      generation_options=generation_options)
+    elif args.mode == 'rescore':
+        rescore_historical_results(workers=args.workers)
+    elif args.mode == 'regenerate':
+        run_incremental_regeneration(args.previous, version=args.version)
+    else:
+        run_prompt_tuning_evaluation(args.sample_size, version=args.version, generation_options=generation_options,
+                                     max_concurrency=args.max_concurrency)
@@ -0,0 +1,36 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.llms import llm_handling
+from utils.llms.mock_ollama import MockOllamaServer
+
+
+@pytest.fixture
+def mock_ollama(monkeypatch):
+    """
+    Levanta un Ollama simulado y lo configura como único host del pool, sin caché, planificador ni
+    límite de concurrencia. Devuelve una función que arranca el servidor con los kwargs de MockOllamaServer.
+    """
+    monkeypatch.chdir(ROOT)
+    servers = []
+
+    def start(**kwargs):
+        kwargs.setdefault('latency', 0.0)
+        server = MockOllamaServer(**kwargs).start()
+        servers.append(server)
+        llm_handling.configure_host_pool([s.url for s in servers])
+        return server
+
+    llm_handling.configure_response_cache(None)
+    llm_handling.configure_scheduler(None)
+    llm_handling.configure_concurrency_limiter(None)
+    yield start
+    llm_handling.configure_host_pool(None)
+    llm_handling.configure_response_cache(None)
+    for server in servers:
+        server.stop()
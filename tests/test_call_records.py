@@ -0,0 +1,68 @@
+import os
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from utils.analysis.data_analysis import CallCenterDataProcessor
+from utils.common import JSON_PATH, load_json_data
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def call(fecha: str, motivo: str = 'Desempleo') -> dict:
+    return {'Cartera': 'Tarjeta', 'Documento': '123', 'Deudor': 'ana perez', 'Fecha_Gestion': fecha,
+            'Observaciones': 'Cliente indica que paga el viernes!', 'Detalle_Resultado': 'Promesa de pago',
+            'Motivo': motivo}
+
+
+def test_call_store_matches_dicts_with_iso_dates():
+    processor = CallCenterDataProcessor(max_history_calls=2)
+    raw_data = {'ana perez': [call('2025-03-01'), call('2025-05-10', 'Olvido'), call('2025-04-20'), call('no es fecha')]}
+
+    store = processor.build_call_store(raw_data)
+    cleaned = processor.clean_and_normalize_data(raw_data)
+
+    assert [view.to_dict() for view in store.calls('Ana Perez')] == cleaned['Ana Perez']
+
+
+def test_call_store_keeps_original_date_text_and_sorts_by_day():
+    processor = CallCenterDataProcessor()
+    raw_data = {'ana perez': [call('2025-08-15'), call('2025-10-1'), call('2025-9-30')]}
+
+    calls = processor.build_call_store(raw_data).calls('Ana Perez')
+    cleaned = processor.clean_and_normalize_data(raw_data)['Ana Perez']
+
+    # Se muestra el texto original; el orden es cronológico (clean_and_normalize_data compara el texto)
+    assert [view['Fecha_Gestion'] for view in calls] == ['2025-10-1', '2025-9-30', '2025-08-15']
+    assert [item['Fecha_Gestion'] for item in cleaned] == ['2025-9-30', '2025-10-1', '2025-08-15']
+    assert processor.get_customer_summary(calls)['ultima_llamada']['Fecha_Gestion'] == '2025-10-1'
+
+
+def fuzzed_debtors(seed: int = 0, count: int = 300) -> dict:
+    """Deudores con pocos valores distintos: empates de motivo, fechas repetidas e historiales de 1 llamada."""
+    rng = random.Random(seed)
+    motivos = ['Desempleo', 'Olvido', 'Enfermedad', '']
+    resultados = ['Promesa de pago', 'Sin compromiso', 'SIN COMPROMISO de pago', 'Ya pagó']
+    raw_data = {}
+    for i in range(count):
+        calls = []
+        for _ in range(rng.randint(1, 8)):
+            day = date(2025, 1, 1) + timedelta(days=rng.choice([0, 1, 3, 10, 40, 90]) * rng.randint(0, 3))
+            calls.append({**call(day.isoformat(), rng.choice(motivos)), 'Detalle_Resultado': rng.choice(resultados)})
+        raw_data[f"deudor {i}"] = calls
+    return raw_data
+
+
+@pytest.mark.parametrize('source', ['shipped', 'fuzzed'])
+def test_vectorized_summaries_match_the_scalar_version(source):
+    processor = CallCenterDataProcessor()
+    raw_data = load_json_data(os.path.join(ROOT, JSON_PATH)) if source == 'shipped' else fuzzed_debtors()
+    store = processor.build_call_store(raw_data, clean_names=False)
+    table = processor.summarize_call_store(store)
+
+    assert list(table.index) == list(store.customers)
+    for name, row in table.iterrows():
+        scalar = processor.get_customer_summary(store.calls(name))
+        scalar.pop('ultima_llamada')
+        assert {**row.to_dict(), 'receptivity_ratio': pytest.approx(row['receptivity_ratio'])} == scalar, name
@@ -0,0 +1,62 @@
+import pytest
+
+from utils import common
+from utils.llms.cascade import CascadeConfig, CascadeTracker
+from utils.llms.mock_ollama import MOCK_FLASHCARD
+
+
+@pytest.fixture
+def tracker(monkeypatch):
+    tracker = CascadeTracker()
+    monkeypatch.setattr(common, 'cascade_tracker', tracker)
+    return tracker
+
+
+def customer() -> str:
+    return next(iter(common.load_json_data()))
+
+
+def served_by(requests):
+    return [body['model'] for body in requests]
+
+
+def test_scores_at_the_threshold_stay_on_the_fast_model(mock_ollama, tracker):
+    requests = []
+    mock_ollama(loaded_models=['mistral', 'llama3.1'], response=lambda body: requests.append(body) or MOCK_FLASHCARD)
+
+    result = common.process_cascade_customer(customer(), 'step_by_step', config=CascadeConfig(threshold=0.0))
+
+    assert served_by(requests) == ['mistral']
+    assert result['metadata']['cascade']['escalated'] is False
+    assert result['metadata']['model_name'] == 'mistral'
+    assert tracker.report()['escalation_rate'] == 0.0
+
+
+def test_unparseable_fast_answers_escalate_to_the_strong_model(mock_ollama, tracker):
+    requests = []
+
+    def respond(body):
+        requests.append(body)
+        return "respuesta cortada" if body['model'] == 'mistral' else MOCK_FLASHCARD
+
+    mock_ollama(loaded_models=['mistral', 'llama3.1'], response=respond)
+    result = common.process_cascade_customer(customer(), 'step_by_step', config=CascadeConfig(threshold=0.0))
+
+    cascade = result['metadata']['cascade']
+    assert served_by(requests)[-1] == 'llama3.1' and 'mistral' in served_by(requests)
+    assert (cascade['escalated'], cascade['fast_parse_failed']) == (True, True)
+    assert result['metadata']['model_name'] == 'llama3.1'
+    report = tracker.report()
+    assert (report['requests'], report['escalation_rate'], report['parse_escalations']) == (1, 1.0, 1)
+    assert report['cascade_latency']['mean'] == pytest.approx(cascade['latency'])
+
+
+def test_low_scores_escalate(mock_ollama, tracker):
+    requests = []
+    mock_ollama(loaded_models=['mistral', 'llama3.1'], response=lambda body: requests.append(body) or MOCK_FLASHCARD)
+
+    result = common.process_cascade_customer(customer(), 'step_by_step', config=CascadeConfig(threshold=101.0))
+
+    assert served_by(requests) == ['mistral', 'llama3.1']
+    assert result['metadata']['cascade']['escalated'] is True
+    assert result['metadata']['cascade']['fast_parse_failed'] is False
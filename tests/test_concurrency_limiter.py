@@ -0,0 +1,79 @@
+import pytest
+
+from utils.llms.concurrency_limiter import AdaptiveConcurrencyLimiter
+
+
+class ReadTimeout(Exception):
+    pass
+
+
+def complete(limiter: AdaptiveConcurrencyLimiter, latencies, model: str = 'mistral'):
+    """Corre una llamada por latencia con el límite completo en uso (así la ventana registra la demanda)."""
+    for start in range(0, len(latencies), limiter.current_limit):
+        batch = latencies[start:start + limiter.current_limit]
+        for _ in batch:
+            limiter.acquire()
+        for latency in batch:
+            limiter.release(model, latency)
+
+
+def decisions(limiter: AdaptiveConcurrencyLimiter):
+    return [decision['decision'] for decision in limiter.decisions]
+
+
+def test_stable_latency_increases_the_limit_one_at_a_time():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=1, max_limit=3, window=2)
+    complete(limiter, [1.0] * 2)
+    assert (decisions(limiter), limiter.current_limit) == (['warmup'], 1)
+
+    complete(limiter, [1.0] * 2)
+    complete(limiter, [1.1] * 2)
+    assert decisions(limiter)[1:] == ['increase', 'increase']
+    assert limiter.current_limit == 3
+    # Nunca pasa de max_limit
+    complete(limiter, [1.0] * 3)
+    assert limiter.current_limit == 3
+
+
+def test_unused_capacity_is_not_increased():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=4, window=2)
+    for _ in range(4):
+        limiter.acquire()
+        limiter.release('mistral', 1.0)
+    assert decisions(limiter) == ['warmup', 'hold']
+    assert limiter.current_limit == 2
+
+
+def test_latency_growth_decreases_in_proportion():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=4, max_limit=8, window=4)
+    complete(limiter, [1.0] * 4)
+    complete(limiter, [2.0] * 4)
+    assert decisions(limiter) == ['warmup', 'decrease_latency']
+    assert limiter.limit == pytest.approx(4 * 1.5 / 2.0)
+
+    # Por encima de la tolerancia el retroceso nunca es mayor que `backoff`
+    complete(limiter, [10.0] * 4)
+    assert limiter.limit == pytest.approx(3 * 0.5)
+    # Latencia algo más alta que la base pero dentro de la tolerancia: se mantiene
+    complete(limiter, [1.3] * 4)
+    assert decisions(limiter)[-1] == 'hold_latency'
+
+
+def test_errors_back_off_once_per_burst():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=4, max_limit=8, window=4)
+    for _ in range(3):
+        limiter.acquire()
+    limiter.release('mistral', error=RuntimeError("500"))
+    assert limiter.limit == 2.0
+
+    # Las llamadas que ya estaban en curso fallan también, pero no vuelven a retroceder
+    limiter.release('mistral', error=ReadTimeout())
+    limiter.release('mistral', error=RuntimeError("500"))
+    assert limiter.limit == 2.0
+
+    limiter.acquire()
+    limiter.release('mistral', error=RuntimeError("500"))
+    assert limiter.limit == 1.0
+    assert decisions(limiter) == ['decrease_error', 'decrease_error']
+    report = limiter.report()
+    assert (report['errors'], report['timeouts'], report['in_flight']) == (3, 1, 0)
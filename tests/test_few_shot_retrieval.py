@@ -0,0 +1,44 @@
+import pandas as pd
+
+from utils.llms.cascade import CascadeConfig
+from utils.llms.few_shot_retrieval import DEFAULT_MIN_SCORE, FewShotIndex
+from utils.llms.prompt_generation import PromptVariationGenerator
+from utils.llms.prompt_variation_v1 import PromptVariationGeneratorV1
+
+SUMMARY = {'total_llamadas': 3, 'sin_compromiso_count': 1, 'receptivity_ratio': 2 / 3,
+           'customer_type': 'Receptivo moderado', 'motivo_frecuente': 'Desempleo',
+           'patron_fechas': 'Llamadas regulares (mensual)'}
+
+
+def test_from_results_skips_low_scores_by_default(tmp_path):
+    flashcard = str({'nivel_presion': 'Media', 'primer_dialogo': 'Buenas tardes'})
+    pd.DataFrame({
+        'customer_name': ['bueno', 'malo'],
+        'flashcard': [flashcard, flashcard],
+        'academic_scores': [DEFAULT_MIN_SCORE + 10, DEFAULT_MIN_SCORE - 30],
+        'metadata': ['{}', '{}']
+    }).to_csv(tmp_path / 'best_combinations_v1.csv', index=False)
+    summary_table = pd.DataFrame([SUMMARY, SUMMARY], index=pd.Index(['bueno', 'malo'], name='customer_name'))
+    pattern = str(tmp_path / 'best_combinations_v*.csv')
+
+    assert [example['customer_name'] for example in FewShotIndex.from_results(summary_table, pattern).examples] == ['bueno']
+    assert len(FewShotIndex.from_results(summary_table, pattern, min_score=0.0)) == 2
+
+
+def test_min_score_follows_the_cascade_threshold():
+    assert DEFAULT_MIN_SCORE == CascadeConfig().threshold
+
+
+def test_the_customer_key_is_excluded_even_if_deudor_differs():
+    examples = [{'customer_name': name, 'score': 90.0, 'input': f"Cliente {name}", 'output': {'cliente': name}}
+                for name in ('ana-001', 'luis-002')]
+    index = FewShotIndex(examples, [SUMMARY, SUMMARY], k=1)
+    # La clave del JSON no coincide con el Deudor de las llamadas (p.ej. nombres normalizados)
+    call = {'Deudor': 'ANA PEREZ', 'Cartera': 'A', 'Documento': '1', 'Fecha_Gestion': '2025-08-15',
+            'Observaciones': '', 'Detalle_Resultado': 'Sin compromiso', 'Motivo': 'Desempleo'}
+    summary = {**SUMMARY, 'ultima_llamada': call}
+
+    for generator in (PromptVariationGeneratorV1(example_retriever=index), PromptVariationGenerator(example_retriever=index)):
+        variation = next(v['name'] for v in generator.prompt_variations if v.get('few_shot_examples', True))
+        prompt = generator.generate_prompt_for_customer(variation, [call], summary, 'ana-001')
+        assert 'Cliente luis-002' in prompt and 'Cliente ana-001' not in prompt
@@ -0,0 +1,43 @@
+import itertools
+
+from utils import common
+from utils.llms import llm_handling
+
+SAMPLE_SIZE = 2
+OPTIONS = {common.DEFAULT_OPTIONS: {}, 'frio': {'temperature': 0.1}}
+
+
+def grid_cells():
+    customers = list(common.load_json_data())[:SAMPLE_SIZE]
+    return list(itertools.product(customers, common.PROMPT_VARIATIONS_V1, common.MODELS, OPTIONS.items()))
+
+
+def run_cell(cell):
+    customer_name, variation, model_name, (options_name, options) = cell
+    return common.process_single_customer(customer_name, variation, model_name=model_name,
+                                          options_name=options_name, generation_options=options)
+
+
+def test_planned_cache_hits_match_a_real_run(mock_ollama, tmp_path):
+    server = mock_ollama(loaded_models=common.MODELS)
+    llm_handling.configure_response_cache(str(tmp_path / 'response_cache.sqlite'))
+    common.enable_few_shot_retrieval(k=1)
+    try:
+        cells = grid_cells()
+        warmed = cells[::2]
+        for cell in warmed:
+            run_cell(cell)
+
+        plan = common.plan_prompt_tuning_evaluation(SAMPLE_SIZE, generation_options=OPTIONS)
+
+        # Sin reintentos de parseo, cada celda que no está en caché hace exactamente un /api/chat
+        calls_before = server.request_counts.get('/api/chat', 0)
+        for cell in cells:
+            run_cell(cell)
+        actual_hits = len(cells) - (server.request_counts['/api/chat'] - calls_before)
+    finally:
+        for name in ('prompt_generator', 'prompt_generator_v1'):
+            common.get_component(name).example_retriever = None
+
+    assert plan['cells'] == len(cells)
+    assert plan['cache_hits'] == actual_hits == len(warmed)
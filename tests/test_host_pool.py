@@ -0,0 +1,69 @@
+import time
+import socket
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from utils.llms.host_pool import OllamaHostPool
+
+
+@pytest.fixture
+def blackhole():
+    """Host que acepta conexiones pero nunca responde."""
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(16)
+    yield f"http://127.0.0.1:{listener.getsockname()[1]}"
+    listener.close()
+
+
+def test_health_check_does_not_block_requests(mock_ollama, blackhole):
+    server = mock_ollama(loaded_models=['mistral'])
+    pool = OllamaHostPool([server.url, blackhole], health_interval=0.0, health_timeout=0.5)
+
+    start = time.perf_counter()
+    pool.chat('mistral', messages=[{'role': 'user', 'content': 'hola'}])
+    assert time.perf_counter() - start < 0.4
+
+    # El health check en segundo plano vence con el timeout corto y marca al host colgado
+    pool._health_thread.join(timeout=5)
+    healthy = {host['host']: host['healthy'] for host in pool.stats()}
+    assert healthy == {server.url: True, blackhole: False}
+
+
+def test_unexpected_errors_release_outstanding(mock_ollama, monkeypatch):
+    server = mock_ollama(loaded_models=['mistral'])
+    pool = OllamaHostPool([server.url])
+
+    def broken_chat(**kwargs):
+        raise KeyError('message')
+    monkeypatch.setattr(pool.hosts[0].client, 'chat', broken_chat)
+
+    with pytest.raises(KeyError):
+        pool.chat('mistral', messages=[])
+    assert pool.stats()[0]['outstanding'] == 0
+
+
+def test_hedge_counters_under_concurrency(mock_ollama):
+    servers = [mock_ollama(latency=0.05, loaded_models=['mistral']) for _ in range(2)]
+    pool = OllamaHostPool([server.url for server in servers], hedge_after=0.005)
+
+    with ThreadPoolExecutor(8) as executor:
+        list(executor.map(lambda _: pool.chat('mistral', messages=[]), range(32)))
+    # Cada request tarda más que hedge_after: todos se duplican en el otro host
+    assert pool.hedged_requests == 32
+    assert 0 <= pool.hedge_wins <= 32
+
+
+def test_hedging_fails_over_when_the_primary_fails_fast(mock_ollama):
+    failing = mock_ollama(fail_rate=1.0, loaded_models=['mistral'])
+    healthy = mock_ollama(loaded_models=['mistral'])
+    pool = OllamaHostPool([failing.url, healthy.url], hedge_after=5.0)
+
+    start = time.perf_counter()
+    response = pool.chat('mistral', messages=[{'role': 'user', 'content': 'hola'}])
+    assert response.message.content
+    # El primario falla enseguida: se pasa al otro host sin esperar a hedge_after, y no cuenta como hedge
+    assert time.perf_counter() - start < 1.0
+    assert pool.hedged_requests == 0 and pool.hedge_wins == 0
+    assert [host['failures'] for host in pool.stats()] == [1, 0]
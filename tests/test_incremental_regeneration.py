@@ -0,0 +1,52 @@
+import pandas as pd
+import pytest
+
+from utils.analysis.fingerprint import history_fingerprint
+from utils.analysis.results_index import parse_literal
+from utils.common import get_component, load_json_data, run_incremental_regeneration
+from utils.llms.mock_ollama import MOCK_FLASHCARD
+
+CALLS = [{'Deudor': 'ANA PEREZ', 'Fecha_Gestion': '2025-08-15', 'Observaciones': 'Sin compromiso'}]
+BASE = dict(normalized_calls=CALLS, model_name='mistral', prompt_variation='step_by_step', version=1,
+            prompt_template='Plantilla {user_data}', system_prompt='Sistema', generation_options={}, compact_output=False)
+
+
+@pytest.mark.parametrize('change', [
+    {'normalized_calls': CALLS + CALLS}, {'model_name': 'llama3.1'}, {'prompt_variation': 'empathic_prompt'},
+    {'version': 2}, {'prompt_template': 'Plantilla nueva {user_data}'}, {'system_prompt': 'Otro sistema'},
+    {'generation_options': {'temperature': 0.0}}, {'compact_output': True}
+])
+def test_fingerprint_changes_with_every_generation_input(change):
+    assert history_fingerprint(**BASE) == history_fingerprint(**{**BASE, 'generation_options': None})
+    assert history_fingerprint(**{**BASE, **change}) != history_fingerprint(**BASE)
+
+
+def test_regeneration_follows_prompt_and_option_changes(mock_ollama, monkeypatch, tmp_path):
+    requests = []
+    mock_ollama(loaded_models=['mistral'], response=lambda body: requests.append(body) or MOCK_FLASHCARD)
+    json_data = dict(list(load_json_data().items())[:3])
+    path = str(tmp_path / 'best_combinations_v1.csv')
+
+    def regenerate():
+        requests.clear()
+        return run_incremental_regeneration(path, version=1, json_data=json_data)['regenerated']
+
+    assert regenerate() == 3
+    assert regenerate() == 0
+
+    # Opciones de generación de un deudor en la salida anterior: se regenera y las conserva
+    df = pd.read_csv(path)
+    metadata = parse_literal(df.loc[0, 'metadata'])
+    metadata.update(options_name='greedy', generation_options={'temperature': 0.0})
+    df.loc[0, 'metadata'] = str(metadata)
+    df.to_csv(path, index=False)
+    assert regenerate() == 1
+    assert requests[0]['options'] == {'temperature': 0.0}
+    regenerated = pd.read_csv(path).set_index('customer_name').loc[df.loc[0, 'customer_name'], 'metadata']
+    assert parse_literal(regenerated)['options_name'] == 'greedy'
+    assert regenerate() == 0
+
+    # Cambiar el texto de la plantilla invalida a todos los que la usan, aunque la versión sea la misma
+    variation = get_component('prompt_generator_v1').prompt_variations[0]
+    monkeypatch.setitem(variation, 'prompt', variation['prompt'] + "\nResponde en español.")
+    assert regenerate() == 3
@@ -0,0 +1,75 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+from utils.analysis.leaderboard import Leaderboard, LatencySketch
+
+
+@pytest.fixture
+def leaderboard(tmp_path):
+    return Leaderboard(str(tmp_path / 'leaderboard.sqlite'))
+
+
+def by_combo(board):
+    return {(entry['model_name'], entry['prompt_variation']): entry for entry in board}
+
+
+def test_welford_matches_numpy_and_skips_nan(leaderboard):
+    scores = [55.0, 61.5, 48.25, 70.0, 52.0]
+    for i, score in enumerate(scores + [math.nan]):
+        leaderboard.update(f"cliente {i}", 'mistral', 'step_by_step', 1, score,
+                           {'semantic_similarity': score / 100, 'contextual_relevance': math.nan}, latency=1.0)
+
+    entry = leaderboard.query(1)[0]
+    assert entry['count'] == len(scores)
+    assert entry['mean_score'] == pytest.approx(np.mean(scores))
+    assert entry['score_variance'] == pytest.approx(np.var(scores, ddof=1))
+    assert entry['metric_means'] == {'semantic_similarity': pytest.approx(np.mean(scores) / 100)}
+
+
+def test_wins_move_to_the_best_combination(leaderboard):
+    leaderboard.update('ana', 'mistral', 'a', 1, 50.0)
+    leaderboard.update('ana', 'llama3.1', 'a', 1, 60.0)
+    leaderboard.update('luis', 'mistral', 'a', 1, 40.0)
+    leaderboard.update('ana', 'mistral', 'b', 1, 55.0)
+
+    wins = {combo: entry['wins'] for combo, entry in by_combo(leaderboard.query(1)).items()}
+    assert wins == {('mistral', 'a'): 1, ('llama3.1', 'a'): 1, ('mistral', 'b'): 0}
+
+
+def test_updates_with_a_run_id_are_applied_once(leaderboard):
+    for _ in range(2):
+        leaderboard.update('ana', 'mistral', 'a', 1, 50.0, run_id='v1-1')
+    leaderboard.update('ana', 'mistral', 'a', 1, 70.0, run_id='v1-2')
+
+    entry = leaderboard.query(1)[0]
+    assert (entry['count'], entry['wins']) == (2, 1)
+    assert entry['mean_score'] == pytest.approx(60.0)
+
+
+def test_query_rejects_unknown_order_fields(leaderboard):
+    leaderboard.update('ana', 'mistral', 'a', 1, 50.0, latency=2.0)
+    leaderboard.update('ana', 'mistral', 'b', 1, 60.0)
+
+    assert [entry['prompt_variation'] for entry in leaderboard.query(order_by='latency_p50')] == ['a', 'b']
+    for order_by in ('model_name', 'desconocido'):
+        with pytest.raises(ValueError):
+            leaderboard.query(order_by=order_by)
+
+
+def test_latency_sketch_quantiles_within_relative_accuracy():
+    rng = random.Random(0)
+    values = [rng.lognormvariate(1.0, 0.6) for _ in range(5000)] + [0.0] * 50
+    sketch = LatencySketch(relative_accuracy=0.01)
+    for value in values:
+        sketch.add(value)
+    sketch = LatencySketch.from_json(sketch.to_json())
+
+    assert sketch.count == len(values)
+    assert sketch.quantile(0.001) == 0.0
+    ordered = sorted(values)
+    for q in (0.5, 0.95, 0.99):
+        exact = ordered[int(q * (len(ordered) - 1))]
+        assert sketch.quantile(q) == pytest.approx(exact, rel=0.01)
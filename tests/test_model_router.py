@@ -0,0 +1,58 @@
+import math
+
+import pandas as pd
+
+from utils.llms.model_router import SegmentRouter
+
+
+def results(rows) -> pd.DataFrame:
+    return pd.DataFrame([{
+        'customer_name': customer,
+        'academic_scores': score,
+        'metadata': {'model_name': model, 'prompt_variation': 'a', **({'llm_stats': stats} if stats is not None else {})},
+        'version': 1
+    } for customer, model, score, stats in rows])
+
+
+def measured(latency: float) -> dict:
+    return {'latency': latency, 'total_duration': latency}
+
+
+SEGMENTS = {'ana': 'Evasivo', 'luis': 'Evasivo', 'eva': 'Receptivo alto'}
+
+
+def test_routes_to_the_fastest_combination_that_meets_the_target():
+    router = SegmentRouter(target_score=50.0).fit(results([
+        ('ana', 'llama3.1', 80.0, measured(9.0)), ('luis', 'llama3.1', 70.0, measured(9.0)),
+        ('ana', 'mistral', 60.0, measured(3.0)), ('luis', 'mistral', 55.0, measured(3.0)),
+        ('eva', 'mistral', 20.0, measured(3.0)),
+    ]), SEGMENTS)
+
+    decision = router.route('Evasivo')
+    assert (decision.model_name, decision.meets_target) == ('mistral', True)
+    assert decision.baseline_latency == 3.0
+    # Ningún resultado alcanza el objetivo en el segmento pequeño: se usan todos y gana el mejor score
+    assert router.route('Receptivo alto', target_score=90.0).model_name == 'llama3.1'
+
+
+def test_cache_hits_do_not_count_as_latency():
+    router = SegmentRouter(target_score=50.0).fit(results([
+        ('ana', 'llama3.1', 80.0, {'latency': 0.001, 'total_duration': 0}),
+        ('luis', 'llama3.1', 80.0, measured(9.0)),
+        ('ana', 'mistral', 60.0, measured(3.0)), ('luis', 'mistral', 60.0, measured(3.0)),
+    ]), SEGMENTS)
+
+    decision = router.route('Evasivo')
+    assert decision.model_name == 'mistral'
+    assert router.candidates('Evasivo').set_index('model_name').loc['llama3.1', 'latency'] == 9.0
+
+
+def test_missing_latencies_fall_back_to_the_score():
+    router = SegmentRouter(target_score=50.0).fit(results([
+        ('ana', 'llama3.1', 80.0, None), ('luis', 'llama3.1', 75.0, math.nan),
+        ('ana', 'mistral', 60.0, None), ('luis', 'mistral', 60.0, {'latency': 0.001, 'total_duration': 0}),
+    ]), SEGMENTS)
+
+    decision = router.route('Evasivo')
+    assert decision.model_name == 'llama3.1'
+    assert decision.to_dict()['expected_latency'] is None
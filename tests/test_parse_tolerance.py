@@ -0,0 +1,83 @@
+import json
+
+import pandas as pd
+import pytest
+
+from utils import common
+from utils.llms.json_parsing import coerce_flashcard, missing_fields, parse_flashcard
+from utils.llms.llm_handling import FLASHCARD_FIELDS, merge_llm_stats
+from utils.llms.mock_ollama import MOCK_FLASHCARD
+
+NULL_FLASHCARD = {
+    "nivel_presion": None,
+    "tipificacion_operativa": None,
+    "primer_dialogo": "Buenas tardes, le llamamos por su deuda.",
+    "accion_si_responde_si": None,
+    "accion_si_responde_no": 3,
+    "acciones_a_evitar": None,
+    "ultimo_contacto": "2025-05-13",
+    "canal": "CallCenter",
+    "comentario": {"texto": "no es string"},
+    "canal_recomendado": "CallCenter",
+    "cliente": None
+}
+INVALID_FIELDS = ['nivel_presion', 'tipificacion_operativa', 'accion_si_responde_si', 'accion_si_responde_no',
+                  'acciones_a_evitar', 'comentario', 'cliente']
+
+
+def first_customer() -> str:
+    with open(common.JSON_PATH, 'r', encoding='utf-8') as data:
+        return next(iter(json.load(data)))
+
+
+def test_missing_fields_counts_wrong_types():
+    assert missing_fields(NULL_FLASHCARD, FLASHCARD_FIELDS) == INVALID_FIELDS
+
+
+def test_coerce_flashcard_empties_wrong_types():
+    coerced = coerce_flashcard({**NULL_FLASHCARD, 'acciones_a_evitar': ['Presionar', None]}, FLASHCARD_FIELDS)
+    assert coerced['nivel_presion'] == '' and coerced['accion_si_responde_no'] == '' and coerced['comentario'] == ''
+    assert coerced['acciones_a_evitar'] == ['Presionar']
+    assert coerced['primer_dialogo'] == NULL_FLASHCARD['primer_dialogo']
+
+
+def test_null_fields_are_scored_as_empty_after_retries(mock_ollama):
+    # El modelo repite los nulls también en los reintentos: la celda se evalúa igual, sin abortar el grid
+    server = mock_ollama(response=NULL_FLASHCARD)
+    result = common.process_single_customer(first_customer(), common.PROMPT_VARIATIONS_V1[0], model_name="mistral")
+
+    metadata = result['metadata']
+    assert metadata['parse_retries'] == common.MAX_PARSE_RETRIES
+    assert metadata['missing_fields'] == INVALID_FIELDS
+    assert server.request_counts['/api/chat'] == 1 + common.MAX_PARSE_RETRIES
+    assert result['flashcard']['nivel_presion'] == '' and result['flashcard']['acciones_a_evitar'] == []
+    assert 0 <= result['academic_scores'] <= 100
+
+    quality = common.summarize_parse_quality(pd.DataFrame([result]))
+    assert quality['incomplete_rate'].iloc[0] == 1.0
+
+
+@pytest.mark.parametrize('text, expected', [
+    ("{'cliente': 'Receptivo alto', 'canal': 'CallCen", {'cliente': 'Receptivo alto', 'canal': 'CallCen'}),
+    ("{'primer_dialogo': 'Dijo \"hola\" y', 'canal': 'Call", {'primer_dialogo': 'Dijo "hola" y', 'canal': 'Call'}),
+    ('{"cliente": "Receptivo, it\'s ok", "canal": "Call', {'cliente': "Receptivo, it's ok", 'canal': 'Call'}),
+])
+def test_truncated_objects_keep_their_last_field(text, expected):
+    assert parse_flashcard(text) == expected
+
+
+def test_retry_stats_keep_metrics_missing_from_either_call():
+    first = {'latency': 1.0, 'eval_count': 10, 'queue_seconds': 0.5}
+    retry = {'latency': 0.5, 'eval_count': 4, 'load_duration': 2.0}
+    assert merge_llm_stats(first, retry) == {'latency': 1.5, 'eval_count': 14, 'queue_seconds': 0.5, 'load_duration': 2.0}
+
+
+def test_verbose_report_scores_like_the_pipeline(mock_ollama):
+    mock_ollama(response=MOCK_FLASHCARD)
+    result = common.process_single_customer(first_customer(), common.PROMPT_VARIATIONS_V1[0], verbose_report=True)
+
+    cell = common.prepare_customer_cell(first_customer(), common.load_json_data()[first_customer()],
+                                        common.PROMPT_VARIATIONS_V1[0])
+    cell.update(llm_response=result['flashcard'])
+    assert common.evaluate_cell(cell)['score'] == result['academic_scores']
+    assert result['evaluation_report']
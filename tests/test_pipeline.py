@@ -0,0 +1,112 @@
+import threading
+
+import pytest
+
+from utils.execution.pipeline import Pipeline, PipelineAborted, Stage
+from utils.llms.model_scheduler import ModelAffinityScheduler, build_grid_cells
+
+
+class Fatal(BaseException):
+    pass
+
+
+def run_with_deadline(pipeline: Pipeline, items, seconds: float = 5.0):
+    """Corre el pipeline en otro hilo: si se cuelga, el test falla en vez de bloquearse."""
+    outcome = {}
+
+    def target():
+        try:
+            outcome['outputs'] = pipeline.run(items)
+        except BaseException as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(seconds)
+    assert not thread.is_alive(), "el pipeline quedó bloqueado"
+    return outcome
+
+
+def fail_on(value):
+    def fn(item):
+        if item == value:
+            raise ValueError(f"falla {item}")
+        return item * 10
+    return fn
+
+
+def test_failing_stage_drops_only_that_item():
+    errors = []
+    pipeline = Pipeline([Stage('double', lambda item: item * 2), Stage('scale', fail_on(4), workers=2)],
+                        queue_size=1, on_error=lambda stage, item, error: errors.append((stage, item)))
+
+    outcome = run_with_deadline(pipeline, range(5))
+
+    assert sorted(outcome['outputs']) == [0, 20, 60, 80]
+    assert errors == [('scale', 4)]
+    assert [(stage['processed'], stage['errors']) for stage in pipeline.report()] == [(5, 0), (4, 1)]
+
+
+@pytest.mark.parametrize('fatal_in', ['stage', 'on_error'])
+def test_fatal_errors_abort_without_hanging(fatal_in):
+    reported = []
+
+    def stage(item):
+        if item == 2 and fatal_in == 'stage':
+            raise Fatal()
+        return fail_on(2)(item)
+
+    def on_error(stage_name, item, error):
+        reported.append((stage_name, item, type(error)))
+        if fatal_in == 'on_error' and not isinstance(error, PipelineAborted):
+            raise RuntimeError("on_error roto")
+
+    pipeline = Pipeline([Stage('first', stage), Stage('last', lambda item: item)], queue_size=1, on_error=on_error)
+    outcome = run_with_deadline(pipeline, range(50))
+
+    assert isinstance(outcome['error'], Fatal if fatal_in == 'stage' else RuntimeError)
+    # El item que falló y los que quedaban en las colas se informan; el resto no llegó a encolarse
+    assert ('first', 2, PipelineAborted if fatal_in == 'stage' else ValueError) in reported
+    first = pipeline.report()[0]
+    assert first['processed'] + first['errors'] < 50
+
+
+class RecordingScheduler(ModelAffinityScheduler):
+    def __init__(self, events):
+        super().__init__()
+        self.events = events
+
+    def preload(self, model_name):
+        self.events.append(('preload', model_name))
+        return 0.0
+
+    def unload(self, model_name):
+        self.events.append(('unload', model_name))
+
+
+def test_stream_unloads_each_model_after_its_block_finishes():
+    events = []
+    scheduler = RecordingScheduler(events)
+    cells = build_grid_cells(['ana', 'luis', 'eva'], ['llama3.1', 'mistral'], ['a', 'b'])
+
+    def generate(cell):
+        if cell.customer_name == 'eva' and cell.prompt_variation == 'b':
+            raise ValueError("falla")
+        events.append(('generate', cell.model_name))
+        return cell
+
+    def parse(cell):
+        scheduler.release()
+        return cell
+
+    pipeline = Pipeline([Stage('generate', generate, workers=3), Stage('parse', parse)], queue_size=2,
+                        on_error=lambda stage, item, error: scheduler.release())
+    outcome = run_with_deadline(pipeline, scheduler.stream(cells))
+
+    assert len(outcome['outputs']) == 10
+    # Nunca se genera con un modelo que no es el del bloque en curso
+    assert [event for event in events if event[0] != 'generate'] == [
+        ('preload', 'llama3.1'), ('unload', 'llama3.1'), ('preload', 'mistral'), ('unload', 'mistral')]
+    unload_llama = events.index(('unload', 'llama3.1'))
+    assert all(model == 'llama3.1' for kind, model in events[:unload_llama] if kind == 'generate')
+    assert all(model == 'mistral' for kind, model in events[unload_llama:] if kind == 'generate')
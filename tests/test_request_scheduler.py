@@ -0,0 +1,111 @@
+import threading
+import time
+
+import pytest
+
+from utils.execution.pipeline import Pipeline, Stage
+from utils.llms.model_scheduler import ModelAffinityScheduler, build_grid_cells
+from utils.llms.request_scheduler import (PriorityRequestScheduler, default_priority, get_default_priority,
+                                          set_default_priority)
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'llm_scheduler.sqlite')
+
+
+@pytest.fixture
+def process_priority():
+    previous = set_default_priority('interactive')
+    yield
+    set_default_priority(previous)
+
+
+def test_default_priority_is_scoped_to_its_call(process_priority):
+    inside, release = threading.Barrier(2), threading.Event()
+    seen = {}
+
+    @default_priority('tuning')
+    def tuning_run():
+        inside.wait()
+        release.wait(5)
+        seen['tuning'] = get_default_priority()
+
+    thread = threading.Thread(target=tuning_run)
+    thread.start()
+    inside.wait()
+    # Mientras la corrida de tuning está en curso, el resto del proceso conserva su clase
+    seen['api'] = get_default_priority()
+    release.set()
+    thread.join()
+
+    assert seen == {'tuning': 'tuning', 'api': 'interactive'}
+    assert get_default_priority() == 'interactive'
+    with pytest.raises(ValueError):
+        with default_priority('urgente'):
+            pass
+
+
+def test_threads_launched_inside_inherit_the_priority(process_priority):
+    seen = []
+
+    def record(item):
+        seen.append(get_default_priority())
+        return {}
+
+    with default_priority('batch'):
+        Pipeline([Stage('record', record, workers=2)]).run(range(4))
+        ModelAffinityScheduler(model_major=False).run(build_grid_cells(['ana', 'luis'], ['mistral'], ['a']),
+                                                       record, workers=2)
+
+    assert seen == ['batch'] * 6
+
+
+def test_slow_calls_keep_their_slot_past_the_lease(db_path):
+    holder = PriorityRequestScheduler(db_path, capacity=1, lease_seconds=0.3, poll_interval=0.01)
+    other = PriorityRequestScheduler(db_path, capacity=1, lease_seconds=0.3, poll_interval=0.01)
+
+    slot_id, _ = holder.acquire('batch')
+    time.sleep(0.9)
+    # El heartbeat renovó el lease: el slot sigue ocupado aunque pasaron varios lease_seconds
+    with pytest.raises(TimeoutError):
+        other.acquire('interactive', timeout=0.2)
+
+    holder.release(slot_id)
+    with other.slot('interactive', timeout=1.0):
+        assert other.report()['classes']['interactive']['in_flight'] == 1
+
+
+def test_abandoned_slots_expire(db_path):
+    holder = PriorityRequestScheduler(db_path, capacity=1, lease_seconds=0.2, poll_interval=0.01)
+    other = PriorityRequestScheduler(db_path, capacity=1, lease_seconds=0.2, poll_interval=0.01)
+
+    slot_id, _ = holder.acquire('batch')
+    # Simula un proceso muerto: nadie renueva ni libera el slot
+    with holder._held_lock:
+        holder._held.discard(slot_id)
+    slot_id, queue_seconds = other.acquire('interactive', timeout=2.0)
+    other.release(slot_id)
+    assert queue_seconds > 0.1
+
+
+def test_higher_priority_waiters_go_first(db_path):
+    scheduler = PriorityRequestScheduler(db_path, capacity=1, poll_interval=0.01, slos={'interactive': None})
+    granted = []
+
+    def wait_for_slot(priority):
+        with scheduler.slot(priority, timeout=5.0):
+            granted.append(priority)
+
+    slot_id, _ = scheduler.acquire('batch')
+    waiters = []
+    for priority in ('tuning', 'interactive'):
+        waiters.append(threading.Thread(target=wait_for_slot, args=(priority,)))
+        waiters[-1].start()
+        while scheduler.report()['classes'][priority]['waiting'] == 0:
+            time.sleep(0.01)
+    scheduler.release(slot_id)
+    for thread in waiters:
+        thread.join()
+
+    assert granted == ['interactive', 'tuning']
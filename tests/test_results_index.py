@@ -0,0 +1,38 @@
+import gc
+import weakref
+
+import pandas as pd
+
+from utils.analysis.results_index import ResultsIndex
+
+
+def write_results(path, names):
+    pd.DataFrame({
+        'customer_name': names,
+        'flashcard': [str({'cliente': name}) for name in names],
+        'academic_scores': list(range(len(names), 0, -1)),
+        'metadata': ['{}'] * len(names)
+    }).to_csv(path, index=False)
+
+
+def test_names_keep_the_csv_order(tmp_path):
+    path = tmp_path / 'best_combinations_v1.csv'
+    write_results(path, ['Zoe Ruiz', 'Ana Perez', 'Luis Ruiz', 'Ana Perez'])
+    index = ResultsIndex(str(path))
+
+    assert index.customer_names == ['Zoe Ruiz', 'Ana Perez', 'Luis Ruiz']
+    assert index.search(' ruiz ') == ('Zoe Ruiz', 'Luis Ruiz')
+    assert index.page('', page=2, page_size=2) == (['Luis Ruiz'], 3, 2)
+    assert index.get('Ana Perez')['flashcard'] == {'cliente': 'Ana Perez'}
+
+
+def test_replaced_indexes_are_released(tmp_path):
+    path = tmp_path / 'best_combinations_v1.csv'
+    write_results(path, ['Ana Perez'])
+    index = ResultsIndex(str(path))
+    index.search('ana')
+    reference = weakref.ref(index)
+
+    del index
+    gc.collect()
+    assert reference() is None
@@ -0,0 +1,71 @@
+import math
+
+import numpy as np
+import pytest
+
+from utils.analysis.score_matrix import ScoreMatrix
+
+METRICS = ['semantic_similarity', 'contextual_relevance']
+
+
+def result(customer: str, scores, model: str = 'mistral', variation: str = 'step_by_step', options: str = None) -> dict:
+    metadata = {'model_name': model, 'prompt_variation': variation}
+    if options is not None:
+        metadata['options_name'] = options
+    return {'customer_name': customer, 'metric_scores': dict(zip(METRICS, scores)), 'metadata': metadata}
+
+
+def test_reweight_normalizes_weights_to_the_0_100_scale():
+    matrix = ScoreMatrix.from_results([result('ana', [0.2, 0.8])], METRICS)
+    assert matrix.reweight({'semantic_similarity': 1, 'contextual_relevance': 3})[0] == pytest.approx(65.0)
+    assert matrix.reweight({'semantic_similarity': 1})[0] == pytest.approx(20.0)
+    with pytest.raises(ValueError):
+        matrix.reweight({'desconocida': 1})
+
+
+def test_best_keeps_the_first_row_on_ties():
+    matrix = ScoreMatrix.from_results([
+        result('ana', [0.5, 0.5], variation='a'),
+        result('luis', [0.9, 0.9], variation='a'),
+        result('ana', [0.5, 0.5], variation='b'),
+        result('ana', [0.1, 0.1], variation='c'),
+    ], METRICS)
+    winners, scores = matrix.best([1, 1])
+    assert matrix.rows[winners].tolist() == [0, 1]
+    assert scores.tolist() == pytest.approx([50.0, 90.0])
+
+
+def test_best_skips_nan_rows_and_keeps_all_nan_customers():
+    matrix = ScoreMatrix.from_results([
+        result('ana', [math.nan, 0.9], variation='a'),
+        result('ana', [0.4, 0.4], variation='b'),
+        result('luis', [math.nan, math.nan], variation='a'),
+        result('luis', [0.3, math.nan], variation='b'),
+    ], METRICS)
+    best = matrix.best_combinations([1, 1])
+
+    assert len(best) == matrix.n_customers == 2
+    best = best.set_index('customer_name')
+    assert best['row'].to_dict() == {'ana': 1, 'luis': 2}
+    assert math.isnan(best.loc['luis', 'academic_scores'])
+
+
+def test_options_are_part_of_the_combination(tmp_path):
+    matrix = ScoreMatrix.from_results([
+        result('ana', [0.4, 0.4]),
+        result('ana', [0.8, 0.8], options='greedy'),
+    ], METRICS)
+    assert matrix.combos == [('mistral', 'step_by_step', 'default'), ('mistral', 'step_by_step', 'greedy')]
+    assert matrix.best_combinations([1, 1])['options_name'].tolist() == ['greedy']
+
+    path = str(tmp_path / 'score_matrix.npz')
+    matrix.save(path)
+    assert ScoreMatrix.load(path).combos == matrix.combos
+
+
+def test_load_accepts_matrices_saved_without_options(tmp_path):
+    path = str(tmp_path / 'score_matrix.npz')
+    np.savez(path, metric_names=np.array(METRICS), scores=np.array([[0.5, 0.5]]), customer_codes=np.array([0]),
+             combo_codes=np.array([0]), rows=np.array([0]), customers=np.array(['ana']),
+             combos=np.array([('mistral', 'step_by_step')]))
+    assert ScoreMatrix.load(path).combos == [('mistral', 'step_by_step', 'default')]
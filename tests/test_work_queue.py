@@ -0,0 +1,49 @@
+import pytest
+
+from utils.execution.work_queue import SQLiteWorkQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return SQLiteWorkQueue(str(tmp_path / 'work_queue.sqlite'), max_attempts=2)
+
+
+def test_expired_lease_is_retried_and_the_old_owner_cannot_complete(queue):
+    queue.enqueue('run', [{'cell': 0}])
+    first = queue.lease('w1', lease_seconds=-1, run_id='run')
+
+    second = queue.lease('w2', run_id='run')
+    assert (second['id'], second['attempts']) == (first['id'], 2)
+    assert not queue.complete(first['id'], 'w1', {'by': 'w1'})
+    assert queue.complete(second['id'], 'w2', {'by': 'w2'})
+    assert queue.results('run') == [{'by': 'w2'}]
+    assert queue.is_finished('run')
+
+
+def test_failures_go_back_to_pending_until_attempts_run_out(queue):
+    queue.enqueue('run', [{'cell': 0}])
+    for attempt in (1, 2):
+        task = queue.lease('w1', run_id='run')
+        assert task['attempts'] == attempt
+        queue.fail(task['id'], 'w1', f"error {attempt}")
+
+    assert queue.lease('w1', run_id='run') is None
+    assert queue.progress('run')['failed'] == 1
+    assert [(failure['attempts'], failure['error']) for failure in queue.failures('run')] == [(2, 'error 2')]
+
+
+def test_exhausted_expired_leases_finish_the_run_without_workers(queue):
+    queue.enqueue('run', [{'cell': 0}, {'cell': 1}])
+    for _ in range(2):
+        task = queue.lease('w1', lease_seconds=-1, run_id='run')
+    queue.complete(queue.lease('w2', run_id='run')['id'], 'w2', {'cell': 1})
+
+    # Una tarea vencida con intentos restantes sigue pendiente de reintento
+    queue.enqueue('otra', [{'cell': 0}])
+    queue.lease('w1', lease_seconds=-1, run_id='otra')
+    assert not queue.is_finished('otra')
+
+    # Los workers murieron: nadie vuelve a llamar a lease(), pero la corrida termina igual
+    assert task['attempts'] == 2
+    assert queue.is_finished('run')
+    assert [failure['error'] for failure in queue.failures('run')] == ['lease expirado']
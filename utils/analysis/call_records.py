@@ -0,0 +1,132 @@
+from array import array
+from datetime import date
+from collections.abc import Mapping
+from typing import TYPE_CHECKING, Dict, Iterator, List, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Orden de campos de un registro normalizado (el mismo que produce `_process_call`)
+CALL_FIELDS = ('Cartera', 'Documento', 'Deudor', 'Fecha_Gestion', 'Observaciones', 'Detalle_Resultado', 'Motivo')
+
+# Campos repetidos entre registros: se guardan una vez en un pool y cada registro solo lleva el código
+POOLED_FIELDS = ('Cartera', 'Documento', 'Deudor', 'Detalle_Resultado', 'Motivo')
+
+
+class StringPool:
+    """Valores únicos de una columna categórica (código int <-> valor)."""
+
+    __slots__ = ('values', '_codes')
+
+    def __init__(self):
+        self.values: List = []
+        self._codes: Dict = {}
+
+    def encode(self, value) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class CallView(Mapping):
+    """Registro de llamada de solo lectura sobre una fila de `CallStore`; se usa igual que el dict original."""
+
+    __slots__ = ('_store', '_row')
+
+    def __init__(self, store: 'CallStore', row: int):
+        self._store = store
+        self._row = row
+
+    def __getitem__(self, field: str):
+        return self._store.value(self._row, field)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(CALL_FIELDS)
+
+    def __len__(self) -> int:
+        return len(CALL_FIELDS)
+
+    @property
+    def day(self) -> int:
+        """Fecha de gestión como número de día (date.toordinal)."""
+        return self._store.days[self._row]
+
+    def to_dict(self) -> Dict:
+        return {field: self[field] for field in CALL_FIELDS}
+
+    def __repr__(self) -> str:
+        return f"CallView({self.to_dict()!r})"
+
+
+class CallStore:
+    """
+    Registros de llamadas en columnas: códigos int32 para los campos repetidos (`POOLED_FIELDS`),
+    fechas como número de día int32 y observaciones en un único buffer UTF-8 con offsets. Los
+    deudores ocupan rangos contiguos de filas, en el orden en que se agregan. Las fechas válidas
+    pero no canónicas (p.ej. '2025-5-3') guardan además el texto original, que es el que se muestra.
+    """
+
+    def __init__(self):
+        self.pools = {field: StringPool() for field in POOLED_FIELDS}
+        self.codes = {field: array('i') for field in POOLED_FIELDS}
+        self.days = array('i')
+        self._raw_dates: Dict[int, str] = {}
+        self._text = bytearray()
+        self._text_offsets = array('q', [0])
+        self.customers: Dict[str, int] = {}
+        self._starts = array('i')
+        self._stops = array('i')
+        # (campo, encode del pool, append de la columna) para no buscar en dicts por cada registro
+        self._encoders = [(field, self.pools[field].encode, self.codes[field].append) for field in POOLED_FIELDS]
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    def append(self, call: Dict, day: int, observaciones: str) -> int:
+        for field, encode, append_code in self._encoders:
+            append_code(encode(call.get(field, '')))
+        fecha = call.get('Fecha_Gestion', '')
+        if date.fromordinal(day).isoformat() != fecha:
+            self._raw_dates[len(self.days)] = fecha
+        self.days.append(day)
+        self._text += observaciones.encode('utf-8')
+        self._text_offsets.append(len(self._text))
+        return len(self.days) - 1
+
+    def add_customer(self, name: str, start: int):
+        self.customers[name] = len(self._starts)
+        self._starts.append(start)
+        self._stops.append(len(self.days))
+
+    def value(self, row: int, field: str):
+        if field == 'Fecha_Gestion':
+            return self._raw_dates.get(row) or date.fromordinal(self.days[row]).isoformat()
+        if field == 'Observaciones':
+            return self._text[self._text_offsets[row]:self._text_offsets[row + 1]].decode('utf-8')
+        return self.pools[field].values[self.codes[field][row]]
+
+    def calls(self, name: str) -> List[CallView]:
+        index = self.customers[name]
+        return [CallView(self, row) for row in range(self._starts[index], self._stops[index])]
+
+    def items(self) -> Iterator[Tuple[str, List[CallView]]]:
+        for name in self.customers:
+            yield name, self.calls(name)
+
+    def column(self, field: str) -> 'np.ndarray':
+        """Códigos (o números de día, para Fecha_Gestion) de un campo como array int32, sin copiar."""
+        import numpy as np
+        return np.frombuffer(self.days if field == 'Fecha_Gestion' else self.codes[field], dtype=np.int32)
+
+    def customer_ranges(self) -> Tuple[List[str], 'np.ndarray', 'np.ndarray']:
+        """Nombres y rangos de filas [start, stop) de cada deudor, en orden de inserción."""
+        import numpy as np
+        index = np.fromiter(self.customers.values(), dtype=np.int64, count=len(self.customers))
+        starts = np.frombuffer(self._starts, dtype=np.int32)[index].astype(np.int64)
+        stops = np.frombuffer(self._stops, dtype=np.int32)[index].astype(np.int64)
+        return list(self.customers), starts, stops
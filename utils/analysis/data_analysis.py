@@ -1,10 +1,16 @@
 import re
 import json
 from enum import Enum
-from datetime import datetime
-from typing import Dict, List, Optional
+from collections import Counter
+from datetime import date, datetime
+from typing import TYPE_CHECKING, Dict, List, Optional
 from dataclasses import dataclass, asdict
 
+from .call_records import CallStore
+
+if TYPE_CHECKING:
+    import pandas as pd
+
 
 class CallCenterDataProcessor:    
     def __init__(self, max_history_calls: int = 5):
@@ -32,12 +38,102 @@ class CallCenterDataProcessor:
                 
         return cleaned_data
     
+    def build_call_store(self, raw_data: Dict, clean_names: bool = True) -> CallStore:
+        """
+        Mismo resultado que clean_and_normalize_data, pero en columnas (ver call_records): sin un
+        dict por llamada y con los valores repetidos guardados una sola vez. Con `clean_names=False`
+        los deudores quedan con el nombre original de `raw_data`.
+        Única diferencia: las llamadas se ordenan por número de día y clean_and_normalize_data compara
+        el texto de la fecha. Con fechas sin ceros ('2025-10-1' vs '2025-9-30') aquí el orden es el
+        cronológico y puede cambiar cuáles son la última llamada y las `max_history_calls` conservadas;
+        con fechas ISO (las del CRM) coinciden. La fecha se muestra siempre con el texto original.
+        """
+        store = CallStore()
+        for deudor_name, calls in raw_data.items():
+            dated_calls = []
+            for call in calls:
+                day = self._day_number(call.get('Fecha_Gestion', ''))
+                if day is not None:
+                    dated_calls.append((day, call))
+
+            # fecha mas reciente
+            dated_calls.sort(key=lambda item: item[0], reverse=True)
+            dated_calls = dated_calls[:self.max_history_calls]
+
+            if dated_calls:
+                start = len(store)
+                for day, call in dated_calls:
+                    store.append(call, day, self._clean_text(call.get('Observaciones', '')))
+                store.add_customer(self._clean_name(deudor_name) if clean_names else deudor_name, start)
+
+        return store
+
+    def process_call_store(self, store: CallStore, name: str) -> Dict:
+        """Equivalente a process_user_json para un deudor del store (las llamadas son vistas de solo lectura)."""
+        calls = store.calls(name)
+        return {
+            'calls': calls,
+            'summary': self.get_customer_summary(calls)
+        }
+
+    def summarize_call_store(self, store: CallStore) -> 'pd.DataFrame':
+        """
+        get_customer_summary de todos los deudores del store a la vez, con operaciones agrupadas de
+        NumPy sobre las columnas (los deudores son rangos contiguos de filas). Devuelve una tabla
+        indexada por deudor con los mismos valores que la versión escalar (sin `ultima_llamada`).
+        """
+        import numpy as np
+        import pandas as pd
+
+        names, starts, stops = store.customer_ranges()
+        total = stops - starts
+
+        # Sin compromiso: se evalúa una vez por valor distinto de Detalle_Resultado
+        detalle_values = store.pools['Detalle_Resultado'].values
+        sin_compromiso_value = np.array(['sin compromiso' in value.lower() for value in detalle_values], dtype=np.int64)
+        sin_compromiso_rows = np.concatenate(([0], np.cumsum(sin_compromiso_value[store.column('Detalle_Resultado')])))
+        sin_compromiso_count = sin_compromiso_rows[stops] - sin_compromiso_rows[starts]
+        receptivity_ratio = 1 - (sin_compromiso_count / total)
+        customer_type = np.select([receptivity_ratio >= 0.7, receptivity_ratio >= 0.4],
+                                  ["Receptivo alto", "Receptivo moderado"], "Evasivo")
+
+        # Motivo frecuente: conteo por (deudor, motivo); empate -> primera aparición (llamada más reciente)
+        group = np.repeat(np.arange(len(names)), total)
+        rows = np.arange(total.sum()) + np.repeat(starts - (np.cumsum(total) - total), total)
+        motivo_codes = store.column('Motivo')[rows].astype(np.int64)
+        pair = group * max(1, len(store.pools['Motivo'])) + motivo_codes
+        unique_pairs, first_position, counts = np.unique(pair, return_index=True, return_counts=True)
+        pair_group = group[first_position]
+        best = np.lexsort((first_position, -counts, pair_group))
+        best = best[np.diff(pair_group[best], prepend=-1) != 0]
+        motivo_values = np.empty(len(store.pools['Motivo']), dtype=object)
+        motivo_values[:] = store.pools['Motivo'].values
+        motivo_frecuente = motivo_values[motivo_codes[first_position[best]]]
+
+        # Patrón de fechas: la suma de intervalos consecutivos es primera - última fecha
+        days = store.column('Fecha_Gestion').astype(np.int64)
+        span = days[starts] - days[stops - 1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            promedio_intervalo = span / (total - 1)
+        patron_fechas = np.select([total < 2, promedio_intervalo <= 7, promedio_intervalo <= 30],
+                                  ["Historial insuficiente", "Llamadas frecuentes (semanal)", "Llamadas regulares (mensual)"],
+                                  "Llamadas esporádicas")
+
+        return pd.DataFrame({
+            'total_llamadas': total,
+            'sin_compromiso_count': sin_compromiso_count,
+            'receptivity_ratio': receptivity_ratio,
+            'customer_type': customer_type,
+            'motivo_frecuente': motivo_frecuente,
+            'patron_fechas': patron_fechas
+        }, index=pd.Index(names, name='customer_name'))
+
     def get_customer_summary(self, customer_data: List[Dict]) -> Dict:
         if not customer_data:
             return {}
         
-        # Info basica
-        last_call = customer_data[0]
+        # Info basica (copia como dict: el resumen se serializa a JSON en los prompts)
+        last_call = dict(customer_data[0])
         total_calls = len(customer_data)
         
         # Analisis de patrones
@@ -54,9 +150,9 @@ class CallCenterDataProcessor:
         else:
             customer_type = "Evasivo"
         
-        # Motivo frecuente
-        motivos = [call.get('Motivo', '') for call in customer_data]
-        motivo_frecuente = max(set(motivos), key=motivos.count) if motivos else ""
+        # Motivo frecuente (empate: el de la llamada más reciente)
+        motivos = Counter(call.get('Motivo', '') for call in customer_data)
+        motivo_frecuente = motivos.most_common(1)[0][0] if motivos else ""
         
         return {
             'ultima_llamada': last_call,
@@ -100,6 +196,19 @@ class CallCenterDataProcessor:
         except ValueError:
             return False
     
+    def _day_number(self, date_str: str) -> Optional[int]:
+        # fromisoformat es mucho más rápido; strptime solo para fechas válidas no canónicas (p.ej. sin ceros)
+        try:
+            day = date.fromisoformat(date_str)
+            if day.isoformat() == date_str:
+                return day.toordinal()
+        except (ValueError, TypeError):
+            pass
+        try:
+            return datetime.strptime(date_str, '%Y-%m-%d').toordinal()
+        except (ValueError, TypeError):
+            return None
+
     def _clean_text(self, text: str) -> str:
         if not text:
             return ""
@@ -0,0 +1,24 @@
+import json
+import hashlib
+from typing import Dict, List, Optional
+
+
+def history_fingerprint(normalized_calls: List[Dict], model_name: str, prompt_variation: str, version: int,
+                        prompt_template: str = '', system_prompt: str = '', generation_options: Optional[Dict] = None,
+                        compact_output: bool = False) -> str:
+    """
+    Huella del historial normalizado de un deudor (salida de `clean_and_normalize_data`) junto con
+    todo lo que define la generación: modelo/variación, versión de prompts, texto de la plantilla
+    de la variación, system prompt, opciones de Ollama y modo compacto. Si no cambia, la flashcard tampoco.
+    """
+    payload = json.dumps({
+        'calls': normalized_calls,
+        'model_name': model_name,
+        'prompt_variation': prompt_variation,
+        'version': version,
+        'prompt_template': prompt_template,
+        'system_prompt': system_prompt,
+        'generation_options': generation_options or {},
+        'compact_output': compact_output
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
@@ -0,0 +1,247 @@
+import json
+import math
+import sqlite3
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from ..llms.model_scheduler import DEFAULT_OPTIONS
+
+LEADERBOARD_PATH = 'results/leaderboard.sqlite'
+
+# Campos numéricos por los que se puede ordenar `query`
+ORDER_FIELDS = ('count', 'mean_score', 'score_variance', 'wins', 'latency_p50', 'latency_p95', 'latency_p99')
+
+
+class LatencySketch:
+    """
+    Sketch de cuantiles con error relativo acotado (buckets logarítmicos, estilo DDSketch):
+    O(1) por valor, tamaño proporcional al rango de latencias y serializable a JSON.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, buckets: Optional[Dict[int, int]] = None, zeros: int = 0):
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.buckets: Dict[int, int] = buckets or {}
+        self.zeros = zeros
+
+    @property
+    def count(self) -> int:
+        return self.zeros + sum(self.buckets.values())
+
+    def add(self, value: float):
+        if value <= 0:
+            self.zeros += 1
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        total = self.count
+        if not total:
+            return None
+        rank = q * (total - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                return 2 * self._gamma ** index / (self._gamma + 1)
+        return 2 * self._gamma ** max(self.buckets) / (self._gamma + 1)
+
+    def to_json(self) -> str:
+        return json.dumps({'alpha': self.relative_accuracy, 'zeros': self.zeros, 'buckets': self.buckets})
+
+    @classmethod
+    def from_json(cls, text: Optional[str]) -> 'LatencySketch':
+        if not text:
+            return cls()
+        data = json.loads(text)
+        return cls(data['alpha'], {int(index): n for index, n in data['buckets'].items()}, data['zeros'])
+
+
+class Leaderboard:
+    """
+    Agregados incrementales por (modelo, variación, versión) persistidos en SQLite: cantidad,
+    media/varianza de `academic_scores` (Welford), media por métrica, cuantiles de latencia y
+    victorias (combinación con mejor score de cada cliente). Cada resultado nuevo actualiza un
+    par de filas, sin volver a leer los resultados crudos. Con `run_id` cada (corrida, cliente,
+    combinación) se aplica una sola vez: repetir una celda o reingerir un CSV no cuenta doble.
+    Los scores NaN no entran en la media ni en las victorias.
+    """
+
+    def __init__(self, db_path: str = LEADERBOARD_PATH):
+        self.db_path = db_path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS aggregates (
+                    model_name TEXT NOT NULL,
+                    prompt_variation TEXT NOT NULL,
+                    version INTEGER NOT NULL,
+                    count INTEGER NOT NULL DEFAULT 0,
+                    mean REAL NOT NULL DEFAULT 0,
+                    m2 REAL NOT NULL DEFAULT 0,
+                    metric_counts TEXT NOT NULL DEFAULT '{}',
+                    metric_sums TEXT NOT NULL DEFAULT '{}',
+                    latency_sketch TEXT,
+                    wins INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (model_name, prompt_variation, version)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS customer_best (
+                    customer_name TEXT NOT NULL,
+                    version INTEGER NOT NULL,
+                    model_name TEXT NOT NULL,
+                    prompt_variation TEXT NOT NULL,
+                    score REAL NOT NULL,
+                    PRIMARY KEY (customer_name, version)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS applied_results (
+                    run_id TEXT NOT NULL,
+                    customer_name TEXT NOT NULL,
+                    model_name TEXT NOT NULL,
+                    prompt_variation TEXT NOT NULL,
+                    version INTEGER NOT NULL,
+                    PRIMARY KEY (run_id, customer_name, model_name, prompt_variation, version)
+                )
+            """)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def update(self, customer_name: str, model_name: str, prompt_variation: str, version: int, score: float,
+               metric_scores: Optional[Dict[str, float]] = None, latency: Optional[float] = None,
+               run_id: Optional[str] = None):
+        key = (model_name, prompt_variation, version)
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            if run_id is not None:
+                applied = conn.execute("INSERT OR IGNORE INTO applied_results VALUES (?, ?, ?, ?, ?)",
+                                       (run_id, customer_name) + key)
+                if applied.rowcount == 0:
+                    conn.execute("COMMIT")
+                    return
+            conn.execute("INSERT OR IGNORE INTO aggregates (model_name, prompt_variation, version) VALUES (?, ?, ?)", key)
+            row = conn.execute("""
+                SELECT count, mean, m2, metric_counts, metric_sums, latency_sketch FROM aggregates
+                WHERE model_name = ? AND prompt_variation = ? AND version = ?
+            """, key).fetchone()
+
+            # Welford: media y varianza en una pasada (un NaN dejaría la combinación en NaN para siempre)
+            scored = not math.isnan(score)
+            count, mean, m2 = row['count'], row['mean'], row['m2']
+            if scored:
+                count += 1
+                delta = score - mean
+                mean += delta / count
+                m2 += delta * (score - mean)
+
+            metric_counts, metric_sums = json.loads(row['metric_counts']), json.loads(row['metric_sums'])
+            for metric, value in (metric_scores or {}).items():
+                if value is None or math.isnan(value):
+                    continue
+                metric_counts[metric] = metric_counts.get(metric, 0) + 1
+                metric_sums[metric] = metric_sums.get(metric, 0.0) + value
+
+            sketch = row['latency_sketch']
+            if latency is not None:
+                latency_sketch = LatencySketch.from_json(sketch)
+                latency_sketch.add(latency)
+                sketch = latency_sketch.to_json()
+
+            conn.execute("""
+                UPDATE aggregates SET count = ?, mean = ?, m2 = ?, metric_counts = ?, metric_sums = ?, latency_sketch = ?
+                WHERE model_name = ? AND prompt_variation = ? AND version = ?
+            """, (count, mean, m2, json.dumps(metric_counts), json.dumps(metric_sums), sketch) + key)
+
+            # Victorias: la combinación con mejor score de cada cliente (por versión)
+            best = conn.execute("SELECT model_name, prompt_variation, score FROM customer_best WHERE customer_name = ? AND version = ?",
+                                (customer_name, version)).fetchone()
+            if scored and (best is None or score > best['score']):
+                if best is not None:
+                    conn.execute("UPDATE aggregates SET wins = wins - 1 WHERE model_name = ? AND prompt_variation = ? AND version = ?",
+                                 (best['model_name'], best['prompt_variation'], version))
+                conn.execute("UPDATE aggregates SET wins = wins + 1 WHERE model_name = ? AND prompt_variation = ? AND version = ?", key)
+                conn.execute("INSERT OR REPLACE INTO customer_best VALUES (?, ?, ?, ?, ?)",
+                             (customer_name, version, model_name, prompt_variation, score))
+            conn.execute("COMMIT")
+
+    def update_from_result(self, result: Dict, version: int, metric_scores: Optional[Dict[str, float]] = None,
+                           run_id: Optional[str] = None):
+        """
+        Atajo para los resultados de process_single_customer / all_results. Las celdas con opciones de
+        generación distintas de las por defecto se registran como `variación@opciones`.
+        """
+        metadata = result['metadata']
+        prompt_variation = metadata['prompt_variation']
+        if metadata.get('options_name', DEFAULT_OPTIONS) != DEFAULT_OPTIONS:
+            prompt_variation = f"{prompt_variation}@{metadata['options_name']}"
+        self.update(result['customer_name'], metadata['model_name'], prompt_variation, version,
+                    float(result['academic_scores']), metric_scores or result.get('metric_scores'),
+                    metadata.get('llm_stats', {}).get('latency'), run_id)
+
+    def ingest_csv(self, csv_path: str, version: int, run_id: Optional[str] = None) -> int:
+        """
+        Carga inicial desde un all_results_v*.csv existente (las filas antiguas no traen `metric_scores`).
+        Las filas se registran con `run_id` (por defecto, la ruta del CSV): reingerir el mismo archivo no
+        cuenta doble, pero un CSV de una corrida que ya actualizó el leaderboard en vivo sí.
+        """
+        import pandas as pd
+        from .results_index import parse_literal
+
+        df = pd.read_csv(csv_path)
+        if 'metric_scores' not in df.columns:
+            df['metric_scores'] = None
+        for row in df.itertuples(index=False):
+            metric_scores = parse_literal(row.metric_scores)
+            self.update_from_result({'customer_name': row.customer_name, 'academic_scores': row.academic_scores,
+                                     'metadata': parse_literal(row.metadata)}, version,
+                                    metric_scores if isinstance(metric_scores, dict) else None,
+                                    run_id or f"csv:{csv_path}")
+        return len(df)
+
+    def query(self, version: Optional[int] = None, order_by: str = 'mean_score', ascending: bool = False,
+              limit: Optional[int] = None) -> List[Dict]:
+        if order_by not in ORDER_FIELDS:
+            raise ValueError(f"No se puede ordenar por '{order_by}' (campos válidos: {', '.join(ORDER_FIELDS)})")
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT * FROM aggregates {'WHERE version = ?' if version is not None else ''}",
+                (version,) if version is not None else ()
+            ).fetchall()
+
+        board = []
+        for row in rows:
+            sketch = LatencySketch.from_json(row['latency_sketch'])
+            metric_counts, metric_sums = json.loads(row['metric_counts']), json.loads(row['metric_sums'])
+            board.append({
+                'model_name': row['model_name'],
+                'prompt_variation': row['prompt_variation'],
+                'version': row['version'],
+                'count': row['count'],
+                'mean_score': row['mean'],
+                'score_variance': row['m2'] / (row['count'] - 1) if row['count'] > 1 else 0.0,
+                'wins': row['wins'],
+                'latency_p50': sketch.quantile(0.5),
+                'latency_p95': sketch.quantile(0.95),
+                'latency_p99': sketch.quantile(0.99),
+                'metric_means': {metric: metric_sums[metric] / n for metric, n in metric_counts.items()}
+            })
+
+        board.sort(key=lambda entry: (entry[order_by] is None,
+                                      (entry[order_by] or 0) if ascending else -(entry[order_by] or 0)))
+        return board[:limit] if limit else board
@@ -0,0 +1,92 @@
+from typing import TYPE_CHECKING, Dict, List, Optional
+from ..llms.model_scheduler import DEFAULT_OPTIONS
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+CONFIGURATION_KEYS = ['model_name', 'prompt_variation', 'options_name']
+
+
+def summarize_configurations(results_df: 'pd.DataFrame', keys: List[str] = CONFIGURATION_KEYS) -> 'pd.DataFrame':
+    """
+    Una fila por configuración (modelo, variación, opciones de generación) con el score medio y lo
+    medido en cada celda: latencia media y p95, tokens de entrada/salida y tokens/s de generación
+    (sin las celdas respondidas por la caché).
+    """
+    import pandas as pd
+
+    # Las filas de corridas anteriores no traen opciones ni métricas de Ollama
+    metadata = pd.DataFrame(list(results_df['metadata'])).reindex(columns=keys + ['llm_stats', 'parse_failed'])
+    metadata['options_name'] = metadata['options_name'].fillna(DEFAULT_OPTIONS)
+    stats = (pd.DataFrame([m if isinstance(m, dict) else {} for m in metadata['llm_stats']], index=metadata.index)
+             .reindex(columns=['latency', 'total_duration', 'prompt_eval_count', 'eval_count', 'eval_duration']).astype(float))
+    # Respuestas de la caché (sin tiempo de Ollama): cuentan para el score pero no para latencia ni tokens
+    cached = stats['total_duration'] == 0
+    stats = stats.mask(cached)
+    df = pd.DataFrame({
+        **{key: metadata[key] for key in keys},
+        'score': pd.to_numeric(results_df['academic_scores'], errors='coerce').to_numpy(),
+        'latency': stats['latency'],
+        'prompt_tokens': stats['prompt_eval_count'],
+        'output_tokens': stats['eval_count'],
+        'eval_duration': stats['eval_duration'],
+        'parse_failed': metadata['parse_failed'].astype(float).fillna(0.0),
+        'cached': cached
+    })
+
+    summary = (df.groupby(keys, sort=False)
+               .agg(cells=('score', 'size'),
+                    mean_score=('score', 'mean'),
+                    min_score=('score', 'min'),
+                    mean_latency=('latency', 'mean'),
+                    p95_latency=('latency', lambda latency: latency.quantile(0.95)),
+                    mean_prompt_tokens=('prompt_tokens', 'mean'),
+                    mean_output_tokens=('output_tokens', 'mean'),
+                    output_tokens=('output_tokens', 'sum'),
+                    eval_duration=('eval_duration', 'sum'),
+                    parse_failure_rate=('parse_failed', 'mean'),
+                    cached_cells=('cached', 'sum'))
+               .reset_index())
+    summary['tokens_per_second'] = summary['output_tokens'] / summary['eval_duration'].where(summary['eval_duration'] > 0)
+    return summary.drop(columns=['output_tokens', 'eval_duration'])
+
+
+def pareto_frontier(summary: 'pd.DataFrame', quality: str = 'mean_score', cost: str = 'mean_latency') -> 'pd.Series':
+    """
+    Máscara de las configuraciones no dominadas: ninguna otra tiene más calidad con igual o menos costo.
+    Las que no tienen costo medido (solo celdas de la caché) quedan fuera.
+    """
+    ordered = summary.dropna(subset=[cost]).sort_values([cost, quality], ascending=[True, False])
+    best_before = ordered[quality].cummax().shift(fill_value=float('-inf'))
+    return (ordered[quality] > best_before).reindex(summary.index, fill_value=False)
+
+
+def pareto_report(results_df: 'pd.DataFrame', quality: str = 'mean_score', cost: str = 'mean_latency') -> 'pd.DataFrame':
+    """Resumen por configuración con la columna `pareto`, ordenado de la más rápida a la más lenta."""
+    summary = summarize_configurations(results_df)
+    summary['pareto'] = pareto_frontier(summary, quality, cost)
+    return summary.sort_values([cost, quality], ascending=[True, False]).reset_index(drop=True)
+
+
+def fastest_within(report: 'pd.DataFrame', tolerance: float = 1.0, quality: str = 'mean_score',
+                   cost: str = 'mean_latency') -> Optional[Dict]:
+    """La configuración más rápida (con latencia medida) cuyo score queda a no más de `tolerance` puntos del mejor."""
+    measured = report.dropna(subset=[cost])
+    candidates = measured[measured[quality] >= measured[quality].max() - tolerance]
+    if candidates.empty:
+        return None
+    return candidates.sort_values([cost, quality], ascending=[True, False]).iloc[0].to_dict()
+
+
+def print_pareto_report(report: 'pd.DataFrame', tolerance: float = 1.0):
+    columns = CONFIGURATION_KEYS + ['cells', 'mean_score', 'mean_latency', 'p95_latency', 'mean_output_tokens',
+                                    'tokens_per_second', 'parse_failure_rate']
+    if not report['pareto'].any():
+        print("Frontera de Pareto: no hay latencias medidas (¿todas las celdas salieron de la caché?)")
+        return
+    print("Frontera de Pareto (score vs. latencia):")
+    print(report[report['pareto']][columns].to_string(index=False))
+    choice = fastest_within(report, tolerance)
+    if choice is not None:
+        print(f"Más rápida a ≤{tolerance:g} puntos del mejor score: {choice['model_name']} | {choice['prompt_variation']} | "
+              f"{choice['options_name']} -> {choice['mean_score']:.1f} en {choice['mean_latency']:.2f}s")
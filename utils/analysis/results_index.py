@@ -0,0 +1,73 @@
+import os
+import ast
+import json
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+
+def parse_literal(value):
+    """Convierte el texto guardado en el CSV (dict de Python o JSON) a su objeto; si no se puede, lo deja igual."""
+    if isinstance(value, str):
+        try:
+            return ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            try:
+                return json.loads(value)
+            except json.JSONDecodeError:
+                return value
+    return value
+
+
+def file_signature(path: str) -> Tuple[str, int, int]:
+    """Firma (ruta, mtime, tamaño) para invalidar cachés cuando cambia el archivo."""
+    stat = os.stat(path)
+    return path, stat.st_mtime_ns, stat.st_size
+
+
+class ResultsIndex:
+    """
+    Índice en memoria de un CSV de resultados (best_combinations / all_results) por cliente.
+    `flashcard` y `metadata` se parsean una sola vez al construir el índice. Los nombres quedan en el
+    orden del CSV (en best_combinations, de mayor a menor score), como el selector original.
+    """
+
+    def __init__(self, csv_path: str):
+        import pandas as pd
+
+        df = pd.read_csv(csv_path)
+        self.csv_path = csv_path
+        self.records: Dict[str, Dict] = {}
+
+        # Primera fila por cliente (igual que `.values[0]` sobre el filtro)
+        for row in df.drop_duplicates('customer_name', keep='first').itertuples(index=False):
+            self.records[row.customer_name] = {
+                'customer_name': row.customer_name,
+                'flashcard': parse_literal(row.flashcard),
+                'academic_scores': row.academic_scores,
+                'metadata': parse_literal(row.metadata)
+            }
+
+        self.customer_names: List[str] = list(self.records)
+        self._lower_names = [name.lower() for name in self.customer_names]
+        # Caché por instancia: un lru_cache sobre el método retendría todos los índices ya reemplazados
+        self.search = lru_cache(maxsize=256)(self._search)
+
+    def __len__(self) -> int:
+        return len(self.customer_names)
+
+    def get(self, customer_name: str) -> Dict:
+        return self.records.get(customer_name)
+
+    def _search(self, query: str = "") -> Tuple[str, ...]:
+        query = query.strip().lower()
+        if not query:
+            return tuple(self.customer_names)
+        return tuple(name for name, lower in zip(self.customer_names, self._lower_names) if query in lower)
+
+    def page(self, query: str = "", page: int = 1, page_size: int = 50) -> Tuple[List[str], int, int]:
+        """Nombres de la página pedida, total de coincidencias y número de páginas."""
+        matches = self.search(query)
+        total_pages = max(1, -(-len(matches) // page_size))
+        page = min(max(1, page), total_pages)
+        start = (page - 1) * page_size
+        return list(matches[start:start + page_size]), len(matches), total_pages
@@ -0,0 +1,167 @@
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple, Union
+from ..llms.model_scheduler import DEFAULT_OPTIONS
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+SCORE_MATRIX_PATH = 'results/score_matrix_v{version}.npz'
+
+Weights = Union[Dict[str, float], Sequence[float]]
+
+
+class ScoreMatrix:
+    """
+    Scores por métrica de todos los resultados como matriz float64 (resultados × métricas), con el
+    cliente y la combinación (modelo, variación, opciones) de cada fila codificados. Las filas se guardan
+    agrupadas por cliente (respetando el orden original dentro de cada uno): un vector de pesos nuevo
+    se aplica con un solo producto matriz-vector y el mejor resultado de cada cliente sale de un
+    `maximum.reduceat` sobre los grupos, sin pandas ni groupby.
+    """
+
+    def __init__(self, metric_names: List[str], scores: 'np.ndarray', customer_codes: 'np.ndarray',
+                 combo_codes: 'np.ndarray', customers: List[str], combos: List[Tuple[str, ...]],
+                 rows: Optional['np.ndarray'] = None):
+        import numpy as np
+
+        customer_codes = np.asarray(customer_codes, dtype=np.int32)
+        rows = np.arange(len(customer_codes), dtype=np.int64) if rows is None else np.asarray(rows, dtype=np.int64)
+        order = np.argsort(customer_codes, kind='stable')
+        self.metric_names = list(metric_names)
+        self.scores = np.ascontiguousarray(np.asarray(scores, dtype=np.float64).reshape(-1, len(self.metric_names))[order])
+        self.customer_codes = customer_codes[order]
+        self.combo_codes = np.asarray(combo_codes, dtype=np.int32)[order]
+        # Posición de cada fila en el all_results original
+        self.rows = rows[order]
+        self.customers = list(customers)
+        # Las matrices anteriores guardaban solo (modelo, variación): opciones por defecto
+        self.combos = [tuple(combo) if len(combo) == 3 else (*combo, DEFAULT_OPTIONS) for combo in combos]
+
+        # Inicio y tamaño del grupo de cada cliente (los clientes sin filas no se listan)
+        boundaries = np.flatnonzero(np.diff(self.customer_codes, prepend=-1))
+        self._starts = boundaries
+        self._counts = np.diff(np.append(boundaries, len(self.customer_codes)))
+        self._group_customers = self.customer_codes[boundaries]
+        self._customer_labels = np.array(self.customers, dtype=object)
+        self._model_labels = np.array([model for model, _, _ in self.combos], dtype=object)
+        self._variation_labels = np.array([variation for _, variation, _ in self.combos], dtype=object)
+        self._options_labels = np.array([options for _, _, options in self.combos], dtype=object)
+
+    def __len__(self) -> int:
+        return len(self.customer_codes)
+
+    @property
+    def n_customers(self) -> int:
+        return len(self._starts)
+
+    def weight_vector(self, weights: Weights) -> 'np.ndarray':
+        """
+        Pesos en el orden de `metric_names`, normalizados a suma 1 (como los del evaluador, para que el
+        score quede en escala 0-100); en un dict, las métricas que faltan pesan 0.
+        """
+        import numpy as np
+
+        if isinstance(weights, dict):
+            unknown = set(weights) - set(self.metric_names)
+            if unknown:
+                raise ValueError(f"Métricas desconocidas: {', '.join(sorted(unknown))} "
+                                 f"(disponibles: {', '.join(self.metric_names)})")
+            vector = np.array([float(weights.get(name, 0.0)) for name in self.metric_names])
+        else:
+            vector = np.asarray(weights, dtype=np.float64)
+            if vector.shape != (len(self.metric_names),):
+                raise ValueError(f"Se esperaban {len(self.metric_names)} pesos, llegaron {vector.size}")
+        if (vector < 0).any() or vector.sum() <= 0:
+            raise ValueError("Los pesos deben ser no negativos y con suma positiva")
+        return vector / vector.sum()
+
+    def reweight(self, weights: Weights) -> 'np.ndarray':
+        """Score global de cada fila con los pesos dados (misma escala 0-100 que `overall_score`)."""
+        return self.scores @ (self.weight_vector(weights) * 100.0)
+
+    def best(self, weights: Weights) -> Tuple['np.ndarray', 'np.ndarray']:
+        """
+        Fila ganadora de cada cliente y su score; en empates gana la primera, como `idxmax`. Las filas
+        con alguna métrica NaN no ganan salvo que todo el cliente sea NaN (gana su primera fila, score NaN).
+        """
+        import numpy as np
+
+        overall = self.reweight(weights)
+        if not len(overall):
+            return np.empty(0, dtype=np.int64), overall
+        ranked = np.where(np.isnan(overall), -np.inf, overall)
+        group_max = np.maximum.reduceat(ranked, self._starts)
+        candidates = np.flatnonzero(ranked == np.repeat(group_max, self._counts))
+        first = np.diff(self.customer_codes[candidates], prepend=-1) != 0
+        winners = candidates[first]
+        return winners, overall[winners]
+
+    def best_combinations(self, weights: Weights) -> 'pd.DataFrame':
+        """Mejor combinación por cliente con los pesos dados, ordenada por score como best_combinations_v*.csv."""
+        import pandas as pd
+
+        winners, scores = self.best(weights)
+        combos = self.combo_codes[winners]
+        df = pd.DataFrame({
+            'customer_name': self._customer_labels[self._group_customers],
+            'model_name': self._model_labels[combos],
+            'prompt_variation': self._variation_labels[combos],
+            'options_name': self._options_labels[combos],
+            'academic_scores': scores,
+            'row': self.rows[winners]
+        })
+        return df.sort_values('academic_scores', ascending=False, kind='stable').reset_index(drop=True)
+
+    def winner_changes(self, weights: Weights, baseline: Weights) -> int:
+        """Clientes cuya combinación ganadora cambia al pasar de `baseline` a `weights`."""
+        import numpy as np
+        return int(np.count_nonzero(self.combo_codes[self.best(weights)[0]] != self.combo_codes[self.best(baseline)[0]]))
+
+    @classmethod
+    def from_results(cls, results: Sequence[Dict], metric_names: List[str]) -> 'ScoreMatrix':
+        """Desde los dicts de resultados (con `metric_scores`); las filas sin scores por métrica se saltan."""
+        import numpy as np
+        from .results_index import parse_literal
+
+        customers, combos = {}, {}
+        customer_codes, combo_codes, rows, scores = [], [], [], []
+        for position, result in enumerate(results):
+            metric_scores = parse_literal(result.get('metric_scores'))
+            if not isinstance(metric_scores, dict):
+                continue
+            metadata = parse_literal(result['metadata'])
+            combo = (metadata['model_name'], metadata['prompt_variation'], metadata.get('options_name', DEFAULT_OPTIONS))
+            customer_codes.append(customers.setdefault(result['customer_name'], len(customers)))
+            combo_codes.append(combos.setdefault(combo, len(combos)))
+            rows.append(position)
+            scores.append([metric_scores.get(name, np.nan) for name in metric_names])
+        return cls(metric_names, np.array(scores, dtype=np.float64).reshape(len(rows), len(metric_names)),
+                   customer_codes, combo_codes, list(customers), list(combos), rows)
+
+    @classmethod
+    def from_csv(cls, csv_path: str, metric_names: List[str], column: str = 'metric_scores') -> 'ScoreMatrix':
+        """
+        Desde un all_results_v*.csv con columna `metric_scores` (las corridas anteriores no la tienen) o,
+        con `column`, con los scores de un re-scoring (`metric_scores_<tag>`).
+        """
+        import pandas as pd
+
+        df = pd.read_csv(csv_path)
+        df['metric_scores'] = df[column] if column in df.columns else None
+        return cls.from_results(df[['customer_name', 'metric_scores', 'metadata']].to_dict('records'), metric_names)
+
+    def save(self, path: str):
+        import numpy as np
+
+        np.savez(path, metric_names=np.array(self.metric_names), scores=self.scores,
+                 customer_codes=self.customer_codes, combo_codes=self.combo_codes, rows=self.rows,
+                 customers=np.array(self.customers, dtype=str),
+                 combos=np.array(self.combos, dtype=str).reshape(len(self.combos), 3))
+
+    @classmethod
+    def load(cls, path: str) -> 'ScoreMatrix':
+        import numpy as np
+
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['metric_names'].tolist(), data['scores'], data['customer_codes'], data['combo_codes'],
+                       data['customers'].tolist(), [tuple(combo) for combo in data['combos'].tolist()], data['rows'])
@@ -1,16 +1,44 @@
+import os
 import json
-import ast
 import time
-import pandas as pd
-from typing import Dict
-from .llms.llm_handling import llm
+import socket
+import threading
+import multiprocessing
+from typing import TYPE_CHECKING, Dict, List
+from .llms.llm_handling import (llm_call, merge_llm_stats, build_flashcard_schema, FLASHCARD_FIELDS, FLASHCARD_SCHEMA,
+                                SYSTEM_PROMPT, get_concurrency_limiter, configure_concurrency_limiter,
+                                get_response_cache)
+from .llms.json_parsing import parse_flashcard, missing_fields, coerce_flashcard, build_missing_fields_prompt
+from .llms.compact_schema import (COMPACT_SYSTEM_PROMPT, COMPACT_FIELDS, COMPACT_SCHEMA, EXPANDED_KEYS,
+                                  build_compact_schema, compact_prompt, expand_flashcard)
 from .metrics.groundtruth import GroundTruthGenerator
 from .llms.prompt_generation import PromptVariationGenerator
 from .llms.prompt_variation_v1 import PromptVariationGeneratorV1
+from .llms.model_scheduler import ModelAffinityScheduler, build_grid_cells, DEFAULT_OPTIONS
+from .llms.cascade import CascadeConfig, CascadeTracker
+from .llms.few_shot_retrieval import DEFAULT_MIN_SCORE
+from .llms.request_scheduler import default_priority
 from .analysis.data_analysis import CallCenterDataProcessor
+from .analysis.results_index import parse_literal, file_signature
+from .analysis.score_matrix import ScoreMatrix, SCORE_MATRIX_PATH
+from .analysis.pareto import pareto_report, print_pareto_report
+from .analysis.fingerprint import history_fingerprint
+from .analysis.leaderboard import Leaderboard, LEADERBOARD_PATH
+from .execution.work_queue import SQLiteWorkQueue
+from .execution.grid_planner import plan_grid, print_plan
+from .execution.pipeline import Pipeline, Stage
+from .execution.rescoring import rescore_file, RESCORE_PATTERNS
+from .monitoring.progress_feed import ProgressFeed, PROGRESS_PATH
 from .metrics.response_metrics import AcademicallyFoundedEvaluator
 
+# pandas y el router (que depende de pandas) se importan recién al usarlos
+if TYPE_CHECKING:
+    import pandas as pd
+    from .llms.model_router import SegmentRouter
+    from .llms.few_shot_retrieval import FewShotIndex
+
 JSON_PATH = 'data/v0.json'
+QUEUE_PATH = 'results/work_queue.sqlite'
 
 MODELS = [
     "llama3.1",
@@ -32,17 +60,66 @@ PROMPT_VARIATIONS_V1 = [
     "client_segmentation_prompt"
 ]
 
-# Initializing objects
-validator = AcademicallyFoundedEvaluator()
-prompt_generator = PromptVariationGenerator()
-data_processor = CallCenterDataProcessor()
-ground_truth_generator = GroundTruthGenerator()
-prompt_generator_v1 = PromptVariationGeneratorV1()
+# Opciones de generación de Ollama: por defecto no se envía ninguna (valores del servidor/Modelfile)
+GENERATION_OPTIONS = {DEFAULT_OPTIONS: {}}
+
+# Configuraciones del sweep de opciones (--options-sweep): contexto, largo máximo, muestreo e hilos
+GENERATION_OPTIONS_SWEEP = {
+    DEFAULT_OPTIONS: {},
+    'ctx4k_pred512': {'num_ctx': 4096, 'num_predict': 512},
+    'ctx4k_pred384_greedy': {'num_ctx': 4096, 'num_predict': 384, 'temperature': 0.0},
+    'ctx8k_pred768': {'num_ctx': 8192, 'num_predict': 768},
+}
+
+# Reintentos acotados para completar campos faltantes de la flashcard
+MAX_PARSE_RETRIES = 2
+
+# Pausa entre celdas del modo local secuencial (sin límite de concurrencia adaptativo)
+SEQUENTIAL_CELL_PAUSE = 0.5
+
+# Componentes: se construyen la primera vez que se usan, no al importar el módulo
+_COMPONENT_FACTORIES = {
+    'validator': AcademicallyFoundedEvaluator,
+    'prompt_generator': PromptVariationGenerator,
+    'data_processor': CallCenterDataProcessor,
+    'ground_truth_generator': GroundTruthGenerator,
+    'prompt_generator_v1': PromptVariationGeneratorV1
+}
+_components = {}
+_components_lock = threading.Lock()
+
+
+def get_component(name: str):
+    component = _components.get(name)
+    if component is None:
+        with _components_lock:
+            component = _components.get(name)
+            if component is None:
+                component = _components[name] = _COMPONENT_FACTORIES[name]()
+    return component
+
+
+def warm_up():
+    """Importa las dependencias pesadas y construye los componentes (p.ej. en segundo plano al levantar la API)."""
+    import pandas
+    import ollama
+    for name in _COMPONENT_FACTORIES:
+        get_component(name)
+
+
+def __getattr__(name: str):
+    # Compatibilidad: `common.validator`, `common.data_processor`, etc. siguen disponibles
+    if name in _COMPONENT_FACTORIES:
+        return get_component(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 def load_json_data(json_path: str = JSON_PATH) -> Dict:
     return json.load(open(json_path, 'r', encoding='utf-8'))
 
-def extract_best_combinations_per_customer(results_df: pd.DataFrame) -> pd.DataFrame:
+def extract_best_combinations_per_customer(results_df: 'pd.DataFrame') -> 'pd.DataFrame':
+    import pandas as pd
+
     df = results_df.copy()
     
     df['academic_scores'] = pd.to_numeric(df['academic_scores'], errors='coerce')
@@ -53,90 +130,195 @@ def extract_best_combinations_per_customer(results_df: pd.DataFrame) -> pd.DataF
     
     best_combinations = best_combinations.sort_values('academic_scores', ascending=False)
     
-    def safe_parse_dict(value):
-        if isinstance(value, str):
-            try:
-                return ast.literal_eval(value)
-            except (ValueError, SyntaxError):
-                try:
-                    return json.loads(value)
-                except json.JSONDecodeError:
-                    return value
-        return value
-    
-    best_combinations['flashcard'] = best_combinations['flashcard'].apply(safe_parse_dict)
-    best_combinations['metadata'] = best_combinations['metadata'].apply(safe_parse_dict)
+    best_combinations['flashcard'] = best_combinations['flashcard'].apply(parse_literal)
+    best_combinations['metadata'] = best_combinations['metadata'].apply(parse_literal)
     
     return best_combinations[['customer_name', 'flashcard', 'academic_scores', 'metadata']]
 
 
-def process_single_customer(customer_name: str, prompt_variation: str, version: int = 1, model_name: str = "mistral")-> Dict:
-    # PASO 1: Procesar JSON del usuario
-    json_data = load_json_data()
-    customer_data = json_data.get(customer_name, [])
-    if not customer_data:
-        raise ValueError(f"No se encontró datos para el cliente: {customer_name}")
-    
-    processed_data = data_processor.process_user_json({customer_name: customer_data})
-    customer_info = processed_data
+def summarize_parse_quality(results_df: 'pd.DataFrame') -> 'pd.DataFrame':
+    import pandas as pd
 
-    # PASO 2: Generar prompt optimizado y generar expected result
-    if version == 1:
-        prompt = prompt_generator_v1.generate_prompt_for_customer(
-            prompt_variation,
-            customer_info['calls'],
-            customer_info['summary']
-        )
-    else: 
-        prompt = prompt_generator.generate_prompt_for_customer(
-            prompt_variation,
-            customer_info['calls'],
-            customer_info['summary']
-        )
-
-    expected_result = ground_truth_generator.generate_expected_output(customer_info)
+    metadata = pd.DataFrame(list(results_df['metadata']))
+    metadata['retried'] = metadata['parse_retries'] > 0
+    metadata['incomplete'] = metadata['missing_fields'].apply(len) > 0
 
-    # PASO 3: Generar flashcard con LLM
-    llm_response = llm(prompt, model_name)
-    print(llm_response)
+    return (metadata.groupby(['model_name', 'prompt_variation'])
+            .agg(cells=('parse_failed', 'size'),
+                 parse_failure_rate=('parse_failed', 'mean'),
+                 retry_rate=('retried', 'mean'),
+                 mean_retries=('parse_retries', 'mean'),
+                 incomplete_rate=('incomplete', 'mean'))
+            .reset_index())
 
-    # Parsear respuesta (a veces es necesario)
-    try:
-        if '```json' in llm_response:
-            llm_response = llm_response.split('```json')[1].split('```')[0].strip()
-        elif '```' in llm_response:
-            llm_response = llm_response.split('```')[1].strip()
 
-        llm_response = json.loads(llm_response)
-    except json.JSONDecodeError as e:
-        print(f"Failed to parse JSON: {e}")
-        print(f"Problematic content: {llm_response[:100]}...")
-        raise
+def _output_spec(compact_output: bool):
+    """System prompt, campos requeridos, schema y constructor de schema parcial según el modo de salida."""
+    if compact_output:
+        return COMPACT_SYSTEM_PROMPT, COMPACT_FIELDS, COMPACT_SCHEMA, build_compact_schema
+    return SYSTEM_PROMPT, FLASHCARD_FIELDS, FLASHCARD_SCHEMA, build_flashcard_schema
 
-    # PASO 4: Validar respuesta
-    validation_result = validator.evaluate_comprehensive(llm_response, expected_result, customer_info)
 
-    final_result = {
+def prepare_customer_cell(customer_name: str, customer_data: List[Dict], prompt_variation: str, version: int = 1,
+                          model_name: str = "mistral", compact_output: bool = False,
+                          options_name: str = DEFAULT_OPTIONS, generation_options: Dict = None) -> Dict:
+    """Procesa el historial, renderiza el prompt y genera el resultado esperado de una celda."""
+    customer_info = get_component('data_processor').process_user_json({customer_name: customer_data})
+    prompt_generator = get_component('prompt_generator_v1' if version == 1 else 'prompt_generator')
+    prompt = prompt_generator.generate_prompt_for_customer(prompt_variation, customer_info['calls'], customer_info['summary'],
+                                                          customer_name)
+
+    # Modo compacto: claves cortas y sin los campos deterministas (se completan después)
+    if compact_output:
+        prompt = compact_prompt(prompt)
+
+    return {
         'customer_name': customer_name,
-        'flashcard': llm_response,
-        'academic_scores': validation_result['overall_score'], 
+        'prompt_variation': prompt_variation,
+        'model_name': model_name,
+        'version': version,
+        'compact_output': compact_output,
+        'options_name': options_name,
+        'generation_options': generation_options or {},
+        'customer_info': customer_info,
+        'prompt': prompt,
+        'expected_result': get_component('ground_truth_generator').generate_expected_output(customer_info)
+    }
+
+
+def generate_cell_output(cell: Dict, keep_alive=None, structured_output: bool = True) -> Dict:
+    system_prompt, _, schema, _ = _output_spec(cell['compact_output'])
+    cell['llm_output'] = llm_call(cell['prompt'], cell['model_name'], keep_alive=keep_alive,
+                                  format=schema if structured_output else None, system_prompt=system_prompt,
+                                  options=cell['generation_options'])
+    return cell
+
+
+def parse_cell_output(cell: Dict, keep_alive=None, structured_output: bool = True,
+                      max_retries: int = MAX_PARSE_RETRIES) -> Dict:
+    """
+    Parsea la respuesta de forma tolerante; si faltan campos, se piden solo esos (llamadas extra al LLM).
+    Agotados los reintentos, los campos que siguen faltando quedan vacíos y se registran en `missing_fields`.
+    """
+    system_prompt, required_fields, _, build_schema = _output_spec(cell['compact_output'])
+    llm_output = cell['llm_output']
+    llm_stats = llm_output['stats']
+
+    llm_response = parse_flashcard(llm_output['content'])
+    parse_failed = llm_response is None
+    if parse_failed:
+        print(f"Failed to parse JSON. Problematic content: {llm_output['content'][:100]}...")
+        llm_response = {}
+
+    retries = 0
+    missing = missing_fields(llm_response, required_fields)
+    while missing and retries < max_retries:
+        retries += 1
+        retry_output = llm_call(build_missing_fields_prompt(cell['prompt'], llm_response, missing), cell['model_name'],
+                                keep_alive=keep_alive,
+                                format=build_schema(missing) if structured_output else None,
+                                system_prompt=system_prompt, options=cell['generation_options'])
+        llm_stats = merge_llm_stats(llm_stats, retry_output['stats'])
+
+        patch = parse_flashcard(retry_output['content']) or {}
+        llm_response.update({field: patch[field] for field in missing if field in patch})
+        missing = missing_fields(llm_response, required_fields)
+
+    if cell['compact_output']:
+        llm_response = expand_flashcard(llm_response, cell['customer_info'])
+        missing = [EXPANDED_KEYS[field] for field in missing]
+    # Sin más reintentos: lo que sigue faltando (o es null / de otro tipo) se evalúa como vacío
+    llm_response = coerce_flashcard(llm_response, FLASHCARD_FIELDS)
+
+    cell.update({'llm_response': llm_response, 'llm_stats': llm_stats, 'parse_failed': parse_failed,
+                 'parse_retries': retries, 'missing_fields': missing})
+    return cell
+
+
+def evaluate_cell(cell: Dict, report: bool = False) -> Dict:
+    """
+    Score y scores por métrica de la flashcard (a nivel de módulo para poder correr en otro proceso).
+    Con `report` agrega el reporte detallado (referencias, pesos y errores) en `evaluation_report`.
+    """
+    validator = get_component('validator')
+    validation_result = validator.evaluate_compact(cell['llm_response'], cell['expected_result'], cell['customer_info'])
+    cell['score'] = validation_result.overall_score
+    cell['metric_scores'] = validation_result.metric_scores(validator.metric_names)
+    if report:
+        cell['evaluation_report'] = validation_result.to_report(validator, cell['llm_response'], cell['expected_result'],
+                                                                cell['customer_info'])
+    return cell
+
+
+def build_cell_result(cell: Dict) -> Dict:
+    return {
+        'customer_name': cell['customer_name'],
+        'flashcard': cell['llm_response'],
+        'academic_scores': cell['score'],
+        'metric_scores': cell['metric_scores'],
         'metadata': {
-            'prompt_variation': prompt_variation,
-            'model_name': model_name,
-            'prompt_length': len(prompt)
+            'prompt_variation': cell['prompt_variation'],
+            'model_name': cell['model_name'],
+            'prompt_length': len(cell['prompt']),
+            'llm_stats': cell['llm_stats'],
+            'parse_failed': cell['parse_failed'],
+            'parse_retries': cell['parse_retries'],
+            'missing_fields': cell['missing_fields'],
+            'compact_output': cell['compact_output'],
+            'options_name': cell['options_name'],
+            'generation_options': cell['generation_options']
         }
     }
 
+
+def process_single_customer(customer_name: str, prompt_variation: str, version: int = 1, model_name: str = "mistral",
+                            keep_alive=None, structured_output: bool = True,
+                            max_retries: int = MAX_PARSE_RETRIES, verbose_report: bool = False,
+                            compact_output: bool = False, options_name: str = DEFAULT_OPTIONS,
+                            generation_options: Dict = None)-> Dict:
+    # PASO 1: Procesar JSON del usuario
+    json_data = load_json_data()
+    customer_data = json_data.get(customer_name, [])
+    if not customer_data:
+        raise ValueError(f"No se encontró datos para el cliente: {customer_name}")
+
+    # PASO 2: Generar prompt optimizado y generar expected result
+    cell = prepare_customer_cell(customer_name, customer_data, prompt_variation, version, model_name, compact_output,
+                                 options_name, generation_options)
+
+    # PASO 3: Generar flashcard con LLM
+    generate_cell_output(cell, keep_alive, structured_output)
+    print(cell['llm_output']['content'])
+    parse_cell_output(cell, keep_alive, structured_output, max_retries)
+
+    # PASO 4: Validar respuesta (el reporte detallado solo si se pide)
+    evaluate_cell(cell, report=verbose_report)
+    final_result = build_cell_result(cell)
+
     print(f"""
     Flashcard y validacion finalizada para {customer_name}\n
      - Modelo: {model_name}\n
      - Prompt: {prompt_variation}\n
-     - Score: {validation_result['overall_score']}\n{"=" * 36}""")
+     - Score: {cell['score']}\n{"=" * 36}""")
+
+    if verbose_report:
+        final_result['evaluation_report'] = cell['evaluation_report']
     
     return final_result
 
 
-def run_prompt_tuning_evaluation(sample_size: int = None , version: int = 1):
+@default_priority('tuning')
+def run_prompt_tuning_evaluation(sample_size: int = None , version: int = 1, schedule: str = "model_major",
+                                 progress_path: str = PROGRESS_PATH, leaderboard_path: str = LEADERBOARD_PATH,
+                                 generation_options: Dict[str, Dict] = None, max_concurrency: int = 1):
+    """
+    `generation_options` (nombre -> opciones de Ollama) agrega una dimensión al grid, p.ej. GENERATION_OPTIONS_SWEEP.
+    Por defecto las celdas corren de a una con una pausa de SEQUENTIAL_CELL_PAUSE segundos entre ellas.
+    Con `max_concurrency` > 1 corren en paralelo bajo el límite de concurrencia adaptativo de llm_call:
+    arranca en 1 y sube hasta `max_concurrency` mientras la latencia no crezca. Si ya hay un límite
+    configurado (OLLAMA_ADAPTIVE_CONCURRENCY) se usa ese.
+    """
+    generation_options = generation_options or GENERATION_OPTIONS
     json_data = load_json_data()
     test_cases = list(json_data.keys())
     if sample_size: 
@@ -147,29 +329,166 @@ def run_prompt_tuning_evaluation(sample_size: int = None , version: int = 1):
     else:
         variations = PROMPT_VARIATIONS
 
-    total_combinations = len(test_cases) * len(MODELS) * len(variations)
+    cells = build_grid_cells(test_cases, MODELS, variations, list(generation_options))
+    total_combinations = len(cells)
     print(f"Total de combinaciones: {total_combinations}")
 
-
-    results = []
+    # "model_major" agrupa las celdas por modelo para evitar recargas en Ollama; "logical" respeta el orden original
+    scheduler = ModelAffinityScheduler(model_major=(schedule == "model_major"))
     current_combination = 0
+    counter_lock = threading.Lock()
+
+    limiter = get_concurrency_limiter()
+    own_limiter = limiter is None and max_concurrency > 1
+    if own_limiter:
+        limiter = configure_concurrency_limiter(max_concurrency)
+    workers = limiter.max_limit if limiter is not None else 1
+
+    # Feed de progreso para seguir la corrida en vivo (monitor.py)
+    feed = ProgressFeed(progress_path, run_id=f"v{version}-{int(time.time())}")
+    feed.start(total_combinations, mode="local", version=version)
+    leaderboard = Leaderboard(leaderboard_path)
+
+    def run_cell(cell):
+        nonlocal current_combination
+        with counter_lock:
+            current_combination += 1
+            position = current_combination
+        print(f"Procesando {position}/{total_combinations}: {cell.customer_name} | {cell.model_name} | "
+              f"{cell.prompt_variation} | {cell.options_name}")
+        customer_result = process_single_customer(cell.customer_name, cell.prompt_variation, version, cell.model_name,
+                                                  keep_alive=scheduler.keep_alive, options_name=cell.options_name,
+                                                  generation_options=generation_options[cell.options_name])
+
+        result = {
+            'customer_name': cell.customer_name,
+            'flashcard': customer_result['flashcard'],
+            'academic_scores': customer_result['academic_scores'],
+            'metric_scores': customer_result['metric_scores'],
+            'metadata': customer_result['metadata']
+        }
+        feed.record_cell(result, limiter.current_limit if limiter is not None else None)
+        leaderboard.update_from_result(result, version, run_id=feed.run_id)
+        if limiter is None:
+            time.sleep(SEQUENTIAL_CELL_PAUSE)
+        return result
+
+    try:
+        results = scheduler.run(cells, run_cell, workers=workers)
+    finally:
+        if own_limiter:
+            configure_concurrency_limiter(None)
+    feed.finish()
+    scheduler.print_report()
+    if limiter is not None:
+        limiter.print_report()
+
+    save_evaluation_results(results, version)
+
+
+@default_priority('tuning')
+def run_pipelined_evaluation(sample_size: int = None, version: int = 1, generate_workers: int = 2,
+                             parse_workers: int = 1, evaluate_workers: int = 1, evaluate_processes: bool = False,
+                             queue_size: int = 8, progress_path: str = PROGRESS_PATH,
+                             leaderboard_path: str = LEADERBOARD_PATH, generation_options: Dict[str, Dict] = None) -> List[Dict]:
+    """
+    Mismo grid que run_prompt_tuning_evaluation, como pipeline prepare -> generate -> parse -> evaluate
+    -> persist con colas acotadas: mientras el LLM responde una celda se preparan y evalúan otras.
+    `generate_workers` debería acompañar a OLLAMA_NUM_PARALLEL (o a la cantidad de hosts del pool).
+    La evaluación corre en hilos por defecto (~0.1 ms por celda); con `evaluate_processes` usa procesos.
+    """
+    generation_options = generation_options or GENERATION_OPTIONS
+    json_data = load_json_data()
+    test_cases = list(json_data.keys())
+    if sample_size:
+        test_cases = test_cases[:sample_size]
+
+    variations = PROMPT_VARIATIONS_V1 if version == 1 else PROMPT_VARIATIONS
+    cells = build_grid_cells(test_cases, MODELS, variations, list(generation_options))
+    print(f"Total de combinaciones: {len(cells)}")
+
+    # Orden model-major: las celdas llegan al LLM agrupadas por modelo y con keep_alive; al cambiar
+    # de modelo el productor espera a que el bloque anterior termine de generar y lo descarga
+    scheduler = ModelAffinityScheduler(model_major=True)
+    feed = ProgressFeed(progress_path, run_id=f"v{version}-{int(time.time())}")
+    feed.start(len(cells), mode="pipeline", version=version)
+    leaderboard = Leaderboard(leaderboard_path)
+    results: List = [None] * len(cells)
+
+    def prepare(grid_cell):
+        cell = prepare_customer_cell(grid_cell.customer_name, json_data[grid_cell.customer_name],
+                                     grid_cell.prompt_variation, version, grid_cell.model_name,
+                                     options_name=grid_cell.options_name,
+                                     generation_options=generation_options[grid_cell.options_name])
+        cell['index'] = grid_cell.index
+        return cell
+
+    def parse(cell):
+        cell = parse_cell_output(cell, scheduler.keep_alive)
+        scheduler.release()
+        return cell
+
+    def persist(cell):
+        result = build_cell_result(cell)
+        results[cell['index']] = result
+        feed.record_cell(result)
+        leaderboard.update_from_result(result, version, run_id=feed.run_id)
+        print(f"Celda {cell['index'] + 1}/{len(cells)}: {cell['customer_name']} | {cell['model_name']} | "
+              f"{cell['prompt_variation']} | {cell['options_name']} -> {cell['score']:.1f}")
+
+    def on_error(stage_name, item, error):
+        # Las celdas que no llegaron a terminar el parseo liberan su lugar en el bloque del modelo
+        if stage_name in ('prepare', 'generate', 'parse'):
+            scheduler.release()
+        fields = item if isinstance(item, dict) else vars(item)
+        cell = {key: fields[key] for key in ('customer_name', 'model_name', 'prompt_variation')}
+        print(f"Error en la etapa {stage_name} ({cell['customer_name']} | {cell['model_name']} | "
+              f"{cell['prompt_variation']}): {error}")
+        feed.record_error(cell, f"{stage_name}: {type(error).__name__}: {error}")
+
+    pipeline = Pipeline([
+        Stage('prepare', prepare),
+        Stage('generate', lambda cell: generate_cell_output(cell, scheduler.keep_alive), workers=generate_workers),
+        Stage('parse', parse, workers=parse_workers),
+        Stage('evaluate', evaluate_cell, workers=evaluate_workers, kind="process" if evaluate_processes else "thread"),
+        Stage('persist', persist)
+    ], queue_size=queue_size, on_error=on_error)
+    pipeline.run(scheduler.stream(cells))
+    feed.finish()
+    pipeline.print_report()
+
+    results = [result for result in results if result is not None]
+    save_evaluation_results(results, version)
+    return pipeline.report()
+
 
-    for customer_name in test_cases:
-        for model_name in MODELS:
-            for prompt_variation in variations:
-                current_combination += 1
-                print(f"Procesando {current_combination}/{total_combinations}: {customer_name} | {model_name} | {prompt_variation}")
-                customer_result = process_single_customer(customer_name, prompt_variation, version, model_name)
-
-                result = {
-                    'customer_name': customer_name,
-                    'flashcard': customer_result['flashcard'],
-                    'academic_scores': customer_result['academic_scores'],
-                    'metadata': customer_result['metadata']
-                }
-                
-                results.append(result)
-                time.sleep(0.5)
+def plan_prompt_tuning_evaluation(sample_size: int = None, version: int = 1, concurrency: int = 1,
+                                  generation_options: Dict[str, Dict] = None, compact_output: bool = False) -> Dict:
+    """
+    Dry-run del grid: tokens, tiempo estimado y aciertos de caché, sin llamar al LLM. Usa la caché
+    configurada y los mismos generadores (con few-shot si está activo), schema y opciones que la corrida.
+    """
+    json_data = load_json_data()
+    if sample_size:
+        json_data = dict(list(json_data.items())[:sample_size])
+
+    variations = PROMPT_VARIATIONS_V1 if version == 1 else PROMPT_VARIATIONS
+    response_cache = get_response_cache()
+    plan = plan_grid(json_data, MODELS, variations, version, concurrency=concurrency,
+                     cache_path=response_cache.db_path if response_cache is not None else None,
+                     data_processor=get_component('data_processor'),
+                     prompt_generator=get_component('prompt_generator_v1' if version == 1 else 'prompt_generator'),
+                     compact_output=compact_output, generation_options=generation_options or GENERATION_OPTIONS)
+    print_plan(plan)
+    return plan
+
+
+def save_evaluation_results(results: List[Dict], version: int = 1):
+    import pandas as pd
+
+    if not results:
+        print("⚠️ No hay resultados para guardar")
+        return
 
     df_results = pd.DataFrame(results)
     best_combinations = extract_best_combinations_per_customer(df_results)
@@ -177,5 +496,398 @@ def run_prompt_tuning_evaluation(sample_size: int = None , version: int = 1):
     # Save results
     df_results.to_csv(f'results/all_results_v{version}.csv', index=False)
     best_combinations.to_csv(f'results/best_combinations_v{version}.csv', index=False)
+
+    # Scores por métrica como matriz, para re-ponderar sin volver a evaluar (reweight_best_combinations)
+    ScoreMatrix.from_results(results, get_component('validator').metric_names).save(SCORE_MATRIX_PATH.format(version=version))
+
+    parse_quality = summarize_parse_quality(df_results)
+    parse_quality.to_csv(f'results/parse_quality_v{version}.csv', index=False)
+    print(parse_quality.to_string(index=False))
+
+    # Sweep de opciones de generación: score vs. latencia por configuración
+    if len({metadata.get('options_name', DEFAULT_OPTIONS) for metadata in df_results['metadata']}) > 1:
+        report = pareto_report(df_results)
+        report.to_csv(f'results/options_pareto_v{version}.csv', index=False)
+        print_pareto_report(report)
     
-    print("✅ Evaluación finalizada")
\ No newline at end of file
+    print("✅ Evaluación finalizada")
+
+
+# === RE-PONDERACIÓN DE RESULTADOS ===
+_score_matrices: Dict[int, tuple] = {}
+
+
+def load_score_matrix(version: int = 1) -> 'ScoreMatrix':
+    """
+    Matriz de scores por métrica de la versión (score_matrix_v{version}.npz; si no existe, se arma desde
+    all_results_v{version}.csv). Queda en memoria hasta que cambia el archivo.
+    """
+    path = SCORE_MATRIX_PATH.format(version=version)
+    if not os.path.exists(path):
+        path = f'results/all_results_v{version}.csv'
+    signature = file_signature(path)
+    cached = _score_matrices.get(version)
+    if cached is None or cached[0] != signature:
+        if path.endswith('.npz'):
+            matrix = ScoreMatrix.load(path)
+        else:
+            matrix = ScoreMatrix.from_csv(path, get_component('validator').metric_names)
+        cached = _score_matrices[version] = (signature, matrix)
+    return cached[1]
+
+
+def reweight_best_combinations(weights: Dict[str, float], version: int = 1) -> Dict:
+    """
+    Aplica un vector de pesos nuevo a todos los resultados históricos de la versión y recalcula la
+    mejor combinación por cliente, sin llamar al LLM ni volver a evaluar.
+    """
+    matrix = load_score_matrix(version)
+    start = time.perf_counter()
+    best = matrix.best_combinations(weights)
+    seconds = time.perf_counter() - start
+    return {
+        'results': len(matrix),
+        'customers': matrix.n_customers,
+        'weights': dict(zip(matrix.metric_names, matrix.weight_vector(weights).tolist())),
+        'winner_changes': matrix.winner_changes(weights, get_component('validator').weights),
+        'seconds': seconds,
+        'best_combinations': best
+    }
+
+
+# === RE-SCORING OFFLINE ===
+def rescore_historical_results(patterns=RESCORE_PATTERNS, workers: int = None, chunk_size: int = 5000,
+                               tag: str = None) -> List[Dict]:
+    """
+    Re-evalúa todas las flashcards guardadas con las heurísticas actuales de response_metrics.py, sin
+    llamar al LLM, y agrega a cada CSV las columnas de score versionadas (ver rescore_file).
+    """
+    import glob
+
+    paths = sorted({path for pattern in patterns for path in glob.glob(pattern)})
+    reports = []
+    for path in paths:
+        report = rescore_file(path, JSON_PATH, workers=workers, chunk_size=chunk_size, tag=tag)
+        print(f"{path}: {report['rescored']}/{report['rows']} filas re-evaluadas ({report['skipped']} sin datos "
+              f"fuente), {report['changed']} con score distinto | {report['rows_per_second']:.0f} filas/s "
+              f"con {report['workers']} procesos -> columnas *_{report['tag']}")
+        reports.append(report)
+    return reports
+
+
+# === FEW-SHOT POR VECINOS ===
+def enable_few_shot_retrieval(k: int = 2, token_budget: int = 600, min_score: float = DEFAULT_MIN_SCORE,
+                              json_data: Dict = None) -> 'FewShotIndex':
+    """
+    Reemplaza los ejemplos fijos de los generadores de prompts por las mejores flashcards pasadas
+    de los k clientes más parecidos (best_combinations_v*.csv) con score >= `min_score`. Precalcula
+    los vecinos de toda la cartera.
+    """
+    from .llms.few_shot_retrieval import FewShotIndex
+
+    json_data = json_data or load_json_data()
+    data_processor = get_component('data_processor')
+    summary_table = data_processor.summarize_call_store(data_processor.build_call_store(json_data, clean_names=False))
+    index = FewShotIndex.from_results(summary_table, min_score=min_score, k=k, token_budget=token_budget)
+    index.prefetch(summary_table.to_dict('records'))
+
+    for name in ('prompt_generator', 'prompt_generator_v1'):
+        get_component(name).example_retriever = index
+    print(f"Few-shot por vecinos: {len(index)} ejemplos indexados (k={k}, presupuesto {token_budget} tokens)")
+    return index
+
+
+# === ROUTING POR SEGMENTO ===
+_router = None
+
+
+def customer_segments(json_data: Dict = None) -> Dict[str, str]:
+    """Segmento (`customer_type`) de cada deudor, calculado para toda la cartera a la vez (summarize_call_store)."""
+    json_data = json_data or load_json_data()
+    data_processor = get_component('data_processor')
+    summary = data_processor.summarize_call_store(data_processor.build_call_store(json_data, clean_names=False))
+    return summary['customer_type'].to_dict()
+
+
+def get_router(reload: bool = False, **kwargs) -> 'SegmentRouter':
+    from .llms.model_router import SegmentRouter
+
+    global _router
+    if _router is None or reload:
+        _router = SegmentRouter.from_results(customer_segments(), **kwargs)
+    return _router
+
+
+def process_routed_customer(customer_name: str, target_score: float = None, verbose_report: bool = False) -> Dict:
+    """Genera la flashcard con la combinación más rápida que alcanza el score objetivo para el segmento del deudor."""
+    router = get_router()
+    customer_data = load_json_data().get(customer_name, [])
+    customer_info = get_component('data_processor').process_user_json({customer_name: customer_data}) if customer_data else {}
+    segment = customer_info['summary']['customer_type'] if customer_info else None
+
+    decision = router.route(segment, target_score) if segment else None
+    if decision is None:
+        result = process_single_customer(customer_name, PROMPT_VARIATIONS_V1[0], verbose_report=verbose_report)
+        result['routing'] = None
+        return result
+
+    result = process_single_customer(customer_name, decision.prompt_variation, decision.version, decision.model_name,
+                                     verbose_report=verbose_report)
+    router.record(decision, result['metadata']['llm_stats']['latency'], result['academic_scores'])
+    result['routing'] = decision.to_dict()
+    return result
+
+
+# === CASCADA (MODELO RAPIDO -> MODELO FUERTE) ===
+CASCADE_CONFIG = CascadeConfig()
+cascade_tracker = CascadeTracker()
+
+
+def process_cascade_customer(customer_name: str, prompt_variation: str, version: int = 1,
+                             config: CascadeConfig = None, verbose_report: bool = False) -> Dict:
+    """
+    Genera con el modelo rápido y evalúa de inmediato; solo escala al modelo fuerte si el
+    score queda bajo el umbral o no se pudo parsear la respuesta.
+    """
+    config = config or CASCADE_CONFIG
+    fast_result = process_single_customer(customer_name, prompt_variation, version, config.fast_model,
+                                          verbose_report=verbose_report)
+    fast_latency = fast_result['metadata']['llm_stats']['latency']
+    parse_failed = fast_result['metadata']['parse_failed']
+
+    escalate = parse_failed or fast_result['academic_scores'] < config.threshold
+    if not escalate:
+        cascade_tracker.record(fast_latency)
+        result = fast_result
+    else:
+        result = process_single_customer(customer_name, prompt_variation, version, config.strong_model,
+                                         verbose_report=verbose_report)
+        cascade_tracker.record(fast_latency, result['metadata']['llm_stats']['latency'], parse_failed)
+
+    result['metadata']['cascade'] = {
+        'fast_model': config.fast_model,
+        'strong_model': config.strong_model,
+        'threshold': config.threshold,
+        'escalated': escalate,
+        'fast_score': fast_result['academic_scores'],
+        'fast_parse_failed': parse_failed,
+        'latency': fast_latency + (result['metadata']['llm_stats']['latency'] if escalate else 0.0)
+    }
+    return result
+
+
+# === REGENERACION INCREMENTAL ===
+def prompt_template_text(version: int, prompt_variation: str) -> str:
+    """Texto de la plantilla de una variación (plantillas y ejemplos fijos), para la huella de regeneración."""
+    prompt_generator = get_component('prompt_generator_v1' if version == 1 else 'prompt_generator')
+    variation = next((v for v in prompt_generator.prompt_variations if v['name'] == prompt_variation), None)
+    if variation is None:
+        raise ValueError(f"Variación '{prompt_variation}' no encontrada")
+    return json.dumps(variation, sort_keys=True, ensure_ascii=False, default=str)
+
+
+@default_priority('batch')
+def run_incremental_regeneration(previous_path: str = None, output_path: str = None, version: int = 1,
+                                 model_name: str = "mistral", prompt_variation: str = None,
+                                 json_data: Dict = None) -> Dict:
+    """
+    Regenera solo las flashcards de deudores cuya huella (historial normalizado + modelo/variación,
+    versión y texto de los prompts, opciones de generación y modo compacto) cambió respecto de la
+    salida anterior; el resto se copia tal cual. Cada deudor conserva el modelo/variación, las
+    opciones y el modo de salida con que ganó en la salida anterior; los nuevos usan
+    `model_name` / `prompt_variation` y las opciones por defecto.
+    """
+    import pandas as pd
+
+    previous_path = previous_path or f'results/best_combinations_v{version}.csv'
+    output_path = output_path or previous_path
+    prompt_variation = prompt_variation or (PROMPT_VARIATIONS_V1 if version == 1 else PROMPT_VARIATIONS)[0]
+
+    previous = {}
+    if os.path.exists(previous_path):
+        for row in pd.read_csv(previous_path).itertuples(index=False):
+            previous[row.customer_name] = {
+                'customer_name': row.customer_name,
+                'flashcard': parse_literal(row.flashcard),
+                'academic_scores': row.academic_scores,
+                'metadata': parse_literal(row.metadata)
+            }
+
+    json_data = json_data or load_json_data()
+    templates = {}
+    rows, regenerated = [], []
+    saved_latency, spent_latency, unmeasured_skips = 0.0, 0.0, 0
+
+    for customer_name, calls in json_data.items():
+        normalized = get_component('data_processor').clean_and_normalize_data({customer_name: calls})
+        if not normalized:
+            continue
+
+        old = previous.get(customer_name)
+        old_metadata = old['metadata'] if old and isinstance(old['metadata'], dict) else {}
+        model = old_metadata.get('model_name', model_name)
+        variation = old_metadata.get('prompt_variation', prompt_variation)
+        options_name = old_metadata.get('options_name', DEFAULT_OPTIONS)
+        generation_options = old_metadata.get('generation_options') or {}
+        compact_output = bool(old_metadata.get('compact_output', False))
+        if variation not in templates:
+            templates[variation] = prompt_template_text(version, variation)
+        fingerprint = history_fingerprint(next(iter(normalized.values())), model, variation, version,
+                                          templates[variation], _output_spec(compact_output)[0], generation_options,
+                                          compact_output)
+
+        if old_metadata.get('fingerprint') == fingerprint:
+            rows.append(old)
+            latency = old_metadata.get('llm_stats', {}).get('latency')
+            if latency is None:
+                unmeasured_skips += 1
+            else:
+                saved_latency += latency
+            continue
+
+        print(f"Regenerando {customer_name} | {model} | {variation} | {options_name}")
+        result = process_single_customer(customer_name, variation, version, model, compact_output=compact_output,
+                                         options_name=options_name, generation_options=generation_options)
+        result['metadata']['fingerprint'] = fingerprint
+        spent_latency += result['metadata']['llm_stats']['latency']
+        regenerated.append(customer_name)
+        rows.append({key: result[key] for key in ('customer_name', 'flashcard', 'academic_scores', 'metadata')})
+
+    # Saltos sin latencia registrada: se estiman con la latencia media de esta corrida
+    if unmeasured_skips and regenerated:
+        saved_latency += unmeasured_skips * spent_latency / len(regenerated)
+
+    report = {
+        'customers': len(rows),
+        'regenerated': len(regenerated),
+        'skipped': len(rows) - len(regenerated),
+        'llm_seconds_spent': spent_latency,
+        'llm_seconds_saved': saved_latency
+    }
+
+    if rows:
+        df = pd.DataFrame(rows).sort_values('academic_scores', ascending=False)
+        df[['customer_name', 'flashcard', 'academic_scores', 'metadata']].to_csv(output_path, index=False)
+
+    print(f"Regeneración incremental: {report['regenerated']} regeneradas, {report['skipped']} sin cambios "
+          f"de {report['customers']} | LLM: {spent_latency:.1f}s usados, ~{saved_latency:.1f}s ahorrados")
+    return report
+
+
+# === EJECUCION DISTRIBUIDA (COORDINADOR / WORKERS) ===
+@default_priority('tuning')
+def run_queue_worker(queue_path: str = QUEUE_PATH, run_id: str = None, worker_id: str = None,
+                     lease_seconds: float = 600.0, poll_interval: float = 2.0, exit_when_idle: bool = True,
+                     progress_path: str = PROGRESS_PATH, leaderboard_path: str = LEADERBOARD_PATH):
+    """Toma celdas de la cola, ejecuta process_single_customer y publica el resultado."""
+    queue = SQLiteWorkQueue(queue_path)
+    leaderboard = Leaderboard(leaderboard_path)
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    processed = 0
+
+    while True:
+        task = queue.lease(worker_id, lease_seconds, run_id)
+        if task is None:
+            if exit_when_idle and (run_id is None or queue.is_finished(run_id)):
+                break
+            time.sleep(poll_interval)
+            continue
+
+        cell = task['payload']
+        feed = ProgressFeed(progress_path, run_id=task['run_id'])
+        print(f"[{worker_id}] Procesando celda {task['cell_index']} (intento {task['attempts']}): "
+              f"{cell['customer_name']} | {cell['model_name']} | {cell['prompt_variation']}")
+
+        # Renovar el lease mientras dura la llamada al LLM
+        stop_heartbeat = threading.Event()
+        def heartbeat():
+            while not stop_heartbeat.wait(lease_seconds / 3):
+                queue.extend_lease(task['id'], worker_id, lease_seconds)
+        heartbeat_thread = threading.Thread(target=heartbeat, daemon=True)
+        heartbeat_thread.start()
+
+        try:
+            customer_result = process_single_customer(cell['customer_name'], cell['prompt_variation'],
+                                                      cell['version'], cell['model_name'],
+                                                      options_name=cell.get('options_name', DEFAULT_OPTIONS),
+                                                      generation_options=cell.get('generation_options'))
+            result = {
+                'customer_name': cell['customer_name'],
+                'flashcard': customer_result['flashcard'],
+                'academic_scores': customer_result['academic_scores'],
+                'metric_scores': customer_result['metric_scores'],
+                'metadata': customer_result['metadata']
+            }
+            if queue.complete(task['id'], worker_id, result):
+                feed.record_cell(result)
+                leaderboard.update_from_result(result, cell['version'], run_id=task['run_id'])
+                processed += 1
+            else:
+                print(f"[{worker_id}] Lease perdido en la celda {task['cell_index']}: otro worker la retomó")
+        except Exception as e:
+            print(f"[{worker_id}] Error en celda {task['cell_index']}: {e}")
+            queue.fail(task['id'], worker_id, f"{type(e).__name__}: {e}")
+            if task['attempts'] >= queue.max_attempts:
+                feed.record_error(cell, f"{type(e).__name__}: {e}")
+        finally:
+            stop_heartbeat.set()
+            heartbeat_thread.join()
+
+    return processed
+
+
+def run_distributed_evaluation(sample_size: int = None, version: int = 1, workers: int = 2,
+                               queue_path: str = QUEUE_PATH, run_id: str = None, poll_interval: float = 2.0,
+                               progress_path: str = PROGRESS_PATH, generation_options: Dict[str, Dict] = None,
+                               leaderboard_path: str = LEADERBOARD_PATH):
+    """
+    Coordinador: encola el grid en SQLite, lanza `workers` procesos locales (0 = solo workers externos
+    apuntando a la misma cola) y al terminar guarda los CSVs habituales.
+    """
+    json_data = load_json_data()
+    test_cases = list(json_data.keys())
+    if sample_size:
+        test_cases = test_cases[:sample_size]
+
+    variations = PROMPT_VARIATIONS_V1 if version == 1 else PROMPT_VARIATIONS
+    generation_options = generation_options or GENERATION_OPTIONS
+    cells = build_grid_cells(test_cases, MODELS, variations, list(generation_options))
+
+    run_id = run_id or f"v{version}-{int(time.time())}"
+    queue = SQLiteWorkQueue(queue_path)
+    queue.enqueue(run_id, [{
+        'customer_name': cell.customer_name,
+        'model_name': cell.model_name,
+        'prompt_variation': cell.prompt_variation,
+        'options_name': cell.options_name,
+        'generation_options': generation_options[cell.options_name],
+        'version': version
+    } for cell in cells])
+    print(f"Run {run_id}: {len(cells)} celdas encoladas en {queue_path}")
+    feed = ProgressFeed(progress_path, run_id=run_id)
+    feed.start(len(cells), mode="distributed", version=version, workers=workers)
+
+    processes = [multiprocessing.Process(target=run_queue_worker, args=(queue_path, run_id, f"local-{i}"),
+                                         kwargs={'progress_path': progress_path, 'leaderboard_path': leaderboard_path})
+                 for i in range(workers)]
+    for process in processes:
+        process.start()
+
+    while not queue.is_finished(run_id):
+        if processes and not any(process.is_alive() for process in processes):
+            # Todos los workers locales terminaron: drenar lo que quede (p.ej. leases vencidos)
+            run_queue_worker(queue_path, run_id, "coordinator", poll_interval=poll_interval,
+                             progress_path=progress_path, leaderboard_path=leaderboard_path)
+            break
+        counts = queue.progress(run_id)
+        print(f"Progreso {run_id}: {counts['done']}/{len(cells)} listas, {counts['leased']} en curso, {counts['failed']} fallidas")
+        time.sleep(poll_interval)
+
+    for process in processes:
+        process.join()
+
+    for failure in queue.failures(run_id):
+        print(f"Celda {failure['cell_index']} fallida tras {failure['attempts']} intentos: {failure['error']}")
+    feed.finish()
+
+    save_evaluation_results(queue.results(run_id), version)
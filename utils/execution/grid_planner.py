@@ -0,0 +1,198 @@
+import os
+import re
+import json
+import glob
+import time
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from ..llms.llm_handling import FLASHCARD_SCHEMA, SYSTEM_PROMPT, build_messages
+from ..llms.response_cache import ResponseCache, response_cache_keys, RESPONSE_CACHE_PATH
+from ..llms.compact_schema import COMPACT_SYSTEM_PROMPT, COMPACT_SCHEMA, compact_prompt
+
+# Cada palabra se parte en trozos de hasta 4 caracteres (≈ tokens BPE) y cada signo cuenta como uno
+_TOKEN_PATTERN = re.compile(r"\w{1,4}|[^\w\s]")
+
+# Sin historial se asume un throughput conservador de un modelo 7-8B en GPU de consumo
+DEFAULT_PREFILL_TPS = 150.0
+DEFAULT_DECODE_TPS = 15.0
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimación local de tokens (tipo BPE): ~1 token cada 4 caracteres por palabra, 1 por signo."""
+    return len(_TOKEN_PATTERN.findall(text))
+
+
+@lru_cache(maxsize=8)
+def _system_prompt_tokens(system_prompt: str) -> int:
+    return estimate_tokens(system_prompt)
+
+
+def default_output_tokens() -> int:
+    """Tamaño de una flashcard típica: el ejemplo few-shot de los prompts V1."""
+    from ..llms.prompt_variation_v1 import PromptVariationGeneratorV1
+    example = PromptVariationGeneratorV1()._get_few_shot_examples()[0]['output']
+    return estimate_tokens(json.dumps(example, ensure_ascii=False))
+
+
+def historical_throughput(pattern: str = 'results/all_results_v*.csv') -> Dict[str, Dict]:
+    """Throughput por modelo (prefill y decode, tokens/s), tokens de salida y carga media de corridas anteriores."""
+    import pandas as pd
+    from ..analysis.results_index import parse_literal
+
+    rows = []
+    for path in glob.glob(pattern):
+        for metadata in pd.read_csv(path)['metadata'].apply(parse_literal):
+            stats = metadata.get('llm_stats') if isinstance(metadata, dict) else None
+            if stats and stats.get('eval_duration'):
+                rows.append({'model_name': metadata['model_name'], **stats})
+    if not rows:
+        return {}
+
+    throughput = {}
+    for model_name, df in pd.DataFrame(rows).groupby('model_name'):
+        prefill_seconds = (df['total_duration'] - df['eval_duration'] - df['load_duration']).clip(lower=0).sum()
+        loads = df.loc[df['load_duration'] > 0, 'load_duration']
+        throughput[model_name] = {
+            'cells': len(df),
+            'prefill_tps': df['prompt_eval_count'].sum() / prefill_seconds if prefill_seconds else DEFAULT_PREFILL_TPS,
+            'decode_tps': df['eval_count'].sum() / df['eval_duration'].sum(),
+            'output_tokens': df['eval_count'].mean(),
+            'load_seconds': loads.mean() if not loads.empty else 0.0
+        }
+    return throughput
+
+
+# === RENDER EN PARALELO ===
+_worker_state = {}
+
+
+def _init_worker(version: int, data_processor=None, prompt_generator=None):
+    """Procesador y generador de prompts de cada proceso: los del runner (con su retriever few-shot) o unos nuevos."""
+    if data_processor is None:
+        from ..analysis.data_analysis import CallCenterDataProcessor
+        data_processor = CallCenterDataProcessor()
+    if prompt_generator is None:
+        from ..llms.prompt_generation import PromptVariationGenerator
+        from ..llms.prompt_variation_v1 import PromptVariationGeneratorV1
+        prompt_generator = PromptVariationGeneratorV1() if version == 1 else PromptVariationGenerator()
+    _worker_state['data_processor'] = data_processor
+    _worker_state['prompt_generator'] = prompt_generator
+
+
+def _render_chunk(args: Tuple[Dict, List[str], List[str], bool, List[Dict]]) -> List[Tuple[int, int, str]]:
+    """Renderiza los prompts de un bloque de clientes; devuelve (modelo, tokens de prompt, clave de caché) por celda."""
+    chunk, models, variations, compact_output, options_sets = args
+    data_processor = _worker_state['data_processor']
+    prompt_generator = _worker_state['prompt_generator']
+    system_prompt, schema = (COMPACT_SYSTEM_PROMPT, COMPACT_SCHEMA) if compact_output else (SYSTEM_PROMPT, FLASHCARD_SCHEMA)
+    cells = []
+    for customer_name, calls in chunk.items():
+        customer_info = data_processor.process_user_json({customer_name: calls})
+        if not customer_info:
+            continue
+        # El prompt no depende del modelo ni de las opciones: se renderiza una vez por variación
+        for variation in variations:
+            prompt = prompt_generator.generate_prompt_for_customer(variation, customer_info['calls'], customer_info['summary'],
+                                                                  customer_name)
+            if compact_output:
+                prompt = compact_prompt(prompt)
+            system_message, user_message = build_messages(prompt, system_prompt)
+            tokens = _system_prompt_tokens(system_message['content']) + estimate_tokens(user_message['content'])
+            for options in options_sets:
+                keys = response_cache_keys(models, [system_message, user_message], schema, options)
+                cells.extend((model_index, tokens, key) for model_index, key in enumerate(keys))
+    return cells
+
+
+def plan_grid(json_data: Dict, models: List[str], variations: List[str], version: int = 1,
+              concurrency: int = 1, per_cell_overhead: float = 0.5, cache_path: Optional[str] = RESPONSE_CACHE_PATH,
+              throughput: Optional[Dict[str, Dict]] = None, workers: Optional[int] = None,
+              chunk_size: int = 200, data_processor=None, prompt_generator=None, compact_output: bool = False,
+              generation_options: Optional[Dict[str, Dict]] = None) -> Dict:
+    """
+    Plan de una corrida sin llamar al LLM: renderiza todos los prompts en paralelo, estima tokens
+    de entrada/salida, busca las celdas ya respondidas en la caché y estima el tiempo total con
+    `concurrency` celdas en paralelo (las celdas en caché no cuentan).
+    Para que las claves coincidan con las del runner hay que pasar su caché (`cache_path`), su
+    procesador y generador de prompts, el modo compacto y las opciones de generación (nombre -> opciones).
+    """
+    start = time.perf_counter()
+    throughput = historical_throughput() if throughput is None else throughput
+    fallback_output_tokens = default_output_tokens()
+
+    names = list(json_data)
+    options_sets = list((generation_options or {'default': {}}).values())
+    chunks = [({name: json_data[name] for name in names[i:i + chunk_size]}, models, variations, compact_output, options_sets)
+              for i in range(0, len(names), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker,
+                             initargs=(version, data_processor, prompt_generator)) as executor:
+        cells = [cell for chunk_cells in executor.map(_render_chunk, chunks) for cell in chunk_cells]
+    render_seconds = time.perf_counter() - start
+
+    cached = set()
+    if cache_path and os.path.exists(cache_path):
+        cached = ResponseCache(cache_path).contains(key for _, _, key in cells)
+
+    per_model = {}
+    for model_index, model_name in enumerate(models):
+        history = throughput.get(model_name) or throughput.get(f"{model_name}:latest")
+        per_model[model_name] = {
+            'cells': 0,
+            'cache_hits': 0,
+            'prompt_tokens': 0,
+            'expected_output_tokens': 0.0,
+            'prefill_tps': history['prefill_tps'] if history else DEFAULT_PREFILL_TPS,
+            'decode_tps': history['decode_tps'] if history else DEFAULT_DECODE_TPS,
+            'output_tokens_per_cell': history['output_tokens'] if history else fallback_output_tokens,
+            'load_seconds': history['load_seconds'] if history else 0.0,
+            'throughput_source': 'historial' if history else 'default'
+        }
+
+    for model_index, tokens, key in cells:
+        model = per_model[models[model_index]]
+        model['cells'] += 1
+        if key in cached:
+            model['cache_hits'] += 1
+            continue
+        model['prompt_tokens'] += tokens
+        model['expected_output_tokens'] += model['output_tokens_per_cell']
+
+    llm_seconds = 0.0
+    for model in per_model.values():
+        uncached = model['cells'] - model['cache_hits']
+        model['llm_seconds'] = (model['prompt_tokens'] / model['prefill_tps'] +
+                                model['expected_output_tokens'] / model['decode_tps'] +
+                                uncached * per_cell_overhead +
+                                (model['load_seconds'] if uncached else 0.0))
+        llm_seconds += model['llm_seconds']
+
+    hits = sum(model['cache_hits'] for model in per_model.values())
+    prompt_tokens = sum(model['prompt_tokens'] for model in per_model.values())
+    output_tokens = sum(model['expected_output_tokens'] for model in per_model.values())
+    return {
+        'cells': len(cells),
+        'customers': len(names),
+        'prompt_tokens': prompt_tokens,
+        'expected_output_tokens': round(output_tokens),
+        'expected_total_tokens': round(prompt_tokens + output_tokens),
+        'cache_hits': hits,
+        'cache_hit_rate': hits / len(cells) if cells else 0.0,
+        'concurrency': concurrency,
+        'expected_sequential_seconds': llm_seconds,
+        'expected_wall_seconds': llm_seconds / max(1, concurrency),
+        'render_seconds': render_seconds,
+        'per_model': per_model
+    }
+
+
+def print_plan(plan: Dict):
+    print(f"Plan: {plan['cells']} celdas ({plan['customers']} clientes), renderizadas en {plan['render_seconds']:.1f}s")
+    print(f" - Tokens esperados: {plan['expected_total_tokens']:,} "
+          f"({plan['prompt_tokens']:,} de prompt + {plan['expected_output_tokens']:,} de salida)")
+    print(f" - Caché: {plan['cache_hits']} celdas ya respondidas ({plan['cache_hit_rate']:.1%})")
+    for model_name, model in plan['per_model'].items():
+        print(f" - {model_name}: {model['cells']} celdas, prefill {model['prefill_tps']:.0f} tok/s, "
+              f"decode {model['decode_tps']:.1f} tok/s ({model['throughput_source']}), ~{model['llm_seconds'] / 60:.1f} min")
+    print(f" - Tiempo estimado con concurrencia {plan['concurrency']}: {plan['expected_wall_seconds'] / 60:.1f} min")
@@ -0,0 +1,214 @@
+import time
+import queue
+import threading
+import contextvars
+from dataclasses import dataclass, field
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional
+
+# Marca de fin de flujo entre etapas
+_DONE = object()
+
+
+class PipelineAborted(RuntimeError):
+    """Item descartado sin procesar porque la corrida se abortó (ver Pipeline.run)."""
+
+
+@dataclass
+class Stage:
+    """
+    Etapa del pipeline. `kind="thread"` para I/O (llamadas al LLM, disco); `kind="process"` para
+    trabajo de CPU: la función y sus argumentos deben ser picklables (función a nivel de módulo).
+    """
+    name: str
+    fn: Callable
+    workers: int = 1
+    kind: str = "thread"
+    queue_size: Optional[int] = None
+
+
+@dataclass
+class StageMetrics:
+    name: str
+    kind: str
+    workers: int
+    queue_size: int
+    processed: int = 0
+    errors: int = 0
+    busy_seconds: float = 0.0
+    depth_samples: int = 0
+    depth_sum: int = 0
+    depth_max: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, seconds: float, failed: bool):
+        with self._lock:
+            self.busy_seconds += seconds
+            if failed:
+                self.errors += 1
+            else:
+                self.processed += 1
+
+    def sample_depth(self, depth: int):
+        self.depth_samples += 1
+        self.depth_sum += depth
+        self.depth_max = max(self.depth_max, depth)
+
+    def to_dict(self, wall_seconds: float) -> Dict:
+        handled = self.processed + self.errors
+        return {
+            'stage': self.name,
+            'kind': self.kind,
+            'workers': self.workers,
+            'processed': self.processed,
+            'errors': self.errors,
+            'mean_service_seconds': self.busy_seconds / handled if handled else 0.0,
+            # Fracción del tiempo de la corrida en que los workers de la etapa estuvieron ocupados
+            'utilization': self.busy_seconds / (self.workers * wall_seconds) if wall_seconds else 0.0,
+            'queue_size': self.queue_size,
+            'mean_queue_depth': self.depth_sum / self.depth_samples if self.depth_samples else 0.0,
+            'max_queue_depth': self.depth_max
+        }
+
+
+class Pipeline:
+    """
+    Etapas conectadas por colas acotadas: cada etapa tiene sus propios workers y, cuando la cola
+    de la etapa siguiente está llena, se bloquea (backpressure). Así la preparación y la evaluación
+    se solapan con las esperas de red del LLM. Se mide, por etapa, la profundidad de su cola de
+    entrada y la utilización de sus workers para identificar el cuello de botella.
+
+    Un `Exception` en una etapa descarta solo ese item (y se informa a `on_error`). Un error fuera de
+    eso (un BaseException en una etapa o un error del propio `on_error`) aborta la corrida: los items
+    restantes se descartan informándolos con PipelineAborted y `run` relanza el error.
+    """
+
+    def __init__(self, stages: List[Stage], queue_size: int = 8, sample_interval: float = 0.1,
+                 on_error: Optional[Callable[[str, object, Exception], None]] = None):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.sample_interval = sample_interval
+        self.on_error = on_error
+        self.metrics: List[StageMetrics] = []
+        self.wall_seconds = 0.0
+
+    def run(self, items: Iterable) -> List:
+        """Procesa `items` y devuelve las salidas de la última etapa (en orden de llegada)."""
+        queues = [queue.Queue(maxsize=stage.queue_size or self.queue_size) for stage in self.stages]
+        self.metrics = [StageMetrics(stage.name, stage.kind, stage.workers, queues[i].maxsize)
+                        for i, stage in enumerate(self.stages)]
+        outputs = []
+        outputs_lock = threading.Lock()
+        remaining = [stage.workers for stage in self.stages]
+        remaining_lock = threading.Lock()
+        executors = [ProcessPoolExecutor(max_workers=stage.workers) if stage.kind == "process" else None
+                     for stage in self.stages]
+        # Errores que abortan la corrida (el primero se relanza al final)
+        aborted: List[BaseException] = []
+
+        def emit(index: int, item):
+            if index + 1 < len(self.stages):
+                queues[index + 1].put(item)
+            else:
+                with outputs_lock:
+                    outputs.append(item)
+
+        def report_error(index: int, item, error: BaseException):
+            if self.on_error:
+                try:
+                    self.on_error(self.stages[index].name, item, error)
+                except BaseException as e:
+                    aborted.append(e)
+
+        def discard(index: int, item):
+            self.metrics[index].record(0.0, failed=True)
+            report_error(index, item, PipelineAborted(f"Corrida abortada antes de la etapa {self.stages[index].name}"))
+
+        def worker(index: int):
+            stage, metrics, executor = self.stages[index], self.metrics[index], executors[index]
+            try:
+                # Aun abortada, la cola se sigue vaciando hasta el fin de flujo: la etapa anterior no se bloquea
+                while True:
+                    item = queues[index].get()
+                    if item is _DONE:
+                        break
+                    if aborted:
+                        discard(index, item)
+                        continue
+                    start = time.perf_counter()
+                    try:
+                        result = executor.submit(stage.fn, item).result() if executor else stage.fn(item)
+                    except Exception as e:
+                        metrics.record(time.perf_counter() - start, failed=True)
+                        report_error(index, item, e)
+                        continue
+                    except BaseException as e:
+                        aborted.append(e)
+                        discard(index, item)
+                        continue
+                    metrics.record(time.perf_counter() - start, failed=False)
+                    # None descarta el item (p.ej. un filtro)
+                    if result is not None:
+                        emit(index, result)
+            finally:
+                # El último worker en terminar (aunque sea por un error) cierra la etapa siguiente
+                with remaining_lock:
+                    remaining[index] -= 1
+                    last = remaining[index] == 0
+                if last and index + 1 < len(self.stages):
+                    for _ in range(self.stages[index + 1].workers):
+                        queues[index + 1].put(_DONE)
+
+        stop_sampling = threading.Event()
+
+        def sampler():
+            while not stop_sampling.wait(self.sample_interval):
+                for metrics, stage_queue in zip(self.metrics, queues):
+                    metrics.sample_depth(stage_queue.qsize())
+
+        start = time.perf_counter()
+        # Cada hilo corre en una copia del contexto del llamador (p.ej. la clase de `default_priority`)
+        threads = [threading.Thread(target=contextvars.copy_context().run, args=(worker, index),
+                                    name=f"{stage.name}-{n}", daemon=True)
+                   for index, stage in enumerate(self.stages) for n in range(stage.workers)]
+        sampler_thread = threading.Thread(target=sampler, daemon=True)
+        for thread in threads:
+            thread.start()
+        sampler_thread.start()
+
+        try:
+            for item in items:
+                if aborted:
+                    break
+                queues[0].put(item)
+        finally:
+            for _ in range(self.stages[0].workers):
+                queues[0].put(_DONE)
+            for thread in threads:
+                thread.join()
+            stop_sampling.set()
+            sampler_thread.join()
+            for executor in executors:
+                if executor is not None:
+                    executor.shutdown()
+            self.wall_seconds = time.perf_counter() - start
+
+        if aborted:
+            raise aborted[0]
+        return outputs
+
+    def report(self) -> List[Dict]:
+        return [metrics.to_dict(self.wall_seconds) for metrics in self.metrics]
+
+    def print_report(self):
+        report = self.report()
+        if not report:
+            return
+        bottleneck = max(report, key=lambda stage: stage['utilization'])
+        print(f"Pipeline: {self.wall_seconds:.1f}s")
+        for stage in report:
+            print(f" - {stage['stage']:<9} {stage['kind']:<7} x{stage['workers']}: {stage['processed']} ok, "
+                  f"{stage['errors']} errores, {stage['mean_service_seconds']:.3f}s/item, "
+                  f"utilización {stage['utilization']:.0%}, cola media {stage['mean_queue_depth']:.1f} "
+                  f"(máx {stage['max_queue_depth']}/{stage['queue_size']})")
+        print(f" - Cuello de botella: {bottleneck['stage']}")
@@ -0,0 +1,159 @@
+import os
+import glob
+import json
+import time
+import hashlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+UTILS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Código que determina el score de una flashcard ya generada: métricas, ground truth y resumen del cliente
+SCORING_SOURCES = ('metrics/*.py', 'analysis/data_analysis.py')
+
+RESCORE_PATTERNS = ('results/all_results_v*.csv', 'results/ex_all_results.csv')
+
+
+def scoring_version() -> str:
+    """Huella corta de SCORING_SOURCES: cambia cuando cambian las heurísticas del evaluador."""
+    digest = hashlib.sha256()
+    for pattern in SCORING_SOURCES:
+        for path in sorted(glob.glob(os.path.join(UTILS_DIR, pattern))):
+            with open(path, 'rb') as source:
+                digest.update(source.read())
+    return digest.hexdigest()[:8]
+
+
+def score_columns(tag: str) -> Tuple[str, str]:
+    return f'academic_scores_{tag}', f'metric_scores_{tag}'
+
+
+class FlashcardScorer:
+    """
+    Re-evalúa flashcards guardadas sin llamar al LLM: reconstruye el contexto del cliente y el
+    resultado esperado desde los datos fuente (igual que prepare_customer_cell) y los cachea por cliente.
+    """
+
+    def __init__(self, json_path: str):
+        from ..analysis.data_analysis import CallCenterDataProcessor
+        from ..metrics.groundtruth import GroundTruthGenerator
+        from ..metrics.response_metrics import AcademicallyFoundedEvaluator
+
+        with open(json_path, 'r', encoding='utf-8') as data:
+            self.json_data = json.load(data)
+        self.data_processor = CallCenterDataProcessor()
+        self.ground_truth_generator = GroundTruthGenerator()
+        self.evaluator = AcademicallyFoundedEvaluator()
+        self._contexts: Dict[str, Optional[Tuple[Dict, Dict]]] = {}
+
+    def context(self, customer_name: str) -> Optional[Tuple[Dict, Dict]]:
+        """(customer_info, expected_result) del cliente, o None si no está en los datos fuente."""
+        if customer_name not in self._contexts:
+            customer_data = self.json_data.get(customer_name)
+            customer_info = self.data_processor.process_user_json({customer_name: customer_data}) if customer_data else None
+            self._contexts[customer_name] = (customer_info, self.ground_truth_generator.generate_expected_output(customer_info)) \
+                if customer_info else None
+        return self._contexts[customer_name]
+
+    def score(self, customer_name: str, flashcard) -> Tuple[float, Optional[Dict[str, float]]]:
+        from ..analysis.results_index import parse_literal
+
+        context = self.context(customer_name)
+        if context is None:
+            return float('nan'), None
+        customer_info, expected_result = context
+        flashcard = parse_literal(flashcard)
+        # Las respuestas que no se pudieron parsear se evaluaron como {} al generarlas
+        result = self.evaluator.evaluate_compact(flashcard if isinstance(flashcard, dict) else {}, expected_result, customer_info)
+        return result.overall_score, result.metric_scores(self.evaluator.metric_names)
+
+
+# Un scorer por proceso del pool (se arma en el initializer)
+_scorer: Optional[FlashcardScorer] = None
+
+
+def _init_scorer(json_path: str):
+    global _scorer
+    _scorer = FlashcardScorer(json_path)
+
+
+def _score_batch(batch: Sequence[Tuple[str, str]]) -> List[Tuple[float, Optional[Dict[str, float]]]]:
+    return [_scorer.score(customer_name, flashcard) for customer_name, flashcard in batch]
+
+
+def rescore_file(csv_path: str, json_path: str, output_path: Optional[str] = None, workers: int = None,
+                 chunk_size: int = 5000, batch_size: int = 250, tag: Optional[str] = None) -> Dict:
+    """
+    Recalcula el score de cada fila de un CSV de resultados con el evaluador actual y agrega las columnas
+    `academic_scores_<tag>` y `metric_scores_<tag>` (tag = scoring_version() por defecto); las originales
+    no se tocan. El CSV se lee por chunks y se evalúa en un pool de `workers` procesos (1 = en este
+    proceso), con hasta dos chunks en vuelo; la salida se escribe a un temporal y reemplaza a
+    `output_path` (por defecto, el mismo archivo) al terminar.
+    """
+    import numpy as np
+    import pandas as pd
+
+    workers = workers or os.cpu_count() or 1
+    tag = tag or scoring_version()
+    output_path = output_path or csv_path
+    score_column, metrics_column = score_columns(tag)
+    temp_path = f"{output_path}.rescoring"
+
+    pool = ProcessPoolExecutor(workers, initializer=_init_scorer, initargs=(json_path,)) if workers > 1 else None
+    if pool is None:
+        _init_scorer(json_path)
+    rows, skipped, changed, total_change = 0, 0, 0, 0.0
+    wrote_header = False
+
+    def write(chunk: 'pd.DataFrame', pending: List):
+        nonlocal rows, skipped, changed, total_change, wrote_header
+        scored = [row for batch in pending for row in (batch.result() if pool else batch)]
+        chunk[score_column] = [score for score, _ in scored]
+        chunk[metrics_column] = [metrics for _, metrics in scored]
+        delta = (chunk[score_column] - pd.to_numeric(chunk['academic_scores'], errors='coerce')).abs()
+        rows += len(chunk)
+        skipped += sum(metrics is None for _, metrics in scored)
+        changed += int((delta > 1e-9).sum())
+        total_change += float(np.nansum(delta))
+        chunk.to_csv(temp_path, mode='a' if wrote_header else 'w', header=not wrote_header, index=False)
+        wrote_header = True
+
+    start = time.perf_counter()
+    try:
+        in_flight = deque()
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_size):
+            pairs = list(zip(chunk['customer_name'], chunk['flashcard']))
+            batches = [pairs[i:i + batch_size] for i in range(0, len(pairs), batch_size)]
+            in_flight.append((chunk, [pool.submit(_score_batch, batch) if pool else _score_batch(batch)
+                                      for batch in batches]))
+            # Mientras el pool evalúa este chunk se escribe el anterior y se lee el siguiente
+            if len(in_flight) > 1:
+                write(*in_flight.popleft())
+        while in_flight:
+            write(*in_flight.popleft())
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    seconds = time.perf_counter() - start
+    if wrote_header:
+        os.replace(temp_path, output_path)
+
+    rescored = rows - skipped
+    return {
+        'path': csv_path,
+        'output_path': output_path,
+        'tag': tag,
+        'workers': workers,
+        'rows': rows,
+        'rescored': rescored,
+        'skipped': skipped,
+        'changed': changed,
+        'mean_abs_change': total_change / rescored if rescored else 0.0,
+        'seconds': seconds,
+        'rows_per_second': rows / seconds if seconds else 0.0
+    }
@@ -0,0 +1,158 @@
+import json
+import time
+import sqlite3
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+
+class SQLiteWorkQueue:
+    """
+    Cola de tareas durable sobre SQLite (sin broker externo).
+
+    Cada tarea es una celda (cliente, modelo, variación) del grid. Los workers toman tareas
+    con un lease; si un worker muere, el lease vence y otra instancia puede tomar la tarea.
+    Una tarea se marca como 'failed' tras `max_attempts` intentos.
+    """
+
+    def __init__(self, db_path: str, max_attempts: int = 3):
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS tasks (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    run_id TEXT NOT NULL,
+                    cell_index INTEGER NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    lease_owner TEXT,
+                    lease_expires REAL,
+                    result TEXT,
+                    error TEXT,
+                    UNIQUE (run_id, cell_index)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (run_id, status)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def enqueue(self, run_id: str, payloads: List[Dict]) -> int:
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            cursor = conn.executemany(
+                "INSERT OR IGNORE INTO tasks (run_id, cell_index, payload) VALUES (?, ?, ?)",
+                [(run_id, index, json.dumps(payload, ensure_ascii=False)) for index, payload in enumerate(payloads)]
+            )
+            conn.execute("COMMIT")
+            return cursor.rowcount
+
+    def lease(self, worker_id: str, lease_seconds: float = 600.0, run_id: Optional[str] = None) -> Optional[Dict]:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(f"""
+                SELECT id, run_id, cell_index, payload, attempts FROM tasks
+                WHERE (status = 'pending' OR (status = 'leased' AND lease_expires < ?))
+                  AND attempts < ? {'AND run_id = ?' if run_id else ''}
+                ORDER BY id LIMIT 1
+            """, (now, self.max_attempts, run_id) if run_id else (now, self.max_attempts)).fetchone()
+
+            if row is None:
+                self._fail_exhausted_leases(conn, now)
+                conn.execute("COMMIT")
+                return None
+
+            conn.execute("""
+                UPDATE tasks SET status = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1
+                WHERE id = ?
+            """, (worker_id, now + lease_seconds, row['id']))
+            conn.execute("COMMIT")
+
+        return {
+            'id': row['id'],
+            'run_id': row['run_id'],
+            'cell_index': row['cell_index'],
+            'attempts': row['attempts'] + 1,
+            'payload': json.loads(row['payload'])
+        }
+
+    def _fail_exhausted_leases(self, conn: sqlite3.Connection, now: float):
+        """Leases vencidos sin intentos restantes pasan a 'failed' (nadie más puede tomarlos)."""
+        conn.execute("""
+            UPDATE tasks SET status = 'failed', error = COALESCE(error, 'lease expirado')
+            WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?
+        """, (now, self.max_attempts))
+
+    def extend_lease(self, task_id: int, worker_id: str, lease_seconds: float = 600.0) -> bool:
+        with self._connect() as conn:
+            cursor = conn.execute("""
+                UPDATE tasks SET lease_expires = ?
+                WHERE id = ? AND lease_owner = ? AND status = 'leased'
+            """, (time.time() + lease_seconds, task_id, worker_id))
+            return cursor.rowcount == 1
+
+    def complete(self, task_id: int, worker_id: str, result: Dict) -> bool:
+        with self._connect() as conn:
+            cursor = conn.execute("""
+                UPDATE tasks SET status = 'done', result = ?, error = NULL, lease_expires = NULL
+                WHERE id = ? AND lease_owner = ? AND status = 'leased'
+            """, (json.dumps(result, ensure_ascii=False), task_id, worker_id))
+            return cursor.rowcount == 1
+
+    def fail(self, task_id: int, worker_id: str, error: str):
+        with self._connect() as conn:
+            conn.execute("""
+                UPDATE tasks
+                SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                    error = ?, lease_owner = NULL, lease_expires = NULL
+                WHERE id = ? AND lease_owner = ? AND status = 'leased'
+            """, (self.max_attempts, error, task_id, worker_id))
+
+    def progress(self, run_id: str) -> Dict[str, int]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM tasks WHERE run_id = ? GROUP BY status",
+                                (run_id,)).fetchall()
+        counts = {'pending': 0, 'leased': 0, 'done': 0, 'failed': 0}
+        counts.update({row['status']: row['n'] for row in rows})
+        return counts
+
+    def is_finished(self, run_id: str) -> bool:
+        """
+        Sin tareas pendientes ni en curso. Antes se cierran los leases vencidos sin intentos restantes:
+        si no, con los workers caídos la corrida no terminaría nunca (nadie vuelve a llamar a lease).
+        """
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._fail_exhausted_leases(conn, time.time())
+            conn.execute("COMMIT")
+        counts = self.progress(run_id)
+        return counts['pending'] == 0 and counts['leased'] == 0
+
+    def results(self, run_id: str) -> List[Dict]:
+        with self._connect() as conn:
+            rows = conn.execute("""
+                SELECT result FROM tasks WHERE run_id = ? AND status = 'done' ORDER BY cell_index
+            """, (run_id,)).fetchall()
+        return [json.loads(row['result']) for row in rows]
+
+    def failures(self, run_id: str) -> List[Dict]:
+        with self._connect() as conn:
+            rows = conn.execute("""
+                SELECT cell_index, payload, attempts, error FROM tasks
+                WHERE run_id = ? AND status = 'failed' ORDER BY cell_index
+            """, (run_id,)).fetchall()
+        return [{'cell_index': row['cell_index'], 'payload': json.loads(row['payload']),
+                 'attempts': row['attempts'], 'error': row['error']} for row in rows]
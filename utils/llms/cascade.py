@@ -0,0 +1,73 @@
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+# Score (0-100) a partir del cual una flashcard se considera aceptable: umbral de escalamiento de la
+# cascada y score mínimo de los ejemplos few-shot recuperados
+ACCEPTABLE_SCORE = 50.0
+
+
+@dataclass
+class CascadeConfig:
+    fast_model: str = "mistral"
+    strong_model: str = "llama3.1"
+    threshold: float = ACCEPTABLE_SCORE
+
+
+def latency_distribution(values: List[float]) -> Dict:
+    import numpy as np
+
+    if not values:
+        return {'count': 0}
+    return {
+        'count': len(values),
+        'mean': float(np.mean(values)),
+        'p50': float(np.percentile(values, 50)),
+        'p95': float(np.percentile(values, 95))
+    }
+
+
+class CascadeTracker:
+    """
+    Métricas del modo cascada: tasa de escalamiento y distribución de latencia de la cascada
+    frente a usar siempre el modelo fuerte.
+
+    En producción la latencia del modelo fuerte solo se mide en los pedidos escalados, así que
+    el ahorro reportado es una estimación; benchmarks/bench_cascade.py mide ambas estrategias
+    sobre los mismos clientes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.escalations = 0
+        self.parse_escalations = 0
+        self.cascade_latencies: List[float] = []
+        self.fast_latencies: List[float] = []
+        self.strong_latencies: List[float] = []
+
+    def record(self, fast_latency: float, strong_latency: Optional[float] = None, parse_failed: bool = False):
+        with self._lock:
+            self.requests += 1
+            self.fast_latencies.append(fast_latency)
+            total = fast_latency
+            if strong_latency is not None:
+                self.escalations += 1
+                self.parse_escalations += int(parse_failed)
+                self.strong_latencies.append(strong_latency)
+                total += strong_latency
+            self.cascade_latencies.append(total)
+
+    def report(self) -> Dict:
+        with self._lock:
+            strong = latency_distribution(self.strong_latencies)
+            cascade = latency_distribution(self.cascade_latencies)
+            return {
+                'requests': self.requests,
+                'escalation_rate': self.escalations / self.requests if self.requests else 0.0,
+                'parse_escalations': self.parse_escalations,
+                'cascade_latency': cascade,
+                'fast_latency': latency_distribution(self.fast_latencies),
+                'strong_latency': strong,
+                'mean_latency_saved': strong['mean'] - cascade['mean'] if strong['count'] and cascade['count'] else None
+            }
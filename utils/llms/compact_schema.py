@@ -0,0 +1,89 @@
+import re
+from typing import Dict, List, Optional
+from .llm_handling import FLASHCARD_FIELDS, PRESSURE_LEVELS
+
+# Claves cortas para la salida del modelo (modo compacto). `ultimo_contacto` y `canal` no se
+# piden al modelo: salen directo de la última llamada del resumen.
+COMPACT_KEYS = {
+    "nivel_presion": "np",
+    "tipificacion_operativa": "tip",
+    "primer_dialogo": "d0",
+    "accion_si_responde_si": "si",
+    "accion_si_responde_no": "no",
+    "acciones_a_evitar": "evitar",
+    "comentario": "com",
+    "canal_recomendado": "canal_rec",
+    "cliente": "cli"
+}
+EXPANDED_KEYS = {short: field for field, short in COMPACT_KEYS.items()}
+DETERMINISTIC_FIELDS = [field for field in FLASHCARD_FIELDS if field not in COMPACT_KEYS]
+COMPACT_FIELDS = list(COMPACT_KEYS.values())
+
+# Todos los contactos del histórico son gestiones del callcenter
+DEFAULT_CHANNEL = "CallCenter"
+
+COMPACT_SYSTEM_PROMPT = """Eres un asistente especializado en análisis de clientes para callcenters de cobranza.
+        Tu objetivo es generar recomendaciones estratégicas para operadores basándose en el historial de llamadas del cliente.
+
+        Tu análisis debe ser completo, pero debe devolverse solo en formato JSON con estas claves exactas:
+        {
+            "np": "Baja|Moderada|Alta (nivel de presión)",
+            "tip": "Descripción específica del tipo de cliente (tipificación operativa)",
+            "d0": "Dialogo específico que el operador debe usar para iniciar la llamada. Basandose en las anteriores llamadas y el historial del cliente",
+            "si": "Dialogo específico para respuesta positiva a una negociación",
+            "no": "Dialogo específico para respuesta negativa a una negociación",
+            "evitar": ["Acción 1", "Acción 2", "Acción 3"],
+            "com": "Observación clave del cliente",
+            "canal_rec": "Canal sugerido para próximo contacto",
+            "cli": "Tipificación del perfil del cliente"
+        }
+"""
+
+_DETERMINISTIC_LINE = re.compile(r'^[ \t]*"(?:%s)":[^\n]*\n' % '|'.join(DETERMINISTIC_FIELDS), flags=re.MULTILINE)
+_LONG_KEY = re.compile(r'"(%s)":' % '|'.join(COMPACT_KEYS))
+
+
+def build_compact_schema(fields: Optional[List[str]] = None) -> Dict:
+    """JSON schema (claves cortas) para el parámetro `format` de Ollama."""
+    fields = fields or COMPACT_FIELDS
+    properties = {}
+    for field in fields:
+        if field == COMPACT_KEYS['acciones_a_evitar']:
+            properties[field] = {"type": "array", "items": {"type": "string"}}
+        elif field == COMPACT_KEYS['nivel_presion']:
+            properties[field] = {"type": "string", "enum": PRESSURE_LEVELS}
+        else:
+            properties[field] = {"type": "string"}
+
+    return {"type": "object", "properties": properties, "required": list(fields)}
+
+
+COMPACT_SCHEMA = build_compact_schema()
+
+
+def compact_prompt(prompt: str) -> str:
+    """
+    Adapta un prompt existente al modo compacto: la estructura JSON y los ejemplos embebidos
+    (templates V0) pasan a claves cortas y se quitan los campos deterministas.
+    """
+    prompt = _DETERMINISTIC_LINE.sub('', prompt)
+    return _LONG_KEY.sub(lambda match: f'"{COMPACT_KEYS[match.group(1)]}":', prompt)
+
+
+def deterministic_fields(customer_info: Dict) -> Dict:
+    last_call = customer_info.get('summary', {}).get('ultima_llamada', {})
+    return {
+        "ultimo_contacto": last_call.get('Fecha_Gestion', ''),
+        "canal": last_call.get('Canal', DEFAULT_CHANNEL)
+    }
+
+
+def compact_flashcard(flashcard: Dict) -> Dict:
+    return {COMPACT_KEYS[field]: value for field, value in flashcard.items() if field in COMPACT_KEYS}
+
+
+def expand_flashcard(compact: Dict, customer_info: Dict) -> Dict:
+    """Vuelve a la forma actual de la flashcard (claves largas, en el orden de FLASHCARD_FIELDS)."""
+    values = {EXPANDED_KEYS[key]: value for key, value in compact.items() if key in EXPANDED_KEYS}
+    values.update(deterministic_fields(customer_info))
+    return {field: values[field] for field in FLASHCARD_FIELDS if field in values}
@@ -0,0 +1,175 @@
+import time
+import statistics
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+# Decisiones posibles al cerrar una ventana de muestras
+DECISIONS = ('warmup', 'increase', 'hold', 'hold_latency', 'decrease_latency', 'decrease_error')
+
+
+def is_timeout(error: BaseException) -> bool:
+    """Timeouts del cliente (httpx.ReadTimeout, TimeoutError...), a diferencia de otros errores del servidor."""
+    return isinstance(error, TimeoutError) or 'timeout' in type(error).__name__.lower()
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Límite de llamadas concurrentes al LLM que se ajusta solo (AIMD con gradiente de latencia).
+
+    Cada `window` llamadas terminadas (al menos el límite actual) se compara la latencia mediana de
+    cada modelo con su línea de base (la menor mediana vista, que puede subir un `baseline_drift` por
+    ventana para seguir cambios reales del servidor):
+    - cociente ≤ `increase_below` y el límite se llegó a usar entero: +1 (aumento aditivo);
+    - cociente > `tolerance`: el límite se multiplica por tolerance/cociente (nunca menos que `backoff`);
+    - un error o timeout: ×`backoff` en el momento (los errores de las llamadas que ya estaban en
+      curso no vuelven a retroceder; cuentan para la ventana siguiente);
+    - en otro caso se mantiene.
+    """
+
+    def __init__(self, initial_limit: int = 1, min_limit: int = 1, max_limit: int = 8, window: int = 5,
+                 increase_below: float = 1.2, tolerance: float = 1.5, backoff: float = 0.5,
+                 baseline_drift: float = 0.02, history: int = 100):
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError(f"Se requiere 1 <= min_limit <= initial_limit <= max_limit "
+                             f"(recibido {min_limit}, {initial_limit}, {max_limit})")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.window = window
+        self.increase_below = increase_below
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.baseline_drift = baseline_drift
+
+        self.limit = float(initial_limit)
+        self.in_flight = 0
+        self.baselines: Dict[str, float] = {}
+        self.counts = {'calls': 0, 'errors': 0, 'timeouts': 0}
+        self.decision_counts = {decision: 0 for decision in DECISIONS}
+        self.decisions = deque(maxlen=history)
+        self._cond = threading.Condition()
+        self._cooldown = 0
+        self._reset_window()
+
+    def _reset_window(self):
+        self._samples: Dict[str, List[float]] = {}
+        self._window_calls = 0
+        self._window_errors = 0
+        self._window_peak = self.in_flight
+
+    @property
+    def current_limit(self) -> int:
+        return max(self.min_limit, int(self.limit))
+
+    def acquire(self) -> float:
+        """Espera a que haya lugar bajo el límite; devuelve los segundos de espera."""
+        start = time.perf_counter()
+        with self._cond:
+            while self.in_flight >= self.current_limit:
+                self._cond.wait()
+            self.in_flight += 1
+            self._window_peak = max(self._window_peak, self.in_flight)
+        return time.perf_counter() - start
+
+    def release(self, model: str, latency: Optional[float] = None, error: Optional[BaseException] = None):
+        """
+        Registra el resultado de una llamada (latencia o error) y decide si cambia el límite. Sin
+        ninguno de los dos la llamada se canceló antes de llegar al servidor y solo libera su lugar.
+        """
+        with self._cond:
+            self.in_flight -= 1
+            if latency is None and error is None:
+                self._cond.notify_all()
+                return
+            self.counts['calls'] += 1
+            self._window_calls += 1
+            self._cooldown -= 1
+            if error is not None:
+                self.counts['timeouts' if is_timeout(error) else 'errors'] += 1
+                self._window_errors += 1
+                # Retroceso inmediato, sin esperar a que se complete la ventana
+                if self._cooldown < 0:
+                    self._decide()
+                    self._cooldown = self.in_flight
+            else:
+                self._samples.setdefault(model, []).append(latency)
+                if self._window_calls >= max(self.window, self.current_limit):
+                    self._decide()
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, model: str):
+        """Ocupa un lugar durante el bloque y registra su latencia (o el error que lo interrumpa)."""
+        self.acquire()
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException as error:
+            self.release(model, error=error)
+            raise
+        self.release(model, time.perf_counter() - start)
+
+    def _latency_ratio(self) -> Optional[float]:
+        """Cociente mediana/línea de base de la ventana, ponderado por muestras (None si ningún modelo tiene base)."""
+        weighted, samples = 0.0, 0
+        for model, latencies in self._samples.items():
+            median = statistics.median(latencies)
+            baseline = self.baselines.get(model)
+            if baseline:
+                weighted += median / baseline * len(latencies)
+                samples += len(latencies)
+            self.baselines[model] = min(median, baseline * (1 + self.baseline_drift)) if baseline else median
+        return weighted / samples if samples else None
+
+    def _decide(self):
+        before = self.limit
+        ratio = self._latency_ratio()
+        if self._window_errors:
+            decision = 'decrease_error'
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+        elif ratio is None:
+            decision = 'warmup'
+        elif ratio > self.tolerance:
+            decision = 'decrease_latency'
+            self.limit = max(self.min_limit, self.limit * max(self.backoff, self.tolerance / ratio))
+        elif ratio <= self.increase_below and self._window_peak >= self.current_limit:
+            decision = 'increase'
+            self.limit = min(self.max_limit, self.limit + 1)
+        else:
+            # Latencia algo más alta, o la demanda no llegó al límite (no hay nada que medir al subirlo)
+            decision = 'hold_latency' if ratio > self.increase_below else 'hold'
+
+        self.decision_counts[decision] += 1
+        self.decisions.append({
+            'time': time.time(),
+            'decision': decision,
+            'limit_before': round(before, 3),
+            'limit_after': round(self.limit, 3),
+            'latency_ratio': ratio,
+            'calls': self._window_calls,
+            'errors': self._window_errors,
+            'peak_in_flight': self._window_peak
+        })
+        self._reset_window()
+
+    def report(self, recent: int = 10) -> Dict:
+        """Límite actual, llamadas en curso, errores, líneas de base por modelo y decisiones tomadas."""
+        with self._cond:
+            return {
+                'limit': self.current_limit,
+                'limit_value': self.limit,
+                'min_limit': self.min_limit,
+                'max_limit': self.max_limit,
+                'in_flight': self.in_flight,
+                **self.counts,
+                'baselines': dict(self.baselines),
+                'decisions': dict(self.decision_counts),
+                'recent_decisions': list(self.decisions)[-recent:] if recent else []
+            }
+
+    def print_report(self):
+        report = self.report(recent=0)
+        changes = {key: value for key, value in report['decisions'].items() if value}
+        print(f"Concurrencia adaptativa: límite {report['limit']} (rango {report['min_limit']}-{report['max_limit']}) | "
+              f"{report['calls']} llamadas, {report['errors']} errores, {report['timeouts']} timeouts | decisiones: {changes}")
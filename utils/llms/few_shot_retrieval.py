@@ -0,0 +1,147 @@
+import json
+import glob
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence
+
+from .cascade import ACCEPTABLE_SCORE
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+BEST_COMBINATIONS_PATTERN = 'results/best_combinations_v*.csv'
+FEW_SHOT_HEADER = "\n\n=== EJEMPLOS DE REFERENCIA ===\n"
+# Score mínimo (0-100) de una flashcard para usarla de ejemplo: el mismo que el modo cascada considera aceptable
+DEFAULT_MIN_SCORE = ACCEPTABLE_SCORE
+
+CUSTOMER_TYPES = ["Receptivo alto", "Receptivo moderado", "Evasivo"]
+CALL_PATTERNS = ["Historial insuficiente", "Llamadas frecuentes (semanal)", "Llamadas regulares (mensual)",
+                 "Llamadas esporádicas"]
+
+
+def render_few_shot_example(position: int, example: Dict) -> str:
+    """Texto de un ejemplo tal como se agrega al prompt."""
+    return (f"\nEjemplo {position}: {example['input']}\n"
+            f"Respuesta esperada:\n{json.dumps(example['output'], indent=2, ensure_ascii=False)}\n")
+
+
+def render_few_shot_examples(examples: List[Dict]) -> str:
+    return FEW_SHOT_HEADER + "".join(render_few_shot_example(i, example) for i, example in enumerate(examples, 1))
+
+
+def describe_summary(summary: Dict) -> str:
+    return (f"Cliente {summary['customer_type'].lower()}, {summary['patron_fechas'].lower()}, "
+            f"motivo frecuente: {summary['motivo_frecuente']}")
+
+
+class FewShotIndex:
+    """
+    Índice en memoria (sklearn NearestNeighbors) de flashcards pasadas con buen score, por las
+    features del resumen del cliente: receptividad, cantidad de llamadas, tipo de cliente, patrón
+    de fechas y motivo frecuente. `select` devuelve los k ejemplos más parecidos que entran en un
+    presupuesto de tokens. Los vecinos se cachean por vector de features (todas las celdas de un
+    cliente comparten la búsqueda) y `prefetch` resuelve muchos clientes en una sola consulta.
+    """
+
+    def __init__(self, examples: List[Dict], summaries: List[Dict], k: int = 2, token_budget: int = 600,
+                 max_history_calls: int = 5):
+        from sklearn.neighbors import NearestNeighbors
+        from ..execution.grid_planner import estimate_tokens
+
+        self.k = k
+        self.token_budget = token_budget
+        self.max_history_calls = max_history_calls
+        self.examples = examples
+        self.motivos = {motivo: i for i, motivo in enumerate(sorted({summary['motivo_frecuente'] for summary in summaries}))}
+        # Tokens de cada ejemplo renderizado (la posición cambia poco el conteo; se usa la 9 como cota)
+        self.example_tokens = [estimate_tokens(render_few_shot_example(9, example)) for example in examples]
+        self._neighbors: Dict[tuple, List[int]] = {}
+        # Margen de candidatos para el propio cliente (excluido) y ejemplos que no entran en el presupuesto
+        self._n_neighbors = min(len(examples), 2 * k + 1)
+        self._nn = NearestNeighbors(n_neighbors=self._n_neighbors).fit(self.features(summaries)) if examples else None
+
+    def __len__(self) -> int:
+        return len(self.examples)
+
+    def feature_vector(self, summary: Dict) -> List[float]:
+        vector = [summary['receptivity_ratio'],
+                  min(summary['total_llamadas'], self.max_history_calls) / self.max_history_calls,
+                  summary['sin_compromiso_count'] / self.max_history_calls]
+        vector += [float(summary['customer_type'] == customer_type) for customer_type in CUSTOMER_TYPES]
+        vector += [float(summary['patron_fechas'] == pattern) for pattern in CALL_PATTERNS]
+        motivo = [0.0] * len(self.motivos)
+        if summary['motivo_frecuente'] in self.motivos:
+            motivo[self.motivos[summary['motivo_frecuente']]] = 1.0
+        return vector + motivo
+
+    def features(self, summaries: Sequence[Dict]) -> 'np.ndarray':
+        import numpy as np
+        return np.array([self.feature_vector(summary) for summary in summaries], dtype=np.float64).reshape(len(summaries), -1)
+
+    def prefetch(self, summaries: Sequence[Dict]):
+        """Busca en lote los vecinos de varios clientes (p.ej. todos los de una corrida)."""
+        pending = {}
+        for summary in summaries:
+            key = tuple(self.feature_vector(summary))
+            if key not in self._neighbors:
+                pending[key] = None
+        if not pending or self._nn is None:
+            return
+        import numpy as np
+        _, indices = self._nn.kneighbors(np.array(list(pending), dtype=np.float64))
+        for key, row in zip(pending, indices):
+            self._neighbors[key] = row.tolist()
+
+    def neighbors(self, summary: Dict) -> List[int]:
+        if self._nn is None:
+            return []
+        key = tuple(self.feature_vector(summary))
+        neighbors = self._neighbors.get(key)
+        if neighbors is None:
+            import numpy as np
+            _, indices = self._nn.kneighbors(np.array([key], dtype=np.float64))
+            neighbors = self._neighbors[key] = indices[0].tolist()
+        return neighbors
+
+    def select(self, summary: Dict, exclude: Optional[str] = None, k: Optional[int] = None,
+               token_budget: Optional[int] = None) -> List[Dict]:
+        """Hasta k ejemplos, del más parecido al menos, sin pasar `token_budget` ni repetir al cliente `exclude`."""
+        k = self.k if k is None else k
+        budget = self.token_budget if token_budget is None else token_budget
+        selected, used = [], 0
+        for index in self.neighbors(summary):
+            example = self.examples[index]
+            if example['customer_name'] == exclude or used + self.example_tokens[index] > budget:
+                continue
+            selected.append(example)
+            used += self.example_tokens[index]
+            if len(selected) == k:
+                break
+        return selected
+
+    @classmethod
+    def from_results(cls, summary_table: 'pd.DataFrame', pattern: str = BEST_COMBINATIONS_PATTERN,
+                     min_score: float = DEFAULT_MIN_SCORE, **kwargs) -> 'FewShotIndex':
+        """
+        Índice con la mejor flashcard de cada cliente en los best_combinations_v*.csv (score >= `min_score`).
+        `summary_table` es la salida de CallCenterDataProcessor.summarize_call_store (indexada por cliente).
+        """
+        import pandas as pd
+        from ..analysis.results_index import parse_literal
+
+        frames = [pd.read_csv(path) for path in sorted(glob.glob(pattern))]
+        best = {}
+        if frames:
+            df = pd.concat(frames, ignore_index=True)
+            df = df[df['customer_name'].isin(summary_table.index) & (df['academic_scores'] >= min_score)]
+            for row in df.sort_values('academic_scores', ascending=False).itertuples(index=False):
+                flashcard = parse_literal(row.flashcard)
+                if row.customer_name not in best and isinstance(flashcard, dict) and flashcard:
+                    best[row.customer_name] = (flashcard, row.academic_scores)
+
+        examples, summaries = [], []
+        for customer_name, (flashcard, score) in best.items():
+            summary = summary_table.loc[customer_name].to_dict()
+            summaries.append(summary)
+            examples.append({'customer_name': customer_name, 'score': score,
+                             'input': describe_summary(summary), 'output': flashcard})
+        return cls(examples, summaries, **kwargs)
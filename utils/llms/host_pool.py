@@ -0,0 +1,225 @@
+import time
+import httpx
+import ollama
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, List, Optional
+
+
+def normalize_model_name(name: str) -> str:
+    return name if ':' in name else f"{name}:latest"
+
+
+class OllamaHost:
+    def __init__(self, url: str, timeout: float, health_timeout: float = 2.0):
+        self.url = url
+        self.client = ollama.Client(host=url, timeout=timeout)
+        # Cliente aparte para los health checks: un host colgado no debe retenerlos `timeout` segundos
+        self.health_client = ollama.Client(host=url, timeout=health_timeout)
+        self.outstanding = 0
+        self.loaded_models = set()
+        self.healthy = True
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+        self.requests = 0
+        self.failures = 0
+
+    def is_available(self, now: float) -> bool:
+        # Con el circuito abierto el host queda fuera hasta que vence el cooldown (half-open)
+        return self.healthy and now >= self.open_until
+
+
+class OllamaHostPool:
+    """
+    Pool de clientes Ollama en varios hosts.
+
+    - Ruteo por menor número de requests en curso, priorizando hosts que ya tienen el modelo cargado.
+    - Health checks periódicos vía /api/ps en segundo plano, con timeout corto (también actualizan
+      los modelos cargados); nunca se hacen en el hilo de un request.
+    - Circuit breaker por host tras `failure_threshold` errores consecutivos.
+    - Hedged requests opcionales: si la respuesta tarda más de `hedge_after` segundos
+      se lanza una segunda petición a otro host y se usa la primera que responda.
+    """
+
+    def __init__(self, hosts: List[str], timeout: float = 120.0, health_interval: float = 15.0,
+                 failure_threshold: int = 3, cooldown: float = 30.0, hedge_after: Optional[float] = None,
+                 health_timeout: float = 2.0):
+        if not hosts:
+            raise ValueError("Se necesita al menos un host de Ollama")
+
+        self.hosts = [OllamaHost(url.strip(), timeout, health_timeout) for url in hosts]
+        self.health_interval = health_interval
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.hedge_after = hedge_after
+        self.hedged_requests = 0
+        self.hedge_wins = 0
+        self._last_health_check = 0.0
+        self._health_thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(4, 4 * len(self.hosts)))
+
+    # === HEALTH CHECKS ===
+    def check_health(self):
+        for host in self.hosts:
+            try:
+                response = host.health_client.ps()
+                loaded = {normalize_model_name(model.model or model.name or '') for model in response.models}
+                with self._lock:
+                    host.healthy = True
+                    host.loaded_models = loaded
+            except Exception:
+                with self._lock:
+                    host.healthy = False
+        self._last_health_check = time.monotonic()
+
+    def _maybe_check_health(self):
+        """Lanza un health check en segundo plano si toca y no hay otro en curso (no bloquea el request)."""
+        with self._lock:
+            due = time.monotonic() - self._last_health_check >= self.health_interval
+            if not due or (self._health_thread is not None and self._health_thread.is_alive()):
+                return
+            self._health_thread = threading.Thread(target=self.check_health, daemon=True)
+            self._health_thread.start()
+
+    # === RUTEO ===
+    def pick(self, model: str, exclude: tuple = ()) -> OllamaHost:
+        model = normalize_model_name(model)
+        now = time.monotonic()
+        with self._lock:
+            candidates = [host for host in self.hosts if host not in exclude and host.is_available(now)]
+            if not candidates:
+                raise ConnectionError("No hay hosts de Ollama disponibles")
+
+            host = min(candidates, key=lambda h: (model not in h.loaded_models, h.outstanding, self.hosts.index(h)))
+            host.outstanding += 1
+            host.requests += 1
+            return host
+
+    def _record_success(self, host: OllamaHost, model: str):
+        with self._lock:
+            host.consecutive_failures = 0
+            host.loaded_models.add(normalize_model_name(model))
+
+    def _record_failure(self, host: OllamaHost, error: Exception):
+        with self._lock:
+            # Errores 4xx (p.ej. modelo inexistente) no indican un host caído
+            if not self._is_retryable(error):
+                return
+            host.failures += 1
+            host.consecutive_failures += 1
+            if host.consecutive_failures >= self.failure_threshold:
+                host.open_until = time.monotonic() + self.cooldown
+
+    def _call(self, host: OllamaHost, model: str, kwargs: Dict):
+        try:
+            response = host.client.chat(model=model, **kwargs)
+        except (ollama.ResponseError, ConnectionError, httpx.HTTPError) as e:
+            self._record_failure(host, e)
+            raise
+        finally:
+            # Cualquier salida (también errores inesperados) libera el lugar tomado en pick()
+            with self._lock:
+                host.outstanding -= 1
+        self._record_success(host, model)
+        return response
+
+    def chat(self, model: str, **kwargs):
+        self._maybe_check_health()
+        if self.hedge_after is None:
+            return self._chat_with_failover(model, kwargs)
+        return self._chat_hedged(model, kwargs)
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        """Errores de conexión o del servidor (5xx): vale la pena reintentar en otro host."""
+        return not (isinstance(error, ollama.ResponseError) and error.status_code < 500)
+
+    def _chat_with_failover(self, model: str, kwargs: Dict):
+        primary = self.pick(model)
+        try:
+            return self._call(primary, model, kwargs)
+        except (ollama.ResponseError, ConnectionError, httpx.HTTPError) as e:
+            if not self._is_retryable(e):
+                raise
+            try:
+                secondary = self.pick(model, exclude=(primary,))
+            except ConnectionError:
+                raise e
+            return self._call(secondary, model, kwargs)
+
+    def _chat_hedged(self, model: str, kwargs: Dict):
+        primary = self.pick(model)
+        futures = {self._executor.submit(self._call, primary, model, kwargs): primary}
+        hedge = None
+        done, _ = wait(futures, timeout=self.hedge_after)
+
+        if not done:
+            try:
+                secondary = self.pick(model, exclude=(primary,))
+                hedge = self._executor.submit(self._call, secondary, model, kwargs)
+                futures[hedge] = secondary
+                with self._lock:
+                    self.hedged_requests += 1
+            except ConnectionError:
+                pass
+
+        pending = set(futures)
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return future.result()
+                error = future.exception()
+                # El primario falló antes del hedge: failover a otro host, como sin hedging
+                if len(futures) == 1 and isinstance(error, (ollama.ResponseError, ConnectionError, httpx.HTTPError)) \
+                        and self._is_retryable(error):
+                    try:
+                        secondary = self.pick(model, exclude=(primary,))
+                    except ConnectionError:
+                        continue
+                    failover = self._executor.submit(self._call, secondary, model, kwargs)
+                    futures[failover] = secondary
+                    pending.add(failover)
+        raise error
+
+    def generate_all(self, model: str, **kwargs) -> List:
+        """
+        `generate` en todos los hosts disponibles a la vez (p.ej. un prompt vacío para precargar o,
+        con keep_alive=0, descargar un modelo). Los hosts que fallan se omiten y cuentan como fallo.
+        """
+        now = time.monotonic()
+        with self._lock:
+            hosts = [host for host in self.hosts if host.is_available(now)]
+        futures = [(host, self._executor.submit(host.client.generate, model=model, **kwargs)) for host in hosts]
+
+        responses = []
+        for host, future in futures:
+            try:
+                response = future.result()
+            except (ollama.ResponseError, ConnectionError, httpx.HTTPError) as e:
+                self._record_failure(host, e)
+                continue
+            responses.append(response)
+            with self._lock:
+                if kwargs.get('keep_alive') == 0:
+                    host.loaded_models.discard(normalize_model_name(model))
+                else:
+                    host.loaded_models.add(normalize_model_name(model))
+        return responses
+
+    def stats(self) -> List[Dict]:
+        with self._lock:
+            return [{
+                'host': host.url,
+                'healthy': host.healthy,
+                'circuit_open': time.monotonic() < host.open_until,
+                'outstanding': host.outstanding,
+                'requests': host.requests,
+                'failures': host.failures,
+                'loaded_models': sorted(host.loaded_models)
+            } for host in self.hosts]
@@ -0,0 +1,180 @@
+import re
+import ast
+import json
+from typing import Dict, List, Optional
+
+_DECODER = json.JSONDecoder()
+_PYTHON_LITERALS = {'true': 'True', 'false': 'False', 'null': 'None'}
+_MAX_TRUNCATION_CUTS = 8
+
+
+def strip_code_fences(text: str) -> str:
+    if '```json' in text:
+        return text.split('```json')[1].split('```')[0].strip()
+    elif '```' in text:
+        return text.split('```')[1].strip()
+    return text.strip()
+
+
+def parse_flashcard(text: str) -> Optional[Dict]:
+    """
+    Parser tolerante para la salida del LLM. Intenta, en orden:
+    JSON estricto, JSON con texto sobrante, literales con comillas simples y objetos truncados.
+    Devuelve None si no se puede recuperar ningún objeto.
+    """
+    if not text:
+        return None
+
+    body = strip_code_fences(text)
+    start = body.find('{')
+    if start == -1:
+        return None
+    body = body[start:]
+
+    # 1. JSON válido, ignorando el texto que venga después del objeto
+    try:
+        parsed, _ = _DECODER.raw_decode(body)
+        return parsed if isinstance(parsed, dict) else None
+    except json.JSONDecodeError:
+        pass
+
+    # 2. Objeto completo pero con comillas simples (estilo dict de Python)
+    span = _balanced_span(body)
+    if span is not None:
+        parsed = _literal_eval_dict(span)
+        if parsed is not None:
+            return parsed
+
+    # 3. Objeto truncado: cerrar strings y llaves abiertas
+    return _parse_truncated(body)
+
+
+# Campos de lista de la flashcard (clave larga y compacta); el resto son strings
+LIST_FIELDS = ('acciones_a_evitar', 'evitar')
+
+
+def _has_value(field: str, value) -> bool:
+    if field in LIST_FIELDS:
+        return isinstance(value, list) and len(value) > 0
+    return isinstance(value, str) and value != ''
+
+
+def missing_fields(flashcard: Dict, required: List[str]) -> List[str]:
+    """Campos ausentes, vacíos o con un tipo que no corresponde (p.ej. null o un número en un campo de texto)."""
+    return [field for field in required if not _has_value(field, flashcard.get(field))]
+
+
+def coerce_flashcard(flashcard: Dict, fields: List[str]) -> Dict:
+    """
+    Deja cada campo con el tipo que espera el evaluador: strings ('' si no lo es) y listas de strings
+    ([] si no es lista). Se aplica cuando ya no quedan reintentos, para puntuar como vacío lo que falte.
+
+    Cambio de score: un `cliente` objeto (dict) antes valía 0.0 en coherencia histórica y ahora se
+    puntúa como un `cliente` vacío (0.6, igual que si faltara). Las flashcards guardadas que se
+    re-evalúan sin pasar por aquí (rescoring) conservan el 0.0.
+    """
+    coerced = dict(flashcard)
+    for field in fields:
+        value = flashcard.get(field)
+        if field in LIST_FIELDS:
+            coerced[field] = [item for item in value if isinstance(item, str)] if isinstance(value, list) else []
+        else:
+            coerced[field] = value if isinstance(value, str) else ''
+    return coerced
+
+
+def build_missing_fields_prompt(prompt: str, partial: Dict, missing: List[str]) -> str:
+    return f"""{prompt}
+
+        YA GENERASTE PARTE DE LA FLASHCARD:
+        {json.dumps(partial, ensure_ascii=False)}
+
+        COMPLETA UNICAMENTE LOS CAMPOS FALTANTES: {', '.join(missing)}.
+        DEVUELVE SOLO UN OBJETO JSON CON ESOS CAMPOS."""
+
+
+def _balanced_span(text: str) -> Optional[str]:
+    depth = 0
+    quote = None
+    escape = False
+    for i, char in enumerate(text):
+        if quote:
+            if escape:
+                escape = False
+            elif char == '\\':
+                escape = True
+            elif char == quote:
+                quote = None
+        elif char in ('"', "'"):
+            quote = char
+        elif char in '{[':
+            depth += 1
+        elif char in '}]':
+            depth -= 1
+            if depth == 0:
+                return text[:i + 1]
+    return None
+
+
+def _literal_eval_dict(text: str) -> Optional[Dict]:
+    for candidate in (text, re.sub(r'\b(true|false|null)\b', lambda m: _PYTHON_LITERALS[m.group(1)], text)):
+        try:
+            parsed = ast.literal_eval(candidate)
+        except (ValueError, SyntaxError, MemoryError, RecursionError):
+            continue
+        if isinstance(parsed, dict):
+            return parsed
+    return None
+
+
+def _closers(text: str) -> Optional[str]:
+    """
+    Sufijo que cierra el string y los contenedores abiertos; None si el texto está desbalanceado.
+    El string se cierra con la comilla que lo abrió (doble o simple, estilo dict de Python).
+    """
+    stack = []
+    quote = None
+    escape = False
+    for char in text:
+        if quote:
+            if escape:
+                escape = False
+            elif char == '\\':
+                escape = True
+            elif char == quote:
+                quote = None
+        elif char in ('"', "'"):
+            quote = char
+        elif char in '{[':
+            stack.append('}' if char == '{' else ']')
+        elif char in '}]':
+            if not stack:
+                return None
+            stack.pop()
+    return (quote or '') + ''.join(reversed(stack))
+
+
+def _parse_truncated(body: str) -> Optional[Dict]:
+    candidate = body.rstrip()
+    for _ in range(_MAX_TRUNCATION_CUTS):
+        closers = _closers(candidate)
+        if closers is not None:
+            repaired = candidate.rstrip().rstrip(',') + closers
+            for text in (repaired, repaired.replace("'", '"')):
+                try:
+                    parsed = json.loads(text)
+                    if isinstance(parsed, dict):
+                        return parsed
+                except json.JSONDecodeError:
+                    pass
+            # Comillas simples con comillas dobles adentro: el reemplazo no sirve, sí el literal de Python
+            parsed = _literal_eval_dict(repaired)
+            if parsed is not None:
+                return parsed
+
+        # Descartar el último par clave/valor incompleto y volver a intentar
+        cut = candidate.rfind(',')
+        if cut <= 0:
+            return None
+        candidate = candidate[:cut]
+    return None
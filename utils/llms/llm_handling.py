@@ -1,4 +1,14 @@
-import ollama
+import os
+import re
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Union
+
+# ollama (httpx, pydantic) se importa en la primera llamada al modelo
+if TYPE_CHECKING:
+    from .host_pool import OllamaHostPool
+    from .response_cache import ResponseCache
+    from .request_scheduler import PriorityRequestScheduler
+    from .concurrency_limiter import AdaptiveConcurrencyLimiter
 
 # MODELS USED: (Both available in Ollama and in AWS Bedrock)
 """
@@ -26,6 +36,144 @@ SYSTEM_PROMPT = """Eres un asistente especializado en análisis de clientes para
         }
 """
 
+# Campos de la flashcard, tomados del JSON de ejemplo del SYSTEM_PROMPT
+FLASHCARD_FIELDS = re.findall(r'^\s*"(\w+)":', SYSTEM_PROMPT, flags=re.MULTILINE)
+PRESSURE_LEVELS = ["Baja", "Moderada", "Alta"]
+
+
+def build_flashcard_schema(fields: Optional[List[str]] = None) -> Dict:
+    """JSON schema para el parámetro `format` de Ollama (salida restringida a la flashcard)."""
+    fields = fields or FLASHCARD_FIELDS
+    properties = {}
+    for field in fields:
+        if field == 'acciones_a_evitar':
+            properties[field] = {"type": "array", "items": {"type": "string"}}
+        elif field == 'nivel_presion':
+            properties[field] = {"type": "string", "enum": PRESSURE_LEVELS}
+        else:
+            properties[field] = {"type": "string"}
+
+    return {"type": "object", "properties": properties, "required": list(fields)}
+
+
+FLASHCARD_SCHEMA = build_flashcard_schema()
+
+
+# Pool multi-host opcional: OLLAMA_HOSTS="http://gpu1:11434,http://gpu2:11434"
+_host_pool: Optional['OllamaHostPool'] = None
+
+
+def configure_host_pool(hosts: Optional[List[str]], **pool_kwargs) -> Optional['OllamaHostPool']:
+    """Activa el balanceo entre varios hosts de Ollama (None o lista vacía vuelve al host por defecto)."""
+    from .host_pool import OllamaHostPool
+
+    global _host_pool
+    _host_pool = OllamaHostPool(hosts, **pool_kwargs) if hosts else None
+    return _host_pool
+
+
+def get_host_pool() -> Optional['OllamaHostPool']:
+    return _host_pool
+
+
+# Caché de respuestas opcional: OLLAMA_RESPONSE_CACHE="results/response_cache.sqlite"
+_response_cache: Optional['ResponseCache'] = None
+
+
+def configure_response_cache(db_path: Optional[str]) -> Optional['ResponseCache']:
+    """Activa la caché persistente de respuestas (None la desactiva)."""
+    from .response_cache import ResponseCache
+
+    global _response_cache
+    _response_cache = ResponseCache(db_path) if db_path else None
+    return _response_cache
+
+
+def get_response_cache() -> Optional['ResponseCache']:
+    return _response_cache
+
+
+# Planificador por prioridades compartido entre procesos: OLLAMA_SCHEDULER="results/llm_scheduler.sqlite"
+_scheduler: Optional['PriorityRequestScheduler'] = None
+
+
+def configure_scheduler(db_path: Optional[str], capacity: Optional[int] = None,
+                        **scheduler_kwargs) -> Optional['PriorityRequestScheduler']:
+    """
+    Activa el planificador por prioridades (None lo desactiva). Sin `capacity` se usa
+    OLLAMA_NUM_PARALLEL (o 1) por cada host del pool; todos los procesos deberían usar la misma.
+    """
+    from .request_scheduler import PriorityRequestScheduler
+
+    global _scheduler
+    if capacity is None:
+        hosts = len(_host_pool.hosts) if _host_pool is not None else 1
+        capacity = int(os.getenv('OLLAMA_NUM_PARALLEL', '1')) * hosts
+    _scheduler = PriorityRequestScheduler(db_path, capacity, **scheduler_kwargs) if db_path else None
+    return _scheduler
+
+
+def get_scheduler() -> Optional['PriorityRequestScheduler']:
+    return _scheduler
+
+
+# Límite de concurrencia adaptativo (por proceso): OLLAMA_ADAPTIVE_CONCURRENCY=<límite máximo>
+_concurrency_limiter: Optional['AdaptiveConcurrencyLimiter'] = None
+
+
+def configure_concurrency_limiter(max_limit: Optional[int], **limiter_kwargs) -> Optional['AdaptiveConcurrencyLimiter']:
+    """Activa el límite adaptativo de llamadas concurrentes (None lo desactiva)."""
+    from .concurrency_limiter import AdaptiveConcurrencyLimiter
+
+    global _concurrency_limiter
+    _concurrency_limiter = AdaptiveConcurrencyLimiter(max_limit=max_limit, **limiter_kwargs) if max_limit else None
+    return _concurrency_limiter
+
+
+def get_concurrency_limiter() -> Optional['AdaptiveConcurrencyLimiter']:
+    return _concurrency_limiter
+
+
+if os.getenv('OLLAMA_HOSTS'):
+    configure_host_pool(
+        [host for host in os.environ['OLLAMA_HOSTS'].split(',') if host.strip()],
+        hedge_after=float(os.environ['OLLAMA_HEDGE_AFTER']) if os.getenv('OLLAMA_HEDGE_AFTER') else None
+    )
+
+if os.getenv('OLLAMA_RESPONSE_CACHE'):
+    configure_response_cache(os.environ['OLLAMA_RESPONSE_CACHE'])
+
+if os.getenv('OLLAMA_SCHEDULER'):
+    configure_scheduler(os.environ['OLLAMA_SCHEDULER'])
+
+if os.getenv('OLLAMA_ADAPTIVE_CONCURRENCY'):
+    configure_concurrency_limiter(int(os.environ['OLLAMA_ADAPTIVE_CONCURRENCY']))
+
+
+def _chat(**kwargs):
+    if _host_pool is not None:
+        return _host_pool.chat(**kwargs)
+    import ollama
+    return ollama.chat(**kwargs)
+
+
+def _generate(**kwargs) -> List:
+    """`generate` en el host por defecto o en todos los hosts del pool."""
+    if _host_pool is not None:
+        return _host_pool.generate_all(**kwargs)
+    import ollama
+    return [ollama.generate(**kwargs)]
+
+
+def preload_model(model: str, keep_alive: Optional[Union[float, str]] = None) -> float:
+    """Carga el modelo en memoria (generate sin prompt) en cada host; devuelve la mayor duración de carga en segundos."""
+    responses = _generate(model=model, prompt='', keep_alive=keep_alive)
+    return max(((response.get('load_duration') or 0) / 1e9 for response in responses), default=0.0)
+
+
+def unload_model(model: str):
+    _generate(model=model, prompt='', keep_alive=0)
+
 
 def remove_thinking_process(response): # -> only for R1 model
     start_thinking_command = "Thinking..." if "Thinking..." in response else "<think>"
@@ -38,19 +186,110 @@ def remove_thinking_process(response): # -> only for R1 model
         response = response[:start_index] + response[end_index + len(end_thinking_command):]
     return response
 
-def llm(prompt: str, model: str) -> str:
-    client = ollama.chat(
-        model=model,
-        messages=[
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": prompt + "\n\nRESPONDE SIEMPRE Y UNICAMENTE EN EL FORMATO JSON VÁLIDO CON LA ESTRUCTURA ESPECIFICADA SIN DAR MAS CONTEXTO O FRASE."}
-        ]
-    )
+def build_messages(prompt: str, system_prompt: str = SYSTEM_PROMPT) -> List[Dict]:
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": prompt + "\n\nRESPONDE SIEMPRE Y UNICAMENTE EN EL FORMATO JSON VÁLIDO CON LA ESTRUCTURA ESPECIFICADA SIN DAR MAS CONTEXTO O FRASE."}
+    ]
+
 
+def llm_call(prompt: str, model: str, keep_alive: Optional[Union[float, str]] = None,
+             format: Optional[Union[str, Dict]] = None, system_prompt: str = SYSTEM_PROMPT,
+             options: Optional[Dict] = None, priority: Optional[str] = None) -> Dict:
+    """
+    Llama al modelo y devuelve el contenido junto con las métricas de Ollama (duraciones en segundos).
+    `options` son las opciones de generación de Ollama (num_ctx, num_predict, temperature, num_thread...);
+    sin ellas se usan las del servidor/Modelfile. Con el límite adaptativo o el planificador activos la
+    llamada espera su turno (el planificador, un slot de su clase: `priority` o la del proceso); la
+    latencia no incluye esa espera (va en `queue_seconds`).
+    """
+    start = time.perf_counter()
+    messages = build_messages(prompt, system_prompt)
+
+    cache_key = None
+    if _response_cache is not None:
+        from .response_cache import response_cache_key
+
+        cache_key = response_cache_key(model, messages, format, options)
+        cached = _response_cache.get(cache_key)
+        if cached is not None:
+            # Respuesta ya conocida: no hay tiempo de LLM que contabilizar
+            stats = {key: 0 for key in cached['stats']}
+            stats['latency'] = time.perf_counter() - start
+            return {'content': cached['content'], 'stats': stats}
+
+    # El límite adaptativo (este proceso) va antes que el planificador compartido: su latencia no incluye esperas
+    limiter, scheduler = _concurrency_limiter, _scheduler
+    queue_seconds = limiter.acquire() if limiter is not None else None
+    if scheduler is not None:
+        from .request_scheduler import get_default_priority
+
+        try:
+            slot_id, scheduler_seconds = scheduler.acquire(priority or get_default_priority())
+        except BaseException:
+            if limiter is not None:
+                limiter.release(model)
+            raise
+        queue_seconds = (queue_seconds or 0.0) + scheduler_seconds
+    if queue_seconds is not None:
+        start = time.perf_counter()
+
+    try:
+        client = _chat(
+            model=model,
+            messages=messages,
+            keep_alive=keep_alive,
+            format=format,
+            options=options or None
+        )
+    except Exception as error:
+        if limiter is not None:
+            limiter.release(model, error=error)
+        raise
+    finally:
+        if scheduler is not None:
+            scheduler.release(slot_id)
+    latency = time.perf_counter() - start
+    if limiter is not None:
+        limiter.release(model, latency)
+
+    response = client['message']['content']
     if model == "deepseek-r1":
-        response = client['message']['content']
         response = remove_thinking_process(response)
-        return response
-    
-    return client['message']['content']
-    
\ No newline at end of file
+
+    stats = extract_llm_stats(client, latency)
+    if queue_seconds is not None:
+        stats['queue_seconds'] = queue_seconds
+    if cache_key is not None:
+        _response_cache.put(cache_key, model, response, stats)
+
+    return {
+        'content': response,
+        'stats': stats
+    }
+
+
+def extract_llm_stats(client, latency: float) -> Dict:
+    # Ollama reporta las duraciones en nanosegundos
+    def seconds(key: str) -> float:
+        return (client.get(key) or 0) / 1e9
+
+    return {
+        'latency': latency,
+        'load_duration': seconds('load_duration'),
+        'total_duration': seconds('total_duration'),
+        'prompt_eval_count': client.get('prompt_eval_count') or 0,
+        'eval_count': client.get('eval_count') or 0,
+        'eval_duration': seconds('eval_duration')
+    }
+
+
+def merge_llm_stats(total: Dict, stats: Dict) -> Dict:
+    """Acumula las métricas de varias llamadas (p.ej. reintentos) de la misma celda; una métrica que falte en una cuenta como 0."""
+    return {key: total.get(key, 0) + stats.get(key, 0) for key in {**total, **stats}}
+
+
+def llm(prompt: str, model: str, keep_alive: Optional[Union[float, str]] = None,
+        format: Optional[Union[str, Dict]] = None, options: Optional[Dict] = None,
+        priority: Optional[str] = None) -> str:
+    return llm_call(prompt, model, keep_alive, format, options=options, priority=priority)['content']
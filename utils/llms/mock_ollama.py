@@ -0,0 +1,275 @@
+import json
+import math
+import time
+import random
+import argparse
+import threading
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+# Servidor HTTP que imita la API de Ollama (/api/chat, /api/generate, /api/ps, /api/tags, /api/version)
+# para pruebas locales de balanceo, carga y concurrencia sin GPU.
+
+MOCK_FLASHCARD = {
+    "nivel_presion": "Moderada",
+    "tipificacion_operativa": "Receptivo moderado con necesidades de coordinación",
+    "primer_dialogo": "Buenas tardes, le llamamos para coordinar el pago pendiente.",
+    "accion_si_responde_si": "Perfecto, coordinemos el pago para una fecha conveniente",
+    "accion_si_responde_no": "Entiendo, ¿te parece si coordinamos una fecha mejor?",
+    "acciones_a_evitar": ["Presionar por fecha inmediata", "Ignorar limitación económica"],
+    "ultimo_contacto": "2025-05-13",
+    "canal": "CallCenter",
+    "comentario": "Cliente que corta la llamada",
+    "canal_recomendado": "CallCenter",
+    "cliente": "Receptivo moderado"
+}
+
+
+def _normalize_model(name: str) -> str:
+    return name if ':' in name else f"{name}:latest"
+
+
+class LatencyProfile:
+    """
+    Distribución de tiempos a reproducir en el mock: muestras (prefill_s, eval_count, eval_s) por
+    modelo, tomadas de corridas reales (llm_stats de all_results_v*.csv o el feed de progreso).
+    Cada request sortea una muestra del modelo pedido (o de todas si el modelo no tiene muestras).
+    `time_scale` comprime los tiempos (p.ej. 0.1 = 10x más rápido) manteniendo la forma.
+    """
+
+    def __init__(self, samples: Dict[str, List[Tuple[float, int, float]]], time_scale: float = 1.0,
+                 seed: Optional[int] = None):
+        samples = {_normalize_model(model): rows for model, rows in samples.items() if rows}
+        if not samples:
+            raise ValueError("LatencyProfile sin muestras")
+        self.samples = samples
+        self.pooled = [row for rows in samples.values() for row in rows]
+        self.time_scale = time_scale
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self, model: str) -> Tuple[float, int, float]:
+        rows = self.samples.get(_normalize_model(model), self.pooled)
+        with self._lock:
+            prefill, eval_count, eval_seconds = self._random.choice(rows)
+        return prefill * self.time_scale, eval_count, eval_seconds * self.time_scale
+
+    @classmethod
+    def from_results(cls, pattern: str = 'results/all_results_v*.csv', **kwargs) -> 'LatencyProfile':
+        import glob
+        import pandas as pd
+        from ..analysis.results_index import parse_literal
+
+        samples: Dict[str, List[Tuple[float, int, float]]] = {}
+        for path in glob.glob(pattern):
+            for metadata in pd.read_csv(path)['metadata'].apply(parse_literal):
+                stats = metadata.get('llm_stats') if isinstance(metadata, dict) else None
+                if stats and stats.get('eval_duration'):
+                    prefill = max(0.0, stats['total_duration'] - stats['eval_duration'] - stats.get('load_duration', 0.0))
+                    samples.setdefault(metadata['model_name'], []).append(
+                        (prefill, int(stats['eval_count']), stats['eval_duration']))
+        return cls(samples, **kwargs)
+
+    @classmethod
+    def from_progress_feed(cls, path: str = 'results/run_progress.jsonl', **kwargs) -> 'LatencyProfile':
+        """Desde el feed de progreso: latencia total y tokens/s por celda (el resto de la latencia cuenta como prefill)."""
+        samples: Dict[str, List[Tuple[float, int, float]]] = {}
+        with open(path, 'r', encoding='utf-8') as feed:
+            for line in feed:
+                event = json.loads(line)
+                if event.get('type') == 'cell' and event.get('tokens_per_second'):
+                    eval_seconds = event['eval_count'] / event['tokens_per_second']
+                    samples.setdefault(event['model_name'], []).append(
+                        (max(0.0, event['latency'] - eval_seconds), int(event['eval_count']), eval_seconds))
+        return cls(samples, **kwargs)
+
+    @classmethod
+    def lognormal(cls, median_latency: float = 8.0, sigma: float = 0.5, tokens_per_second: float = 15.0,
+                  prefill_fraction: float = 0.1, size: int = 1000, seed: Optional[int] = 0, **kwargs) -> 'LatencyProfile':
+        """Sin historial: latencias lognormales (cola larga) alrededor de `median_latency`."""
+        generator = random.Random(seed)
+        rows = []
+        for _ in range(size):
+            latency = generator.lognormvariate(math.log(median_latency), sigma)
+            eval_seconds = latency * (1 - prefill_fraction)
+            rows.append((latency * prefill_fraction, max(1, int(eval_seconds * tokens_per_second)), eval_seconds))
+        return cls({'*': rows}, seed=seed, **kwargs)
+
+
+class MockOllamaServer:
+    def __init__(self, port: int = 0, host: str = "127.0.0.1",
+                 latency: Union[float, Callable[[], float]] = 0.05,
+                 loaded_models: Iterable[str] = (), load_duration: float = 2.0,
+                 tokens_per_second: float = 40.0, fail_rate: float = 0.0,
+                 response: Optional[Union[Dict, Callable[[Dict], Dict]]] = None, simulate_decoding: bool = False,
+                 profile: Optional[LatencyProfile] = None):
+        self.latency = latency
+        self.loaded_models = {_normalize_model(model) for model in loaded_models}
+        self.load_duration = load_duration
+        self.tokens_per_second = tokens_per_second
+        self.fail_rate = fail_rate
+        # `response` puede ser una función del body del request (p.ej. para responder según `format`)
+        self.response = response or MOCK_FLASHCARD
+        # Con simulate_decoding la latencia incluye el tiempo de generar eval_count tokens
+        self.simulate_decoding = simulate_decoding
+        # Con `profile` los tiempos y tokens se sortean de una distribución registrada (reemplaza latency)
+        self.profile = profile
+        self.healthy = True
+        self.request_counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockOllamaServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _next_latency(self) -> float:
+        return self.latency() if callable(self.latency) else self.latency
+
+    def _count(self, path: str):
+        with self._lock:
+            self.request_counts[path] = self.request_counts.get(path, 0) + 1
+
+    def _generation(self, body: Dict) -> Dict:
+        model = _normalize_model(body.get('model', ''))
+        with self._lock:
+            cold = model not in self.loaded_models
+            self.loaded_models.add(model)
+
+        response = self.response(body) if callable(self.response) else self.response
+        content = json.dumps(response, ensure_ascii=False)
+        eval_count = max(1, len(content) // 4)
+        # num_predict corta la generación como en Ollama (la respuesta queda truncada)
+        num_predict = (body.get('options') or {}).get('num_predict')
+        if num_predict and num_predict > 0 and eval_count > num_predict:
+            eval_count = num_predict
+            content = content[:num_predict * 4]
+
+        if self.profile is not None:
+            prefill, eval_count, eval_duration = self.profile.sample(body.get('model', ''))
+            if num_predict and num_predict > 0 and eval_count > num_predict:
+                eval_count, eval_duration = num_predict, eval_duration * num_predict / eval_count
+            latency = prefill + eval_duration
+        else:
+            latency = self._next_latency()
+            if self.simulate_decoding:
+                latency += eval_count / self.tokens_per_second
+            eval_duration = min(latency, eval_count / self.tokens_per_second)
+        load_duration = self.load_duration if cold else 0.0
+        time.sleep(latency + load_duration)
+        return {
+            "model": body.get('model', ''),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "content": content,
+            "done": True,
+            "done_reason": "stop",
+            "total_duration": int((latency + load_duration) * 1e9),
+            "load_duration": int(load_duration * 1e9),
+            "prompt_eval_count": sum(len(m.get('content', '')) for m in body.get('messages', [])) // 4,
+            "eval_count": eval_count,
+            "eval_duration": int(eval_duration * 1e9)
+        }
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, payload: Dict):
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                server._count(self.path)
+                if not server.healthy:
+                    return self._send(503, {"error": "unhealthy"})
+                if self.path == '/api/ps':
+                    with server._lock:
+                        models = [{"name": m, "model": m} for m in sorted(server.loaded_models)]
+                    return self._send(200, {"models": models})
+                if self.path == '/api/tags':
+                    return self._send(200, {"models": []})
+                if self.path == '/api/version':
+                    return self._send(200, {"version": "mock"})
+                self._send(404, {"error": "not found"})
+
+            def do_HEAD(self):
+                self.send_response(200 if server.healthy else 503)
+                self.end_headers()
+
+            def do_POST(self):
+                server._count(self.path)
+                length = int(self.headers.get('Content-Length', 0))
+                body = json.loads(self.rfile.read(length) or b'{}')
+
+                if not server.healthy or random.random() < server.fail_rate:
+                    return self._send(500, {"error": "mock failure"})
+
+                if self.path in ('/api/chat', '/api/generate'):
+                    # generate sin prompt solo carga/descarga el modelo (como en Ollama)
+                    if self.path == '/api/generate' and not body.get('prompt'):
+                        model = _normalize_model(body.get('model', ''))
+                        if body.get('keep_alive') == 0:
+                            with server._lock:
+                                server.loaded_models.discard(model)
+                            return self._send(200, {"model": body.get('model', ''), "response": "", "done": True})
+
+                    result = server._generation(body)
+                    content = result.pop('content')
+                    if self.path == '/api/chat':
+                        result['message'] = {"role": "assistant", "content": content}
+                    else:
+                        result['response'] = content
+                    return self._send(200, result)
+
+                self._send(404, {"error": "not found"})
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidores Ollama simulados para pruebas locales")
+    parser.add_argument('--ports', type=int, nargs='+', default=[11501, 11502, 11503])
+    parser.add_argument('--latency', type=float, default=0.5)
+    parser.add_argument('--fail-rate', type=float, default=0.0)
+    parser.add_argument('--profile', choices=['none', 'results', 'feed', 'lognormal'], default='none',
+                        help="Reproducir tiempos registrados (all_results_v*.csv / feed de progreso) o lognormales")
+    parser.add_argument('--time-scale', type=float, default=1.0)
+    args = parser.parse_args()
+
+    profile = None
+    if args.profile == 'results':
+        profile = LatencyProfile.from_results(time_scale=args.time_scale)
+    elif args.profile == 'feed':
+        profile = LatencyProfile.from_progress_feed(time_scale=args.time_scale)
+    elif args.profile == 'lognormal':
+        profile = LatencyProfile.lognormal(median_latency=args.latency, time_scale=args.time_scale)
+
+    servers = [MockOllamaServer(port, latency=args.latency, fail_rate=args.fail_rate, profile=profile).start()
+               for port in args.ports]
+    print("Mock Ollama escuchando en: " + ", ".join(server.url for server in servers))
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        for server in servers:
+            server.stop()
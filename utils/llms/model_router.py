@@ -0,0 +1,165 @@
+import os
+import re
+import glob
+import math
+import pandas as pd
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional
+from .model_scheduler import DEFAULT_OPTIONS
+
+ALL_SEGMENTS = '*'
+
+
+@dataclass
+class RouteDecision:
+    segment: str
+    model_name: str
+    prompt_variation: str
+    version: int
+    expected_score: float
+    expected_latency: float
+    baseline_latency: float
+    meets_target: bool
+
+    def to_dict(self) -> Dict:
+        # Sin latencias registradas quedan NaN, que no es JSON válido: se reportan como None
+        return {key: _finite(value) for key, value in asdict(self).items()}
+
+
+def _finite(value):
+    return None if isinstance(value, float) and not math.isfinite(value) else value
+
+
+def _latency(metadata) -> float:
+    """Latencia medida de la celda; NaN sin métricas o si la respondió la caché (sin tiempo de Ollama)."""
+    stats = metadata.get('llm_stats') if isinstance(metadata, dict) else None
+    if not isinstance(stats, dict) or stats.get('total_duration') == 0:
+        return math.nan
+    return stats.get('latency', math.nan)
+
+
+class SegmentRouter:
+    """
+    Router por segmento de deudor (`customer_type` de `get_customer_summary`): aprende de los
+    resultados de tuning qué (modelo, versión, variación) rinde en cada segmento y envía cada
+    pedido a la combinación más rápida que alcanza el score objetivo.
+
+    Si ninguna combinación alcanza el objetivo se usa la de mejor score. Segmentos con menos de
+    `min_samples` resultados usan las estadísticas de todos los segmentos. Las celdas respondidas
+    por la caché no cuentan para la latencia; sin ninguna latencia medida se elige solo por score.
+    """
+
+    def __init__(self, target_score: float = 50.0, min_samples: int = 2,
+                 default_model: str = "mistral", default_variation: Optional[str] = None, default_version: int = 1):
+        self.target_score = target_score
+        self.min_samples = min_samples
+        self.default_model = default_model
+        self.default_variation = default_variation
+        self.default_version = default_version
+        self.table = pd.DataFrame()
+        self.history: List[Dict] = []
+
+    def fit(self, results_df: pd.DataFrame, segments: Dict[str, str]) -> 'SegmentRouter':
+        """`results_df` necesita las columnas de all_results más `version`; `segments` mapea cliente → segmento."""
+        # El router llama al LLM sin opciones de generación: las celdas de un sweep de opciones no cuentan
+        results_df = results_df[results_df['metadata'].map(lambda m: m.get('options_name', DEFAULT_OPTIONS) == DEFAULT_OPTIONS)]
+        df = pd.DataFrame({
+            'segment': results_df['customer_name'].map(segments),
+            'model_name': results_df['metadata'].map(lambda m: m.get('model_name')),
+            'prompt_variation': results_df['metadata'].map(lambda m: m.get('prompt_variation')),
+            'version': results_df['version'],
+            'score': pd.to_numeric(results_df['academic_scores'], errors='coerce'),
+            'latency': results_df['metadata'].map(_latency)
+        }).dropna(subset=['segment', 'score'])
+
+        keys = ['model_name', 'version', 'prompt_variation']
+        per_segment = df.groupby(['segment'] + keys)
+        overall = df.assign(segment=ALL_SEGMENTS).groupby(['segment'] + keys)
+        self.table = pd.concat([
+            grouped.agg(samples=('score', 'size'), score=('score', 'mean'), latency=('latency', 'mean')).reset_index()
+            for grouped in (per_segment, overall)
+        ], ignore_index=True)
+
+        # Combinaciones sin latencia medida: se estima con la latencia media del modelo
+        model_latency = df.groupby('model_name')['latency'].mean()
+        self.table['latency'] = self.table['latency'].fillna(self.table['model_name'].map(model_latency))
+        return self
+
+    @classmethod
+    def from_results(cls, segments: Dict[str, str], pattern: str = 'results/all_results_v*.csv', **kwargs) -> 'SegmentRouter':
+        from ..analysis.results_index import parse_literal
+
+        frames = []
+        for path in sorted(glob.glob(pattern)):
+            version = re.search(r'_v(\d+)\.csv$', os.path.basename(path))
+            if not version:
+                continue
+            df = pd.read_csv(path)
+            df['metadata'] = df['metadata'].apply(parse_literal)
+            df['version'] = int(version.group(1))
+            frames.append(df)
+        results_df = pd.concat(frames, ignore_index=True) if frames else \
+            pd.DataFrame(columns=['customer_name', 'academic_scores', 'metadata', 'version'])
+        return cls(**kwargs).fit(results_df, segments)
+
+    def candidates(self, segment: str) -> pd.DataFrame:
+        rows = self.table[self.table['segment'] == segment]
+        if rows.empty or rows['samples'].sum() < self.min_samples:
+            rows = self.table[self.table['segment'] == ALL_SEGMENTS]
+        return rows
+
+    def _baseline_latency(self, rows: pd.DataFrame) -> float:
+        default = rows[(rows['model_name'] == self.default_model) & (rows['version'] == self.default_version)]
+        if self.default_variation:
+            default = default[default['prompt_variation'] == self.default_variation]
+        return float(default['latency'].mean()) if not default.empty else math.nan
+
+    def route(self, segment: str, target_score: Optional[float] = None) -> Optional[RouteDecision]:
+        target_score = self.target_score if target_score is None else target_score
+        rows = self.candidates(segment)
+        if rows.empty:
+            return None
+
+        eligible = rows[rows['score'] >= target_score]
+        if eligible.empty:
+            # Nadie alcanza el objetivo: mejor score y, a igual score, la más rápida
+            best = rows.sort_values(['score', 'latency'], ascending=[False, True]).iloc[0]
+        elif eligible['latency'].isna().all():
+            # Sin latencias medidas (resultados sin llm_stats o solo de la caché): solo cuenta el score
+            best = eligible.sort_values('score', ascending=False, kind='stable').iloc[0]
+        else:
+            # La más rápida entre las que alcanzan el objetivo (sin latencia medida quedan al final)
+            best = eligible.sort_values(['latency', 'score'], ascending=[True, False], na_position='last').iloc[0]
+
+        return RouteDecision(
+            segment=segment,
+            model_name=best['model_name'],
+            prompt_variation=best['prompt_variation'],
+            version=int(best['version']),
+            expected_score=float(best['score']),
+            expected_latency=float(best['latency']),
+            baseline_latency=self._baseline_latency(rows),
+            meets_target=bool(best['score'] >= target_score)
+        )
+
+    def record(self, decision: RouteDecision, actual_latency: float, actual_score: float):
+        self.history.append({**asdict(decision), 'actual_latency': actual_latency, 'actual_score': actual_score})
+
+    def report(self) -> Dict:
+        """Ahorro de latencia esperado vs. real respecto del modelo por defecto, sobre los pedidos ruteados."""
+        if not self.history:
+            return {'requests': 0}
+        df = pd.DataFrame(self.history)
+        measured = df.dropna(subset=['baseline_latency', 'expected_latency'])
+        return {
+            'requests': len(df),
+            'met_target_rate': float(df['meets_target'].mean()),
+            'mean_expected_score': _finite(float(df['expected_score'].mean())),
+            'mean_actual_score': _finite(float(df['actual_score'].mean())),
+            'mean_expected_latency': _finite(float(df['expected_latency'].mean())),
+            'mean_actual_latency': _finite(float(df['actual_latency'].mean())),
+            'expected_savings_seconds': float((measured['baseline_latency'] - measured['expected_latency']).sum()),
+            'actual_savings_seconds': float((measured['baseline_latency'] - measured['actual_latency']).sum()),
+            'routes': df.groupby(['segment', 'model_name', 'prompt_variation']).size().rename('requests')
+                        .reset_index().to_dict('records')
+        }
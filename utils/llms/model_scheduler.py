@@ -0,0 +1,182 @@
+import threading
+import contextvars
+from dataclasses import dataclass
+from itertools import groupby
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Union
+
+# Nombre de la configuración sin opciones de generación (las del servidor/Modelfile)
+DEFAULT_OPTIONS = 'default'
+
+
+@dataclass
+class GridCell:
+    index: int
+    customer_name: str
+    model_name: str
+    prompt_variation: str
+    options_name: str = DEFAULT_OPTIONS
+
+
+def build_grid_cells(customers: List[str], models: List[str], variations: List[str],
+                     options_names: Sequence[str] = (DEFAULT_OPTIONS,)) -> List[GridCell]:
+    """Celdas del grid en el orden lógico cliente -> modelo -> variación -> opciones de generación."""
+    cells = []
+    for customer_name in customers:
+        for model_name in models:
+            for prompt_variation in variations:
+                for options_name in options_names:
+                    cells.append(GridCell(len(cells), customer_name, model_name, prompt_variation, options_name))
+    return cells
+
+
+class ModelAffinityScheduler:
+    """
+    Reordena el grid por modelo (model-major) para que Ollama cargue cada modelo
+    una sola vez, lo precarga con `keep_alive` y lo descarga al terminar su bloque.
+    Los resultados se devuelven en el orden lógico original.
+    """
+
+    def __init__(self, model_major: bool = True, keep_alive: Union[float, str] = "30m",
+                 unload_after_block: bool = True):
+        self.model_major = model_major
+        self.keep_alive = keep_alive if model_major else None
+        self.unload_after_block = unload_after_block
+        self.stats = {}
+        # Celdas de `stream` que todavía usan el LLM
+        self._in_flight = 0
+        self._idle = threading.Condition()
+
+    def plan(self, cells: List[GridCell]) -> List[GridCell]:
+        if not self.model_major:
+            return list(cells)
+
+        # Orden estable: los modelos en orden de primera aparición, las celdas en su orden lógico.
+        # Dentro de cada modelo se agrupan las opciones de generación: cambiar num_ctx/num_thread recarga el runner
+        model_order, options_order = {}, {}
+        for cell in cells:
+            model_order.setdefault(cell.model_name, len(model_order))
+            options_order.setdefault(cell.options_name, len(options_order))
+        return sorted(cells, key=lambda cell: (model_order[cell.model_name], options_order[cell.options_name], cell.index))
+
+    @staticmethod
+    def count_model_loads(cells: List[GridCell]) -> int:
+        loads = 0
+        previous_model = None
+        for cell in cells:
+            if cell.model_name != previous_model:
+                loads += 1
+                previous_model = cell.model_name
+        return loads
+
+    def preload(self, model_name: str) -> float:
+        from .llm_handling import preload_model
+
+        # Un generate sin prompt solo carga el modelo en memoria (en todos los hosts si hay pool)
+        return preload_model(model_name, self.keep_alive)
+
+    def unload(self, model_name: str):
+        from .llm_handling import unload_model
+
+        unload_model(model_name)
+
+    def stream(self, cells: List[GridCell]) -> Iterator[GridCell]:
+        """
+        Celdas en el orden planificado para un consumidor en streaming (el pipeline). Al cambiar de
+        bloque espera a que las celdas del modelo anterior terminen con el LLM (`release`), lo
+        descarga y precarga el siguiente: nunca quedan dos modelos cargados a la vez.
+        """
+        planned = self.plan(cells)
+        if not self.model_major:
+            yield from planned
+            return
+
+        current_model = None
+        for model_name, block in groupby(planned, key=lambda cell: cell.model_name):
+            if current_model is not None:
+                self._finish_block(current_model)
+            self.preload(model_name)
+            current_model = model_name
+            for cell in block:
+                with self._idle:
+                    self._in_flight += 1
+                yield cell
+        if current_model is not None:
+            self._finish_block(current_model)
+
+    def release(self):
+        """Una celda de `stream` ya no usa el LLM (terminó, falló o se descartó)."""
+        with self._idle:
+            self._in_flight -= 1
+            self._idle.notify_all()
+
+    def _finish_block(self, model_name: str):
+        with self._idle:
+            self._idle.wait_for(lambda: self._in_flight == 0)
+        if self.unload_after_block:
+            self.unload(model_name)
+
+    def run(self, cells: List[GridCell], run_cell: Callable[[GridCell], Dict], workers: int = 1) -> List[Dict]:
+        """
+        Ejecuta las celdas en el orden planificado. Con `workers` > 1 las celdas de cada bloque de
+        modelo corren en hilos (el ritmo real lo fija el límite de concurrencia de llm_call); el
+        bloque termina antes de descargar el modelo y pasar al siguiente.
+        """
+        planned = self.plan(cells)
+        results: List[Optional[Dict]] = [None] * len(cells)
+
+        preload_time = 0.0
+        cell_load_time = 0.0
+        current_model = None
+
+        # Sin model-major todo el grid es un solo bloque (no se precarga ni descarga)
+        blocks = groupby(planned, key=lambda cell: cell.model_name) if self.model_major else [(None, planned)]
+        executor = ThreadPoolExecutor(workers) if workers > 1 else None
+        # Las celdas en hilos ven el contexto del llamador (p.ej. la clase de `default_priority`)
+        context = contextvars.copy_context()
+        run_in_context = lambda cell: context.copy().run(run_cell, cell)
+        try:
+            for model_name, block in blocks:
+                if self.model_major:
+                    if current_model is not None and self.unload_after_block:
+                        self.unload(current_model)
+                    preload_time += self.preload(model_name)
+                    current_model = model_name
+
+                block = list(block)
+                for cell, result in zip(block, executor.map(run_in_context, block) if executor else map(run_cell, block)):
+                    cell_load_time += result.get('metadata', {}).get('llm_stats', {}).get('load_duration', 0.0)
+                    results[cell.index] = result
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        if self.model_major and current_model is not None and self.unload_after_block:
+            self.unload(current_model)
+
+        logical_loads = self.count_model_loads(cells)
+        planned_loads = self.count_model_loads(planned)
+        total_load_time = preload_time + cell_load_time
+        # Extrapolación (no se mide): costo medio por carga de esta corrida × cargas del orden lógico
+        avg_load_time = total_load_time / planned_loads if planned_loads else 0.0
+
+        self.stats = {
+            'logical_model_loads': logical_loads,
+            'planned_model_loads': planned_loads,
+            'preload_time': preload_time,
+            'in_cell_load_time': cell_load_time,
+            'total_load_time': total_load_time,
+            'logical_load_time_extrapolated': avg_load_time * logical_loads
+        }
+
+        return results
+
+    def print_report(self):
+        if not self.stats:
+            return
+        print(f"""
+    Carga de modelos ({'model-major' if self.model_major else 'orden lógico'})\n
+     - Cargas de modelo (orden lógico): {self.stats['logical_model_loads']}\n
+     - Cargas de modelo (planificado): {self.stats['planned_model_loads']}\n
+     - Tiempo de carga medido: {self.stats['total_load_time']:.2f}s (precarga {self.stats['preload_time']:.2f}s)\n
+     - Tiempo de carga en orden lógico (estimado, no medido: carga media × cargas lógicas): {self.stats['logical_load_time_extrapolated']:.2f}s\n{"=" * 36}""")
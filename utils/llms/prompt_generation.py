@@ -1,9 +1,13 @@
 import json
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional
+
+from .few_shot_retrieval import render_few_shot_examples
 
 class PromptVariationGenerator:
-    def __init__(self):
+    def __init__(self, example_retriever=None):
+        # FewShotIndex opcional: reemplaza los ejemplos fijos por los de clientes parecidos
+        self.example_retriever = example_retriever
         self.base_system_prompt = self._load_base_system_prompt()
         self.prompt_variations = self._generate_prompt_variations()
         
@@ -250,7 +254,7 @@ class PromptVariationGenerator:
 
     # === GENERACION DE PROMPT FINAL ===
     def generate_prompt_for_customer(self, variation_name: str, customer_data: List[Dict], 
-                                   customer_summary: Dict) -> str:
+                                   customer_summary: Dict, customer_name: Optional[str] = None) -> str:
         variation = next((v for v in self.prompt_variations if v['name'] == variation_name), None)
         if not variation:
             raise ValueError(f"Variación '{variation_name}' no encontrada")
@@ -285,12 +289,12 @@ class PromptVariationGenerator:
         # Combinacion final: system + user prompt
         full_prompt = f"{variation['system_prompt']}\n\n{user_prompt}"
         
-        # Agregar los few-shot examples
-        if variation['few_shot_examples']:
-            examples_text = "\n\n=== EJEMPLOS DE REFERENCIA ===\n"
-            for i, example in enumerate(variation['few_shot_examples'], 1):
-                examples_text += f"\nEjemplo {i}: {example['input']}\n"
-                examples_text += f"Respuesta esperada:\n{json.dumps(example['output'], indent=2, ensure_ascii=False)}\n"
-            full_prompt += examples_text
+        # Agregar los few-shot examples (recuperados si hay retriever; si no encuentra, los fijos).
+        # `customer_name` es la clave del cliente en los datos: su propia flashcard nunca es ejemplo
+        examples = variation['few_shot_examples']
+        if examples and self.example_retriever is not None:
+            examples = self.example_retriever.select(customer_summary, exclude=customer_name) or examples
+        if examples:
+            full_prompt += render_few_shot_examples(examples)
         
         return full_prompt
\ No newline at end of file
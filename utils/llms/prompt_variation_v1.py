@@ -1,9 +1,13 @@
 import json
-from typing import List, Dict
+from typing import List, Dict, Optional
+
+from .few_shot_retrieval import render_few_shot_examples
 
 
 class PromptVariationGeneratorV1:
-    def __init__(self):
+    def __init__(self, example_retriever=None):
+        # FewShotIndex opcional: agrega al prompt ejemplos de clientes parecidos
+        self.example_retriever = example_retriever
         self.prompt_variations = self._generate_prompt_variations()
 
     def _generate_prompt_variations(self) -> List[Dict]:
@@ -135,13 +139,20 @@ class PromptVariationGeneratorV1:
         ]
 
     def generate_prompt_for_customer(self, variation_name: str, customer_data: List[Dict], 
-                                   customer_summary: Dict) -> str:
+                                   customer_summary: Dict, customer_name: Optional[str] = None) -> str:
         variation = next((v for v in self.prompt_variations if v['name'] == variation_name), None)
         if not variation:
             raise ValueError(f"Variación '{variation_name}' no encontrada")
 
-        formatted_customer_data = " ".join([json.dumps(call) for call in customer_data])
+        formatted_customer_data = " ".join([json.dumps(dict(call)) for call in customer_data])
         formatted_customer_summary = json.dumps(customer_summary)
         
         user_data = str(formatted_customer_data) + "\n\n" + str(formatted_customer_summary)
-        return variation['prompt'].format(user_data=user_data)
+        prompt = variation['prompt'].format(user_data=user_data)
+
+        if self.example_retriever is not None:
+            # `customer_name` es la clave del cliente en los datos: su propia flashcard nunca es ejemplo
+            examples = self.example_retriever.select(customer_summary, exclude=customer_name)
+            if examples:
+                prompt += render_few_shot_examples(examples)
+        return prompt
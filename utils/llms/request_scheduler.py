@@ -0,0 +1,392 @@
+import os
+import math
+import time
+import socket
+import sqlite3
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+SCHEDULER_PATH = 'results/llm_scheduler.sqlite'
+
+# Clases de prioridad, de mayor a menor: operadores en vivo (api.py), pre-generación batch
+# (regenerate) y corridas de prompt tuning
+PRIORITY_CLASSES = ('interactive', 'batch', 'tuning')
+
+# Fracción de la capacidad que cada clase puede ocupar a la vez
+DEFAULT_SHARES = {'interactive': 1.0, 'batch': 0.75, 'tuning': 0.5}
+# Con el SLO interactivo vencido: batch se achica y tuning se pausa hasta que se recupere
+THROTTLED_SHARES = {'interactive': 1.0, 'batch': 0.25, 'tuning': 0.0}
+# Tiempo de espera en cola objetivo por clase (segundos); None = sin objetivo
+DEFAULT_SLOS = {'interactive': 1.0, 'batch': 30.0, 'tuning': None}
+
+
+def class_limits(capacity: int, shares: Dict[str, float]) -> Dict[str, int]:
+    """Slots máximos por clase: al menos uno si la cuota es positiva, ninguno si es 0 (clase pausada)."""
+    return {name: min(capacity, max(1, math.floor(share * capacity))) if share > 0 else 0
+            for name, share in shares.items()}
+
+
+class PriorityRequestScheduler:
+    """
+    Planificador de llamadas al LLM compartido entre procesos (API, prompt tuning, workers) sobre SQLite.
+
+    Hay `capacity` slots (típicamente OLLAMA_NUM_PARALLEL × hosts). Cada llamada se registra como
+    espera y toma un slot cuando hay uno libre, su clase está bajo su cuota y no hay esperas de mayor
+    prioridad (o anteriores de su clase) que puedan usarlo. Si la espera de las llamadas interactivas
+    supera su SLO (promedio móvil o una espera en curso), las clases batch se limitan con
+    THROTTLED_SHARES hasta que vuelva por debajo de `recovery_ratio` × SLO. Las llamadas en curso
+    no se interrumpen: el throttling solo afecta a los slots nuevos.
+
+    Los slots son leases: mientras la llamada sigue en curso un hilo del proceso los renueva cada
+    `lease_seconds` / 3; si el proceso muere sin liberarlos vencen a los `lease_seconds`.
+    """
+
+    def __init__(self, db_path: str = SCHEDULER_PATH, capacity: int = 1, shares: Optional[Dict[str, float]] = None,
+                 slos: Optional[Dict[str, Optional[float]]] = None,
+                 throttled_shares: Optional[Dict[str, float]] = None, lease_seconds: float = 60.0,
+                 poll_interval: float = 0.02, ewma_alpha: float = 0.3, recovery_ratio: float = 0.5,
+                 recovery_seconds: float = 30.0):
+        self.db_path = db_path
+        self.capacity = capacity
+        self.shares = {**DEFAULT_SHARES, **(shares or {})}
+        self.slos = {**DEFAULT_SLOS, **(slos or {})}
+        self.throttled_shares = {**THROTTLED_SHARES, **(throttled_shares or {})}
+        unknown = (set(self.shares) | set(self.slos) | set(self.throttled_shares)) - set(PRIORITY_CLASSES)
+        if unknown:
+            raise ValueError(f"Clases de prioridad desconocidas: {sorted(unknown)}")
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.ewma_alpha = ewma_alpha
+        self.recovery_ratio = recovery_ratio
+        self.recovery_seconds = recovery_seconds
+        self.holder = f"{socket.gethostname()}-{os.getpid()}"
+        # Slots tomados por este proceso y el hilo que renueva sus leases (se lanza con el primer slot)
+        self._held = set()
+        self._held_lock = threading.Lock()
+        self._renewer: Optional[threading.Thread] = None
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS slots (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    priority TEXT NOT NULL,
+                    holder TEXT NOT NULL,
+                    acquired_at REAL NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS waiters (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    priority TEXT NOT NULL,
+                    holder TEXT NOT NULL,
+                    enqueued_at REAL NOT NULL,
+                    seen_at REAL NOT NULL
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS class_stats (
+                    priority TEXT PRIMARY KEY,
+                    granted INTEGER NOT NULL DEFAULT 0,
+                    released INTEGER NOT NULL DEFAULT 0,
+                    timeouts INTEGER NOT NULL DEFAULT 0,
+                    queue_seconds REAL NOT NULL DEFAULT 0,
+                    max_queue_seconds REAL NOT NULL DEFAULT 0,
+                    queue_sketch TEXT,
+                    slo_violations INTEGER NOT NULL DEFAULT 0,
+                    throttled_grants INTEGER NOT NULL DEFAULT 0,
+                    service_seconds REAL NOT NULL DEFAULT 0
+                )
+            """)
+            conn.execute("CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value REAL NOT NULL)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    @contextmanager
+    def slot(self, priority: str, timeout: Optional[float] = None):
+        """Ocupa un slot durante el bloque; devuelve los segundos de espera en cola."""
+        slot_id, queue_seconds = self.acquire(priority, timeout)
+        try:
+            yield queue_seconds
+        finally:
+            self.release(slot_id)
+
+    def acquire(self, priority: str, timeout: Optional[float] = None) -> Tuple[int, float]:
+        """Espera un slot para `priority`; devuelve (id del slot, segundos en cola). TimeoutError si vence `timeout`."""
+        _check_priority(priority)
+        enqueued_at = time.time()
+        with self._connect() as conn:
+            waiter_id = conn.execute(
+                "INSERT INTO waiters (priority, holder, enqueued_at, seen_at) VALUES (?, ?, ?, ?)",
+                (priority, self.holder, enqueued_at, enqueued_at)
+            ).lastrowid
+
+        granted = False
+        try:
+            while True:
+                with self._connect() as conn:
+                    conn.execute("BEGIN IMMEDIATE")
+                    now = time.time()
+                    slot_id = self._try_grant(conn, waiter_id, priority, enqueued_at, now)
+                    conn.execute("COMMIT")
+                if slot_id is not None:
+                    granted = True
+                    self._hold(slot_id)
+                    return slot_id, now - enqueued_at
+                if timeout is not None and now - enqueued_at > timeout:
+                    self._bump(priority, 'timeouts')
+                    raise TimeoutError(f"Sin slot para '{priority}' tras {timeout:.1f}s en cola")
+                time.sleep(self.poll_interval)
+        finally:
+            if not granted:
+                with self._connect() as conn:
+                    conn.execute("DELETE FROM waiters WHERE id = ?", (waiter_id,))
+
+    def release(self, slot_id: int):
+        with self._held_lock:
+            self._held.discard(slot_id)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT priority, acquired_at FROM slots WHERE id = ?", (slot_id,)).fetchone()
+            if row is not None:
+                conn.execute("DELETE FROM slots WHERE id = ?", (slot_id,))
+                conn.execute("UPDATE class_stats SET released = released + 1, service_seconds = service_seconds + ? "
+                             "WHERE priority = ?", (now - row['acquired_at'], row['priority']))
+            conn.execute("COMMIT")
+
+    def extend(self, slot_ids) -> int:
+        """Renueva el lease de los slots por `lease_seconds` desde ahora; devuelve cuántos seguían vigentes."""
+        slot_ids = list(slot_ids)
+        if not slot_ids:
+            return 0
+        with self._connect() as conn:
+            return conn.execute(f"UPDATE slots SET expires_at = ? WHERE id IN ({', '.join('?' * len(slot_ids))})",
+                                (time.time() + self.lease_seconds, *slot_ids)).rowcount
+
+    def _hold(self, slot_id: int):
+        with self._held_lock:
+            self._held.add(slot_id)
+            # Tras un fork el hilo del padre no existe en el hijo: se relanza
+            if self._renewer is None or not self._renewer.is_alive():
+                self._renewer = threading.Thread(target=self._renew_leases, name='llm-scheduler-leases', daemon=True)
+                self._renewer.start()
+
+    def _renew_leases(self):
+        """Heartbeat de los slots en uso: una generación lenta no pierde su slot mientras corre."""
+        while True:
+            time.sleep(self.lease_seconds / 3)
+            with self._held_lock:
+                held = list(self._held)
+                if not held:
+                    # Sin slots en uso termina; el próximo acquire lo vuelve a lanzar
+                    self._renewer = None
+                    return
+            try:
+                self.extend(held)
+            except sqlite3.Error as e:
+                print(f"No se pudieron renovar los slots del planificador: {e}")
+
+    def _bump(self, priority: str, column: str):
+        with self._connect() as conn:
+            conn.execute("INSERT OR IGNORE INTO class_stats (priority) VALUES (?)", (priority,))
+            conn.execute(f"UPDATE class_stats SET {column} = {column} + 1 WHERE priority = ?", (priority,))
+
+    def _try_grant(self, conn: sqlite3.Connection, waiter_id: int, priority: str, enqueued_at: float,
+                   now: float) -> Optional[int]:
+        # Leases vencidos (procesos muertos) y esperas que dejaron de sondear
+        conn.execute("DELETE FROM slots WHERE expires_at < ?", (now,))
+        conn.execute("DELETE FROM waiters WHERE seen_at < ?", (now - max(10.0, 100 * self.poll_interval),))
+        conn.execute("UPDATE waiters SET seen_at = ? WHERE id = ?", (now, waiter_id))
+
+        in_use = {name: 0 for name in PRIORITY_CLASSES}
+        for row in conn.execute("SELECT priority, COUNT(*) AS n FROM slots GROUP BY priority"):
+            in_use[row['priority']] = row['n']
+        waiting = conn.execute("SELECT id, priority, enqueued_at FROM waiters ORDER BY id").fetchall()
+        throttled = self._update_throttle(conn, waiting, now)
+        limits = class_limits(self.capacity, self.throttled_shares if throttled else self.shares)
+
+        free = self.capacity - sum(in_use.values())
+        if free <= 0 or in_use[priority] >= limits[priority]:
+            return None
+        # Esperas por delante (clase más prioritaria, o misma clase y anteriores) que podrían tomar un slot ahora
+        rank = PRIORITY_CLASSES.index
+        ahead = {name: 0 for name in PRIORITY_CLASSES}
+        for row in waiting:
+            if rank(row['priority']) < rank(priority) or (row['priority'] == priority and row['id'] < waiter_id):
+                ahead[row['priority']] += 1
+        if free <= sum(min(ahead[name], max(0, limits[name] - in_use[name])) for name in PRIORITY_CLASSES):
+            return None
+
+        queue_seconds = now - enqueued_at
+        slot_id = conn.execute(
+            "INSERT INTO slots (priority, holder, acquired_at, expires_at) VALUES (?, ?, ?, ?)",
+            (priority, self.holder, now, now + self.lease_seconds)
+        ).lastrowid
+        conn.execute("DELETE FROM waiters WHERE id = ?", (waiter_id,))
+        self._record_grant(conn, priority, queue_seconds, throttled, now)
+        return slot_id
+
+    def _state(self, conn: sqlite3.Connection) -> Dict[str, float]:
+        return {row['key']: row['value'] for row in conn.execute("SELECT key, value FROM state")}
+
+    def _set_state(self, conn: sqlite3.Connection, values: Dict[str, float]):
+        conn.executemany("INSERT INTO state (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                         list(values.items()))
+
+    def _interactive_signal(self, state: Dict[str, float], waiting: List, now: float) -> float:
+        """Espera interactiva vigente: promedio móvil reciente o la espera más larga en curso, la mayor."""
+        recent = now - state.get('interactive_last_grant', 0.0) <= self.recovery_seconds
+        ewma = state.get('interactive_queue_ewma', 0.0) if recent else 0.0
+        oldest = max((now - row['enqueued_at'] for row in waiting if row['priority'] == 'interactive'), default=0.0)
+        return max(ewma, oldest)
+
+    def _update_throttle(self, conn: sqlite3.Connection, waiting: List, now: float) -> bool:
+        slo = self.slos.get('interactive')
+        if not slo:
+            return False
+        state = self._state(conn)
+        throttled = bool(state.get('throttled', 0.0))
+        signal = self._interactive_signal(state, waiting, now)
+        if not throttled and signal > slo:
+            self._set_state(conn, {'throttled': 1.0, 'throttled_since': now,
+                                   'throttle_events': state.get('throttle_events', 0.0) + 1})
+            return True
+        if throttled and signal < slo * self.recovery_ratio:
+            self._set_state(conn, {'throttled': 0.0, 'throttled_seconds':
+                                   state.get('throttled_seconds', 0.0) + now - state.get('throttled_since', now)})
+            return False
+        return throttled
+
+    def _record_grant(self, conn: sqlite3.Connection, priority: str, queue_seconds: float, throttled: bool, now: float):
+        from ..analysis.leaderboard import LatencySketch
+
+        conn.execute("INSERT OR IGNORE INTO class_stats (priority) VALUES (?)", (priority,))
+        row = conn.execute("SELECT queue_sketch FROM class_stats WHERE priority = ?", (priority,)).fetchone()
+        sketch = LatencySketch.from_json(row['queue_sketch']) if row['queue_sketch'] else LatencySketch()
+        sketch.add(queue_seconds)
+        slo = self.slos.get(priority)
+        conn.execute("""
+            UPDATE class_stats SET granted = granted + 1, queue_seconds = queue_seconds + ?,
+                max_queue_seconds = MAX(max_queue_seconds, ?), queue_sketch = ?,
+                slo_violations = slo_violations + ?, throttled_grants = throttled_grants + ?
+            WHERE priority = ?
+        """, (queue_seconds, queue_seconds, sketch.to_json(), int(slo is not None and queue_seconds > slo),
+              int(throttled), priority))
+
+        if priority == 'interactive':
+            state = self._state(conn)
+            recent = now - state.get('interactive_last_grant', 0.0) <= self.recovery_seconds
+            ewma = state.get('interactive_queue_ewma', 0.0) if recent else queue_seconds
+            self._set_state(conn, {'interactive_queue_ewma': ewma + self.ewma_alpha * (queue_seconds - ewma),
+                                   'interactive_last_grant': now})
+
+    def report(self) -> Dict:
+        """Estado actual y métricas acumuladas por clase (espera en cola, SLO, throttling, servicio)."""
+        from ..analysis.leaderboard import LatencySketch
+
+        now = time.time()
+        with self._connect() as conn:
+            in_use = {row['priority']: row['n'] for row in
+                      conn.execute("SELECT priority, COUNT(*) AS n FROM slots WHERE expires_at >= ? GROUP BY priority", (now,))}
+            waiting = conn.execute("SELECT id, priority, enqueued_at FROM waiters ORDER BY id").fetchall()
+            stats = {row['priority']: dict(row) for row in conn.execute("SELECT * FROM class_stats")}
+            state = self._state(conn)
+
+        throttled = bool(state.get('throttled', 0.0))
+        limits = class_limits(self.capacity, self.throttled_shares if throttled else self.shares)
+        classes = {}
+        for name in PRIORITY_CLASSES:
+            row = stats.get(name, {})
+            granted = row.get('granted', 0)
+            sketch = LatencySketch.from_json(row['queue_sketch']) if row.get('queue_sketch') else LatencySketch()
+            released = row.get('released', 0)
+            classes[name] = {
+                'in_flight': in_use.get(name, 0),
+                'waiting': sum(1 for waiter in waiting if waiter['priority'] == name),
+                'limit': limits[name],
+                'share': self.shares[name],
+                'slo_seconds': self.slos.get(name),
+                'granted': granted,
+                'timeouts': row.get('timeouts', 0),
+                'mean_queue_seconds': row['queue_seconds'] / granted if granted else None,
+                'p50_queue_seconds': sketch.quantile(0.5),
+                'p95_queue_seconds': sketch.quantile(0.95),
+                'p99_queue_seconds': sketch.quantile(0.99),
+                'max_queue_seconds': row.get('max_queue_seconds'),
+                'slo_violation_rate': row['slo_violations'] / granted if granted and self.slos.get(name) else None,
+                'throttled_grants': row.get('throttled_grants', 0),
+                'mean_service_seconds': row['service_seconds'] / released if released else None
+            }
+
+        throttled_seconds = state.get('throttled_seconds', 0.0)
+        if throttled:
+            throttled_seconds += now - state.get('throttled_since', now)
+        return {
+            'capacity': self.capacity,
+            'throttled': throttled,
+            'throttle_events': int(state.get('throttle_events', 0)),
+            'throttled_seconds': throttled_seconds,
+            'interactive_queue_signal': self._interactive_signal(state, waiting, now),
+            'classes': classes
+        }
+
+    def reset_stats(self):
+        """Borra las métricas acumuladas (no los slots ni las esperas en curso)."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM class_stats")
+            conn.execute("DELETE FROM state")
+            conn.execute("COMMIT")
+
+
+# Clase de prioridad por defecto del proceso (la fija cada punto de entrada, p.ej. api.py al iniciar)
+_process_priority = os.getenv('OLLAMA_PRIORITY', 'batch')
+# Clase del bloque `default_priority` en curso: propia de cada hilo/tarea, no pisa la de otros puntos de entrada
+_scoped_priority: ContextVar[Optional[str]] = ContextVar('llm_priority', default=None)
+
+
+def _check_priority(priority: str):
+    if priority not in PRIORITY_CLASSES:
+        raise ValueError(f"Clase de prioridad desconocida: {priority} (opciones: {', '.join(PRIORITY_CLASSES)})")
+
+
+def get_default_priority() -> str:
+    return _scoped_priority.get() or _process_priority
+
+
+def set_default_priority(priority: str) -> str:
+    """Fija la clase del proceso para las llamadas sin prioridad explícita ni bloque `default_priority`; devuelve la anterior."""
+    global _process_priority
+    _check_priority(priority)
+    previous, _process_priority = _process_priority, priority
+    return previous
+
+
+@contextmanager
+def default_priority(priority: str):
+    """
+    Clase por defecto durante el bloque, solo para el contexto que lo ejecuta: otra llamada del mismo
+    proceso en otro hilo conserva la suya. Los hilos que se lanzan dentro la heredan si copian el
+    contexto (`contextvars.copy_context()`), como hacen el pipeline y ModelAffinityScheduler.run.
+    """
+    _check_priority(priority)
+    token = _scoped_priority.set(priority)
+    try:
+        yield
+    finally:
+        _scoped_priority.reset(token)
@@ -0,0 +1,79 @@
+import json
+import time
+import sqlite3
+import hashlib
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Set, Union
+
+RESPONSE_CACHE_PATH = 'results/response_cache.sqlite'
+
+
+def response_cache_keys(models: List[str], messages: List[Dict], format: Optional[Union[str, Dict]] = None,
+                        options: Optional[Dict] = None) -> List[str]:
+    """Claves de la misma conversación para varios modelos: mensajes, formato y opciones se serializan una sola vez."""
+    prefix = hashlib.sha256()
+    prefix.update(json.dumps(messages, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+    prefix.update(b"\0" + json.dumps(format, sort_keys=True, ensure_ascii=False).encode('utf-8') + b"\0")
+    # Sin opciones la clave no cambia (las entradas ya guardadas siguen sirviendo)
+    if options:
+        prefix.update(json.dumps(options, sort_keys=True).encode('utf-8') + b"\0")
+
+    keys = []
+    for model in models:
+        digest = prefix.copy()
+        digest.update(model.encode('utf-8'))
+        keys.append(digest.hexdigest())
+    return keys
+
+
+def response_cache_key(model: str, messages: List[Dict], format: Optional[Union[str, Dict]] = None,
+                       options: Optional[Dict] = None) -> str:
+    """Clave de la respuesta: modelo, mensajes, formato y opciones de generación exactos que se envían a Ollama."""
+    return response_cache_keys([model], messages, format, options)[0]
+
+
+class ResponseCache:
+    """Caché persistente (SQLite) de respuestas del LLM, para no repetir llamadas idénticas entre corridas."""
+
+    def __init__(self, db_path: str = RESPONSE_CACHE_PATH):
+        self.db_path = db_path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    stats TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT content, stats FROM responses WHERE key = ?", (key,)).fetchone()
+        return {'content': row[0], 'stats': json.loads(row[1])} if row else None
+
+    def put(self, key: str, model: str, content: str, stats: Dict):
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                         (key, model, content, json.dumps(stats), time.time()))
+
+    def contains(self, keys: Iterable[str], batch_size: int = 500) -> Set[str]:
+        """Subconjunto de `keys` que ya está en la caché."""
+        keys = list(keys)
+        found = set()
+        with self._connect() as conn:
+            for start in range(0, len(keys), batch_size):
+                batch = keys[start:start + batch_size]
+                rows = conn.execute(f"SELECT key FROM responses WHERE key IN ({','.join('?' * len(batch))})", batch)
+                found.update(row[0] for row in rows)
+        return found
@@ -0,0 +1,33 @@
+from array import array
+from typing import Dict, List
+
+
+class EvaluationResult:
+    """
+    Resultado compacto de una evaluación: un score float por métrica (en el orden de
+    `AcademicallyFoundedEvaluator.metrics`), una máscara de bits con las métricas que
+    reportaron errores y el score global.
+
+    El reporte detallado (pesos, referencias académicas y mensajes de error) se arma
+    solo cuando se pide, con `to_report`.
+    """
+
+    __slots__ = ('scores', 'error_mask', 'overall_score')
+
+    def __init__(self, scores: array, error_mask: int, overall_score: float):
+        self.scores = scores
+        self.error_mask = error_mask
+        self.overall_score = overall_score
+
+    def has_errors(self, metric_index: int) -> bool:
+        return bool(self.error_mask >> metric_index & 1)
+
+    def metric_scores(self, metric_names: List[str]) -> Dict[str, float]:
+        return dict(zip(metric_names, self.scores))
+
+    def to_report(self, evaluator, generated: Dict, expected: Dict, customer_context: Dict) -> Dict:
+        """Expande el resultado al reporte verboso de `evaluate_comprehensive`."""
+        return evaluator.expand_report(self, generated, expected, customer_context)
+
+    def __repr__(self) -> str:
+        return f"EvaluationResult(overall_score={self.overall_score:.2f}, error_mask={self.error_mask:#x})"
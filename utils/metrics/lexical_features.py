@@ -0,0 +1,114 @@
+import re
+from typing import Dict, FrozenSet, Iterable, Optional
+
+# === LEXICONES DEL EVALUADOR ===
+CAREFUL_ACTION_WORDS = frozenset(['comprendo', 'entiendo', 'cuidadoso'])
+DIRECT_ACTION_WORDS = frozenset(['perfecto', 'excelente', 'coordinemos'])
+CONFLICT_TYPE_WORDS = frozenset(['agresivo', 'problemático'])
+COOPERATIVE_TYPE_WORDS = frozenset(['receptivo', 'cooperativo'])
+CUSTOMER_TYPE_WORDS = frozenset(['receptivo alto', 'receptivo moderado', 'receptivo', 'moderado',
+                                 'evasivo', 'problemático'])
+
+ALL_KEYWORDS = CAREFUL_ACTION_WORDS | DIRECT_ACTION_WORDS | CONFLICT_TYPE_WORDS | COOPERATIVE_TYPE_WORDS | CUSTOMER_TYPE_WORDS
+
+
+class KeywordMatcher:
+    """
+    Matcher multi-patrón: una sola regex precompilada encuentra todas las palabras clave
+    presentes en un texto (semántica de subcadena, igual que `word in text`).
+
+    `findall` no devuelve coincidencias solapadas, así que se completa con:
+    - las palabras clave contenidas en cada coincidencia (tabla precalculada), y
+    - las pocas palabras clave que pueden empezar dentro de otra y continuar después
+      (sufijo de una = prefijo de otra), que se verifican directamente.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        # De mayor a menor longitud: en cada posición gana la coincidencia más larga
+        keywords = sorted(set(keywords), key=lambda word: (-len(word), word))
+        self._pattern = re.compile('|'.join(re.escape(word) for word in keywords))
+        self._contained: Dict[str, FrozenSet[str]] = {
+            word: frozenset(other for other in keywords if other in word)
+            for word in keywords
+        }
+        self._straddling = tuple(
+            other for other in keywords
+            if any(word != other and other not in word and
+                   any(word.endswith(other[:i]) for i in range(1, len(other)))
+                   for word in keywords)
+        )
+
+    def find_all(self, text: str) -> FrozenSet[str]:
+        found = set()
+        for match in set(self._pattern.findall(text)):
+            found |= self._contained[match]
+        found.update(word for word in self._straddling if word in text)
+        return frozenset(found)
+
+
+KEYWORD_MATCHER = KeywordMatcher(ALL_KEYWORDS)
+
+
+
+class FieldFeatures:
+    """
+    Rasgos léxicos de un campo: texto en minúsculas, tokens y palabras clave (sobre el texto
+    en minúsculas o sobre el original, sensible a mayúsculas). Los tokens y las palabras clave
+    se calculan la primera vez que una métrica los pide y quedan cacheados.
+    """
+
+    __slots__ = ('raw', 'lower', '_tokens', '_keywords', '_raw_keywords')
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.lower = raw.lower() if isinstance(raw, str) else None
+        self._tokens = None
+        self._keywords = None
+        self._raw_keywords = None
+
+    def tokens(self) -> FrozenSet[str]:
+        if self._tokens is None:
+            self._tokens = frozenset(self.lower.split())
+        return self._tokens
+
+    def keywords(self) -> FrozenSet[str]:
+        if self._keywords is None:
+            self._keywords = KEYWORD_MATCHER.find_all(self.lower)
+        return self._keywords
+
+    def raw_keywords(self) -> FrozenSet[str]:
+        if self._raw_keywords is None:
+            self._raw_keywords = KEYWORD_MATCHER.find_all(self.raw)
+        return self._raw_keywords
+
+
+class FlashcardFeatures:
+    """Registro compartido de rasgos de la flashcard generada, la esperada y el contexto del cliente."""
+
+    __slots__ = ('generated', 'expected', 'customer_context', '_generated', '_expected', '_context')
+
+    def __init__(self, generated: Dict, expected: Optional[Dict], customer_context: Dict):
+        self.generated = generated
+        self.expected = expected or {}
+        self.customer_context = customer_context
+        self._generated = {}
+        self._expected = {}
+        self._context = {}
+
+    def gen(self, field: str) -> FieldFeatures:
+        features = self._generated.get(field)
+        if features is None:
+            features = self._generated[field] = FieldFeatures(self.generated.get(field, ''))
+        return features
+
+    def exp(self, field: str) -> FieldFeatures:
+        features = self._expected.get(field)
+        if features is None:
+            features = self._expected[field] = FieldFeatures(self.expected.get(field, ''))
+        return features
+
+    def ctx(self, field: str) -> FieldFeatures:
+        features = self._context.get(field)
+        if features is None:
+            features = self._context[field] = FieldFeatures(self.customer_context.get(field, ''))
+        return features
@@ -1,7 +1,10 @@
 import logging
-import numpy as np
+from array import array
 from dataclasses import dataclass
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
+from .evaluation_result import EvaluationResult
+from .lexical_features import (FlashcardFeatures, FieldFeatures, CAREFUL_ACTION_WORDS, DIRECT_ACTION_WORDS,
+                               CONFLICT_TYPE_WORDS, COOPERATIVE_TYPE_WORDS)
 
 
 logger = logging.getLogger(__name__)
@@ -20,6 +23,8 @@ class AcademicallyFoundedEvaluator:
     def __init__(self):
         self.metrics = self.load_academic_metrics()
         self.weights = {metric.name: metric.weight for metric in self.metrics}
+        self.metric_names = [metric.name for metric in self.metrics]
+        self._metric_functions = [self._get_metric_function(metric.name) for metric in self.metrics]
         
     def load_academic_metrics(self) -> List[AcademicMetricDefinition]:
         metrics = [
@@ -87,29 +92,24 @@ class AcademicallyFoundedEvaluator:
         return metrics
     
     def evaluate_response_appropriateness(self, generated: Dict, expected: Dict, 
-                                        customer_context: Dict) -> Tuple[float, List[str]]:
+                                        customer_context: Dict,
+                                        features: Optional[FlashcardFeatures] = None) -> Tuple[float, List[str]]:
         errors = []
+        features = features or FlashcardFeatures(generated, expected, customer_context)
         
         # Factores de apropiación según literatura académica
         appropriateness_factors = []
         
         # Factor 1: Coherencia con tipo de cliente
-        customer_type = customer_context.get('customer_type', '').lower()
-        nivel_presion = generated.get('nivel_presion', '').lower()
-        
-        coherence_score = self._evaluate_type_coherence(customer_type, nivel_presion)
+        coherence_score = self._evaluate_type_coherence(features.ctx('customer_type'), features.gen('nivel_presion'))
         appropriateness_factors.append(coherence_score)
         
         # Factor 2: Relevancia contextual
-        relevance_score = self._evaluate_contextual_relevance(
-            generated, customer_context
-        )
+        relevance_score = self._evaluate_contextual_relevance(features)
         appropriateness_factors.append(relevance_score)
         
         # Factor 3: Corrección de acciones recomendadas
-        action_correctness = self._evaluate_action_correctness(
-            generated, customer_context
-        )
+        action_correctness = self._evaluate_action_correctness(features)
         appropriateness_factors.append(action_correctness)
         
         # Calcular score de apropiación (promedio ponderado)
@@ -120,7 +120,8 @@ class AcademicallyFoundedEvaluator:
         
         return min(1.0, appropriateness_score), errors
     
-    def evaluate_semantic_coherence(self, generated: Dict, customer_context: Dict) -> Tuple[float, List[str]]:
+    def evaluate_semantic_coherence(self, generated: Dict, customer_context: Dict,
+                                    features: Optional[FlashcardFeatures] = None) -> Tuple[float, List[str]]:
         """
         Evaluar coherencia semántica según Ye et al. (2021)
         
@@ -129,15 +130,14 @@ class AcademicallyFoundedEvaluator:
         """
         errors = []
         coherence_factors = []
+        features = features or FlashcardFeatures(generated, None, customer_context)
         
         # Factor 1: Consistencia interna entre campos
-        internal_consistency = self._evaluate_internal_consistency(generated)
+        internal_consistency = self._evaluate_internal_consistency(features)
         coherence_factors.append(internal_consistency)
         
         # Factor 2: Coherencia con patrón histórico
-        historical_coherence = self._evaluate_historical_coherence(
-            generated, customer_context
-        )
+        historical_coherence = self._evaluate_historical_coherence(features)
         coherence_factors.append(historical_coherence)
         
         # Factor 3: Coherencia lógica de recomendaciones
@@ -145,7 +145,7 @@ class AcademicallyFoundedEvaluator:
         coherence_factors.append(logical_coherence)
         
         # Score final (Ye et al. proponen promedio de múltiples factores)
-        coherence_score = np.mean(coherence_factors)
+        coherence_score = sum(coherence_factors) / len(coherence_factors)
         
         return coherence_score, errors
     
@@ -182,7 +182,8 @@ class AcademicallyFoundedEvaluator:
         
         return accuracy, errors
     
-    def evaluate_contextual_relevance(self, generated: Dict, customer_context: Dict) -> Tuple[float, List[str]]:
+    def evaluate_contextual_relevance(self, generated: Dict, customer_context: Dict,
+                                      features: Optional[FlashcardFeatures] = None) -> Tuple[float, List[str]]:
         """
         Evaluar relevancia contextual según Liu et al. (2016)
         
@@ -191,29 +192,30 @@ class AcademicallyFoundedEvaluator:
         """
         errors = []
         relevance_factors = []
+        features = features or FlashcardFeatures(generated, None, customer_context)
         
         # Factor 1: Relevancia del comentario al motivo frecuente
         comment_relevance = self._evaluate_comment_relevance(
-            generated.get('comentario', ''),
-            customer_context.get('motivo_frecuente', '')
+            features.gen('comentario'),
+            features.ctx('motivo_frecuente')
         )
         relevance_factors.append(comment_relevance)
         
         # Factor 2: Relevancia de tipificación al tipo de cliente
         typification_relevance = self._evaluate_typification_relevance(
-            generated.get('tipificacion_operativa', ''),
-            customer_context.get('customer_type', '')
+            features.gen('tipificacion_operativa'),
+            features.ctx('customer_type')
         )
         relevance_factors.append(typification_relevance)
         
         # Factor 3: Relevancia de canal recomendado al historial
         channel_relevance = self._evaluate_channel_relevance(
-            generated.get('canal_recomendado', ''),
-            customer_context
+            features.gen('canal_recomendado'),
+            features.ctx('customer_type')
         )
         relevance_factors.append(channel_relevance)
         
-        relevance_score = np.mean(relevance_factors)
+        relevance_score = sum(relevance_factors) / len(relevance_factors)
         
         return relevance_score, errors
     
@@ -250,7 +252,8 @@ class AcademicallyFoundedEvaluator:
         
         return completeness_score, errors
     
-    def evaluate_semantic_similarity_bertscore(self, generated: Dict, expected: Dict) -> Tuple[float, List[str]]:
+    def evaluate_semantic_similarity_bertscore(self, generated: Dict, expected: Dict,
+                                               features: Optional[FlashcardFeatures] = None) -> Tuple[float, List[str]]:
         """
         Evaluar similitud semántica usando BERTScore según Zhang et al. (2020)
         
@@ -258,6 +261,7 @@ class AcademicallyFoundedEvaluator:
         from BERT to match words in candidate and reference sentences by cosine similarity"
         """
         errors = []
+        features = features or FlashcardFeatures(generated, expected, {})
         
         try:
             # Simular BERTScore para campos de texto libre
@@ -267,14 +271,14 @@ class AcademicallyFoundedEvaluator:
             for field in text_fields:
                 if field in generated and field in expected:
                     similarity = self._simulate_bertscore(
-                        generated[field], expected[field]
+                        features.gen(field), features.exp(field)
                     )
                     similarities.append(similarity)
                 else:
                     similarities.append(0.0)
                     errors.append(f"Campo {field} faltante para BERTScore")
             
-            bertscore_f1 = np.mean(similarities) if similarities else 0.0
+            bertscore_f1 = sum(similarities) / len(similarities) if similarities else 0.0
             
             return bertscore_f1, errors
             
@@ -282,12 +286,12 @@ class AcademicallyFoundedEvaluator:
             errors.append(f"Error calculando BERTScore: {str(e)}")
             return 0.0, errors
     
-    def _simulate_bertscore(self, candidate: str, reference: str) -> float:
-        if not candidate or not reference:
+    def _simulate_bertscore(self, candidate: FieldFeatures, reference: FieldFeatures) -> float:
+        if not candidate.raw or not reference.raw:
             return 0.0
         
-        candidate_words = set(candidate.lower().split())
-        reference_words = set(reference.lower().split())
+        candidate_words = candidate.tokens()
+        reference_words = reference.tokens()
         
         if not candidate_words or not reference_words:
             return 0.0
@@ -305,7 +309,7 @@ class AcademicallyFoundedEvaluator:
     
     
     # === AUXILIARES PARA EVALUACIONES ESPECIFICAS ===
-    def _evaluate_type_coherence(self, customer_type: str, nivel_presion: str) -> float:
+    def _evaluate_type_coherence(self, customer_type: FieldFeatures, nivel_presion: FieldFeatures) -> float:
         coherence_matrix = {
             'receptivo alto': {'baja': 1.0, 'moderada': 0.7, 'alta': 0.2},
             'receptivo moderado': {'baja': 0.8, 'moderada': 1.0, 'alta': 0.6},
@@ -313,75 +317,74 @@ class AcademicallyFoundedEvaluator:
             'problemático': {'baja': 1.0, 'moderada': 0.5, 'alta': 0.2}  # Manejo cuidadoso
         }
         
-        customer_type_clean = customer_type.lower().strip()
-        nivel_presion_clean = nivel_presion.lower().strip()
+        customer_type_keywords = customer_type.keywords()
+        nivel_presion_clean = nivel_presion.lower.strip()
         
         # Coincidencias parciales
         for ctype, pressures in coherence_matrix.items():
-            if ctype in customer_type_clean:
+            if ctype in customer_type_keywords:
                 return pressures.get(nivel_presion_clean, 0.5)
         
         return 0.5  # Si no hay coincidencia, score neutro
     
-    def _evaluate_contextual_relevance(self, generated: Dict, customer_context: Dict) -> float:
+    def _evaluate_contextual_relevance(self, features: FlashcardFeatures) -> float:
         relevance_score = 0.5  # Base score
         
         # Factor: Comentario relevante al motivo frecuente
-        motivo = customer_context.get('motivo_frecuente', '').lower()
-        comentario = generated.get('comentario', '').lower()
+        motivo = features.ctx('motivo_frecuente')
+        comentario = features.gen('comentario')
         
-        if motivo and comentario:
-            motivo_words = set(motivo.split())
-            comentario_words = set(comentario.split())
-            
-            overlap = len(motivo_words.intersection(comentario_words))
+        if motivo.lower and comentario.lower:
+            overlap = len(motivo.tokens().intersection(comentario.tokens()))
             if overlap > 0:
                 relevance_score += 0.3
         
         return min(1.0, relevance_score)
     
-    def _evaluate_action_correctness(self, generated: Dict, customer_context: Dict) -> float:
+    def _evaluate_action_correctness(self, features: FlashcardFeatures) -> float:
         correctness_score = 0.5
         
-        customer_type = customer_context.get('customer_type', '').lower()
-        acciones_si = generated.get('accion_si_responde_si', '').lower()
+        customer_type = features.ctx('customer_type').keywords()
+        acciones_si = features.gen('accion_si_responde_si')
         
-        if not acciones_si:
+        if not acciones_si.lower:
             return 0.0
 
         # Verificar palabras apropiadas según tipo de cliente
         if 'problemático' in customer_type:
             # Para clientes problemáticos, debe ser cuidadoso
-            if any(word in acciones_si for word in ['comprendo', 'entiendo', 'cuidadoso']):
+            if acciones_si.keywords() & CAREFUL_ACTION_WORDS:
                 correctness_score += 0.3
         elif 'receptivo' in customer_type:
             # Para clientes receptivos, puede ser más directo
-            if any(word in acciones_si for word in ['perfecto', 'excelente', 'coordinemos']):
+            if acciones_si.keywords() & DIRECT_ACTION_WORDS:
                 correctness_score += 0.3
         
         return min(1.0, correctness_score)
     
-    def _evaluate_internal_consistency(self, generated: Dict) -> float:
+    def _evaluate_internal_consistency(self, features: FlashcardFeatures) -> float:
         consistency_score = 1.0
         
-        nivel_presion = generated.get('nivel_presion', '').lower()
-        tipificacion = generated.get('tipificacion_operativa', '').lower()
+        nivel_presion = features.gen('nivel_presion').lower
+        tipificacion = features.gen('tipificacion_operativa')
         
         # Verificar inconsistencias lógicas
-        if nivel_presion == 'baja' and any(word in tipificacion for word in ['agresivo', 'problemático']):
+        if nivel_presion == 'baja' and tipificacion.keywords() & CONFLICT_TYPE_WORDS:
             consistency_score -= 0.3
         
-        if nivel_presion == 'alta' and any(word in tipificacion for word in ['receptivo', 'cooperativo']):
+        if nivel_presion == 'alta' and tipificacion.keywords() & COOPERATIVE_TYPE_WORDS:
             consistency_score -= 0.3
         
         return max(0.0, consistency_score)
     
-    def _evaluate_historical_coherence(self, generated: Dict, customer_context: Dict) -> float:
+    def _evaluate_historical_coherence(self, features: FlashcardFeatures) -> float:
         """Evaluar coherencia con patrón histórico"""
-        receptivity_ratio = customer_context.get('receptivity_ratio', 0.5)
-        customer_type_generated = generated.get('cliente', '')
-        if isinstance(customer_type_generated, dict):
+        receptivity_ratio = features.customer_context.get('receptivity_ratio', 0.5)
+        cliente = features.gen('cliente')
+        if isinstance(cliente.raw, dict):
             return 0.0
+        # Para textos se usan las palabras clave ya extraídas (sin pasar a minúsculas, como antes)
+        customer_type_generated = cliente.raw_keywords() if isinstance(cliente.raw, str) else cliente.raw
         
         if receptivity_ratio > 0.7 and 'receptivo' in customer_type_generated:
             return 1.0
@@ -406,13 +409,13 @@ class AcademicallyFoundedEvaluator:
         else:
             return 0.3
     
-    def _evaluate_comment_relevance(self, comment: str, frequent_motive: str) -> float:
+    def _evaluate_comment_relevance(self, comment: FieldFeatures, frequent_motive: FieldFeatures) -> float:
         """Evaluar relevancia del comentario al motivo frecuente"""
-        if not comment or not frequent_motive:
+        if not comment.raw or not frequent_motive.raw:
             return 0.5
         
-        comment_words = set(comment.lower().split())
-        motive_words = set(frequent_motive.lower().split())
+        comment_words = comment.tokens()
+        motive_words = frequent_motive.tokens()
         
         overlap = len(comment_words.intersection(motive_words))
         total_words = len(motive_words)
@@ -422,13 +425,13 @@ class AcademicallyFoundedEvaluator:
         
         return min(1.0, overlap / total_words + 0.3)
     
-    def _evaluate_typification_relevance(self, typification: str, customer_type: str) -> float:
+    def _evaluate_typification_relevance(self, typification: FieldFeatures, customer_type: FieldFeatures) -> float:
         """Evaluar relevancia de tipificación al tipo de cliente"""
-        if not typification or not customer_type:
+        if not typification.raw or not customer_type.raw:
             return 0.5
         
-        typification_lower = typification.lower()
-        customer_type_lower = customer_type.lower()
+        typification_lower = typification.keywords()
+        customer_type_lower = customer_type.keywords()
         
         # Verificar coincidencias conceptuales
         if 'receptivo' in customer_type_lower and 'receptivo' in typification_lower:
@@ -440,42 +443,81 @@ class AcademicallyFoundedEvaluator:
         else:
             return 0.6
     
-    def _evaluate_channel_relevance(self, recommended_channel: str, customer_context: Dict) -> float:
+    def _evaluate_channel_relevance(self, recommended_channel: FieldFeatures, customer_type: FieldFeatures) -> float:
         """Evaluar relevancia del canal recomendado"""
-        customer_type = customer_context.get('customer_type', '').lower()
+        customer_type = customer_type.keywords()
         
         # Lógica basada en mejores prácticas
-        if 'problemático' in customer_type and recommended_channel.lower() in ['email', 'whatsapp']:
+        if 'problemático' in customer_type and recommended_channel.lower in ['email', 'whatsapp']:
             return 1.0  # Evitar confrontación directa
-        elif 'receptivo' in customer_type and recommended_channel.lower() == 'callcenter':
+        elif 'receptivo' in customer_type and recommended_channel.lower == 'callcenter':
             return 1.0  # Aprovechar receptividad
-        elif 'evasivo' in customer_type and recommended_channel.lower() == 'whatsapp':
+        elif 'evasivo' in customer_type and recommended_channel.lower == 'whatsapp':
             return 1.0  # Canal menos intrusivo
         else:
             return 0.7
     
     # === OBTAIN OVERALL SCORE ===
+    def _get_metric_function(self, name: str) -> Callable:
+        # Firma común (generated, expected, customer_context, features) -> (score, errors)
+        functions = {
+            "response_appropriateness": self.evaluate_response_appropriateness,
+            "semantic_coherence": lambda g, e, c, f: self.evaluate_semantic_coherence(g, c, f),
+            "task_completion_accuracy": lambda g, e, c, f: self.evaluate_task_completion_accuracy(g, e),
+            "contextual_relevance": lambda g, e, c, f: self.evaluate_contextual_relevance(g, c, f),
+            "content_completeness": lambda g, e, c, f: self.evaluate_content_completeness(g),
+            "semantic_similarity": lambda g, e, c, f: self.evaluate_semantic_similarity_bertscore(g, e, f)
+        }
+        return functions.get(name, lambda g, e, c, f: (0.5, ["Métrica no implementada"]))
+
+    def evaluate_compact(self, generated: Dict, expected: Dict, customer_context: Dict) -> EvaluationResult:
+        """Evaluación sin reporte verboso: scores por métrica, máscara de errores y score global."""
+        scores = array('d')
+        error_mask = 0
+        total_weighted_score = 0.0
+        # Rasgos léxicos compartidos por todas las métricas (cada campo se procesa una sola vez)
+        features = FlashcardFeatures(generated, expected, customer_context)
+
+        for index, (metric, evaluate) in enumerate(zip(self.metrics, self._metric_functions)):
+            score, errors = evaluate(generated, expected, customer_context, features)
+            scores.append(score)
+            if errors:
+                error_mask |= 1 << index
+            total_weighted_score += score * metric.weight
+
+        return EvaluationResult(scores, error_mask, float(total_weighted_score) * 100.00)
+
+    def expand_report(self, result: EvaluationResult, generated: Dict, expected: Dict,
+                      customer_context: Dict) -> Dict:
+        """Reporte verboso a partir de un resultado compacto; solo se recalculan los errores marcados."""
+        features = FlashcardFeatures(generated, expected, customer_context)
+        report = {}
+
+        for index, (metric, evaluate) in enumerate(zip(self.metrics, self._metric_functions)):
+            score = result.scores[index]
+            errors = evaluate(generated, expected, customer_context, features)[1] if result.has_errors(index) else []
+            report[metric.name] = {
+                'score': score,
+                'weight': metric.weight,
+                'weighted_score': score * metric.weight,
+                'errors': errors,
+                'academic_reference': metric.academic_reference,
+                'citation': metric.paper_citation
+            }
+
+        report['overall_score'] = result.overall_score
+        return report
+
     def evaluate_comprehensive(self, generated: Dict, expected: Dict, 
                              customer_context: Dict) -> Dict[str, float]:
         results = {}
         total_weighted_score = 0.0
+        # Rasgos léxicos compartidos por todas las métricas (cada campo se procesa una sola vez)
+        features = FlashcardFeatures(generated, expected, customer_context)
         
         # Evaluar cada métrica
-        for metric in self.metrics:
-            if metric.name == "response_appropriateness":
-                score, errors = self.evaluate_response_appropriateness(generated, expected, customer_context)
-            elif metric.name == "semantic_coherence":
-                score, errors = self.evaluate_semantic_coherence(generated, customer_context)
-            elif metric.name == "task_completion_accuracy":
-                score, errors = self.evaluate_task_completion_accuracy(generated, expected)
-            elif metric.name == "contextual_relevance":
-                score, errors = self.evaluate_contextual_relevance(generated, customer_context)
-            elif metric.name == "content_completeness":
-                score, errors = self.evaluate_content_completeness(generated)
-            elif metric.name == "semantic_similarity":
-                score, errors = self.evaluate_semantic_similarity_bertscore(generated, expected)
-            else:
-                score, errors = 0.5, ["Métrica no implementada"]
+        for metric, evaluate in zip(self.metrics, self._metric_functions):
+            score, errors = evaluate(generated, expected, customer_context, features)
             
             results[metric.name] = {
                 'score': score,
@@ -490,4 +532,4 @@ class AcademicallyFoundedEvaluator:
         
         results['overall_score'] = float(total_weighted_score) * 100.00
         
-        return results
\ No newline at end of file
+        return results
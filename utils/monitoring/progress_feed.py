@@ -0,0 +1,163 @@
+import os
+import json
+import time
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+PROGRESS_PATH = 'results/run_progress.jsonl'
+
+
+class ProgressFeed:
+    """
+    Feed liviano de progreso de una corrida de tuning: una línea JSON por evento
+    (`start`, `cell`, `end`) agregada al final del archivo. Varios procesos pueden
+    escribir en el mismo feed (cada evento es una sola escritura en modo append).
+    """
+
+    def __init__(self, path: str = PROGRESS_PATH, run_id: Optional[str] = None):
+        self.path = path
+        self.run_id = run_id or f"run-{int(time.time())}"
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    def _write(self, event: Dict):
+        event = {'run_id': self.run_id, 'time': time.time(), **event}
+        line = json.dumps(event, ensure_ascii=False) + "\n"
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line)
+
+    def start(self, total_cells: int, **info):
+        self._write({'type': 'start', 'total': total_cells, **info})
+
+    def record_cell(self, result: Dict, concurrency_limit: Optional[int] = None):
+        """`concurrency_limit`: límite adaptativo de llamadas al LLM vigente al terminar la celda, si lo hay."""
+        metadata = result.get('metadata', {})
+        stats = metadata.get('llm_stats', {})
+        eval_duration = stats.get('eval_duration', 0.0)
+        self._write({
+            'type': 'cell',
+            'customer_name': result.get('customer_name'),
+            'model_name': metadata.get('model_name'),
+            'prompt_variation': metadata.get('prompt_variation'),
+            'latency': stats.get('latency', 0.0),
+            'eval_count': stats.get('eval_count', 0),
+            'tokens_per_second': stats.get('eval_count', 0) / eval_duration if eval_duration else 0.0,
+            'parse_failed': bool(metadata.get('parse_failed', False)),
+            'parse_retries': metadata.get('parse_retries', 0),
+            'academic_scores': result.get('academic_scores'),
+            **({'concurrency_limit': concurrency_limit} if concurrency_limit is not None else {})
+        })
+
+    def record_error(self, cell: Dict, error: str):
+        self._write({'type': 'error', **cell, 'error': error})
+
+    def finish(self):
+        self._write({'type': 'end'})
+
+
+class RunMonitorState:
+    """Agregados de la corrida más reciente del feed."""
+
+    def __init__(self):
+        self.run_id = None
+        self.total = 0
+        self.started_at = None
+        self.finished = False
+        self.completed = 0
+        self.errors = 0
+        self.parse_failures = 0
+        self.retries = 0
+        self.concurrency_limit = None
+        self.last_event_at = None
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.tokens_per_second: Dict[str, List[float]] = defaultdict(list)
+        self.variation_latencies: Dict[tuple, List[float]] = defaultdict(list)
+
+    def apply(self, event: Dict):
+        if event['type'] == 'start':
+            # Una corrida nueva reemplaza a la anterior
+            self.__init__()
+            self.run_id = event['run_id']
+            self.total = event.get('total', 0)
+            self.started_at = event['time']
+        elif self.run_id is not None and event['run_id'] != self.run_id:
+            return
+        elif event['type'] == 'cell':
+            self.completed += 1
+            self.parse_failures += int(event.get('parse_failed', False))
+            self.retries += event.get('parse_retries', 0)
+            self.concurrency_limit = event.get('concurrency_limit', self.concurrency_limit)
+            model = event.get('model_name')
+            self.latencies[model].append(event.get('latency', 0.0))
+            if event.get('tokens_per_second'):
+                self.tokens_per_second[model].append(event['tokens_per_second'])
+            self.variation_latencies[(model, event.get('prompt_variation'))].append(event.get('latency', 0.0))
+        elif event['type'] == 'error':
+            self.errors += 1
+        elif event['type'] == 'end':
+            self.finished = True
+        self.last_event_at = event['time']
+
+    def eta_seconds(self, now: Optional[float] = None) -> Optional[float]:
+        if not self.completed or not self.started_at or self.finished:
+            return None
+        elapsed = (now or time.time()) - self.started_at
+        return elapsed / self.completed * max(0, self.total - self.completed - self.errors)
+
+    def model_summary(self) -> List[Dict]:
+        import numpy as np
+
+        rows = []
+        for model, latencies in sorted(self.latencies.items(), key=lambda item: str(item[0])):
+            tps = self.tokens_per_second.get(model, [])
+            rows.append({
+                'model_name': model,
+                'cells': len(latencies),
+                'latency_p50': float(np.percentile(latencies, 50)),
+                'latency_p95': float(np.percentile(latencies, 95)),
+                'tokens_per_second': float(np.mean(tps)) if tps else 0.0
+            })
+        return rows
+
+    def variation_summary(self) -> List[Dict]:
+        import numpy as np
+
+        return [{
+            'model_name': model,
+            'prompt_variation': variation,
+            'cells': len(latencies),
+            'latency_mean': float(np.mean(latencies)),
+            'latency_p95': float(np.percentile(latencies, 95))
+        } for (model, variation), latencies in sorted(self.variation_latencies.items(), key=lambda item: str(item[0]))]
+
+
+class FeedTailer:
+    """Lee el feed de forma incremental: cada `poll` solo procesa las líneas nuevas desde el último offset."""
+
+    def __init__(self, path: str = PROGRESS_PATH):
+        self.path = path
+        self.offset = 0
+        self.state = RunMonitorState()
+
+    def poll(self) -> int:
+        if not os.path.exists(self.path):
+            return 0
+        if os.path.getsize(self.path) < self.offset:
+            # El archivo fue truncado o reemplazado
+            self.offset = 0
+            self.state = RunMonitorState()
+
+        new_events = 0
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # línea a medio escribir: se lee en el próximo poll
+                self.offset += len(line)
+                try:
+                    self.state.apply(json.loads(line))
+                    new_events += 1
+                except (json.JSONDecodeError, KeyError):
+                    continue
+        return new_events